@@ -0,0 +1,128 @@
+# als_sweep.py
+"""
+Automatic ALS parameter search.
+
+baseline_quality() scores a baseline without knowing the true one, and
+sweep() evaluates a grid of (lam, p) values for a set of spectra in a pool
+of worker processes, returning the candidates best first. The workers only
+import numpy/scipy and data_processor, never Qt. The spectra reach them
+through one shared memory SpectrumStore rather than pickled per worker.
+"""
+from __future__ import annotations
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, List, Sequence, Tuple
+import numpy as np
+from scipy.ndimage import binary_dilation, median_filter, uniform_filter1d
+from data_processor import baseline_als, estimate_noise
+from shared_spectra import SpectrumStore, open_array
+
+# relative weights of the quality terms, calibrated on synthetic spectra
+# (smooth backgrounds + Lorentzian bands + noise) against the true baseline
+OVERSHOOT_WEIGHT = 2.0
+CURVATURE_WEIGHT = 2000.0
+
+
+@dataclass(frozen=True)
+class Candidate:
+    lam: float
+    p: float
+    score: float   # mean baseline_quality over the spectra, lower is better
+
+
+def band_mask(y: np.ndarray, noise: float, band_width: int = 33) -> np.ndarray:
+    """
+    Points under bands up to band_width points wide, found from the spectrum
+    alone (not from a baseline): anything broader counts as background.
+    """
+    size = min(3 * band_width, len(y)) | 1
+    high_pass = y - median_filter(y, size=size, mode='nearest')
+    return binary_dilation(high_pass > 3 * noise, iterations=max(1, band_width // 10))
+
+
+def baseline_quality(y: np.ndarray, z: np.ndarray, noise: float | None = None,
+                     band_width: int = 33, window: int = 31) -> float:
+    """
+    Score baseline z of spectrum y; lower is better. Sum of, in noise units:
+    - shape: low-frequency structure left in y - z between the bands
+      (baseline too stiff); a constant offset is not counted,
+    - overshoot: baseline above the data by more than 2σ,
+    - curvature: baseline bending under the bands (too flexible, eats bands).
+    """
+    y = np.asarray(y, dtype=float)
+    s = noise or estimate_noise(y) or 1.0
+    bands = band_mask(y, s, band_width)
+    free = ~bands
+    r = y - z
+
+    # moving average of the residual over band-free points only
+    num = uniform_filter1d(np.where(free, r, 0.0), window)
+    den = uniform_filter1d(free.astype(float), window)
+    keep = free & (den > 0.3)
+    shape = np.std(num[keep] / den[keep]) / s if keep.sum() > 1 else 0.0
+
+    overshoot = np.sqrt(np.mean(np.clip(-r - 2 * s, 0, None) ** 2)) / s
+    curv = np.diff(z, 2)[bands[1:-1]]
+    curvature = np.sqrt(np.mean(curv ** 2)) / s if curv.size else 0.0
+    return float(shape + OVERSHOOT_WEIGHT * overshoot + CURVATURE_WEIGHT * curvature)
+
+
+def default_grid(log_lams: Sequence[float] = tuple(np.round(np.linspace(2, 9, 10), 1)),
+                 ps: Sequence[float] = (1e-5, 3e-5, 1e-4, 3e-4, 1e-3)) -> List[Tuple[float, float]]:
+    """10 × 5 (lam, p) grid; values are representable by the baseline panel's spin boxes."""
+    return [(10.0 ** ll, p) for ll in log_lams for p in ps]
+
+
+# ---------- Worker side ----------
+_signals: List[np.ndarray] = []
+_noise: List[float] = []
+_band_width = 33
+
+
+def _init_worker(descriptors, band_width):
+    global _signals, _noise, _band_width
+    _signals = [open_array(d)[0] for d in descriptors]
+    _noise = [estimate_noise(y) or 1.0 for y in _signals]
+    _band_width = band_width
+
+
+def _evaluate(lam: float, p: float, niter: int) -> Candidate:
+    scores = []
+    for y, s in zip(_signals, _noise):
+        z = baseline_als(y, lam=lam, p=p, niter=niter)
+        scores.append(baseline_quality(y, z, noise=s, band_width=_band_width))
+    return Candidate(lam, p, float(np.mean(scores)))
+
+
+def sweep(signals: Sequence[np.ndarray], grid: Sequence[Tuple[float, float]] | None = None,
+          niter: int = 100, band_width: int = 33, max_workers: int | None = None,
+          progress: Callable[[int, int], None] | None = None,
+          cancelled: Callable[[], bool] | None = None) -> List[Candidate]:
+    """
+    Score every (lam, p) of grid on all signals in worker processes.
+    Features up to band_width points wide are treated as bands to keep
+    (see band_mask). progress(done, total) is called as results arrive; if cancelled()
+    becomes true, pending points are dropped. Returns candidates best first.
+    """
+    grid = list(grid or default_grid())
+    max_workers = max_workers or min(len(grid), os.cpu_count() or 1)
+    # spawn: never fork a process that runs Qt threads
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    store = SpectrumStore([(len(y), ("y",)) for y in signals])
+    for desc, y in zip(store.descriptors, signals):
+        store.array(desc)[0] = y
+    with store, ProcessPoolExecutor(max_workers, mp_context=ctx, initializer=_init_worker,
+                                    initargs=(store.descriptors, band_width)) as pool:
+        futures = [pool.submit(_evaluate, lam, p, niter) for lam, p in grid]
+        for done, fut in enumerate(as_completed(futures), 1):
+            results.append(fut.result())
+            if progress:
+                progress(done, len(grid))
+            if cancelled and cancelled():
+                for f in futures:
+                    f.cancel()
+                break
+    return sorted(results, key=lambda c: c.score)
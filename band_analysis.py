@@ -0,0 +1,294 @@
+# band_analysis.py
+"""
+Band integrals and peaks over all cycles of an experiment.
+
+Every cycle file holds the cumulative spectrum, so a band integrated in
+each cycle shows how its Raman and ROA intensities, and their ratio
+(the CID, circular intensity difference), settle as cycles accumulate.
+
+    results = analyze_bands(entries, parse_bands("730-790, amide I: 1640-1690"))
+    table = convergence_table(results)    # one row per camera, cycle and band
+
+BandSNR follows the ROA-to-noise ratio of the bands as cycles are added
+(e.g. while acquiring), from the cycle-to-cycle increments of the band
+integrals.
+
+All cycles of one camera are stacked into one (cycles, points, columns)
+array. The bands become trapezoid weights (points, bands), so every band
+of every cycle is integrated by one matrix product. Peaks are found per
+band by one argmax over all cycles.
+"""
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks, peak_widths
+from cycle_stats import group_cycles
+from data_processor import noise_levels
+from file_loader import CHANNELS, MODALITIES, channel
+from instrumentation import timed
+
+TABLE_COLUMNS = ["Camera", "Cycle", "Band", "Raman", "ROA", "CID", "CID change",
+                 "SNR", "Raman peak", "ROA peak"]
+
+_BAND_RE = re.compile(r"^\s*(?:(?P<name>[^:]+):)?\s*(?P<lo>-?[\d.]+)\s*-\s*(?P<hi>-?[\d.]+)\s*$")
+
+
+@dataclass(frozen=True)
+class Band:
+    name: str
+    lo: float   # cm⁻¹
+    hi: float
+
+
+def parse_bands(text: str) -> List[Band]:
+    """
+    Bands from text like ``"730-790, amide I: 1640-1690"``; bands without a
+    name are named by their range. Raises ValueError on anything else.
+    """
+    bands = []
+    for part in filter(str.strip, re.split(r"[,;\n]", text)):
+        m = _BAND_RE.match(part)
+        if m is None:
+            raise ValueError(f"not a band: {part.strip()!r} (expected [name:] from-to)")
+        lo, hi = sorted((float(m.group("lo")), float(m.group("hi"))))
+        name = (m.group("name") or "").strip() or f"{lo:g}-{hi:g}"
+        bands.append(Band(name, lo, hi))
+    return bands
+
+
+def format_bands(bands: Iterable[Band]) -> str:
+    """The text parse_bands() reads back as bands."""
+    return ", ".join(b.name if b.name == f"{b.lo:g}-{b.hi:g}" else f"{b.name}: {b.lo:g}-{b.hi:g}"
+                     for b in bands)
+
+
+def band_slices(x: np.ndarray, bands: Iterable[Band]) -> List[slice]:
+    """Index range of each band on the ascending grid x."""
+    return [slice(int(np.searchsorted(x, b.lo)), int(np.searchsorted(x, b.hi, side="right")))
+            for b in bands]
+
+
+def band_weights(x: np.ndarray, bands: Iterable[Band]) -> np.ndarray:
+    """
+    Trapezoid weights (points, bands): Y @ W integrates every band of
+    every row of Y over the points of x within the band. A band with
+    fewer than two points integrates to 0.
+    """
+    x = np.asarray(x, dtype=float)
+    bands = list(bands)
+    W = np.zeros((len(x), len(bands)))
+    for j, s in enumerate(band_slices(x, bands)):
+        if s.stop - s.start < 2:
+            continue
+        dx = np.diff(x[s]) / 2
+        W[s.start:s.stop - 1, j] += dx
+        W[s.start + 1:s.stop, j] += dx
+    return W
+
+
+def stack_cycles(entries: Iterable[dict], cam: str):
+    """
+    The cumulative spectra of one camera's cycles as one array.
+
+    Returns (cycles, x, columns, stack) with stack of shape (cycles,
+    points, columns), cycles in order. Cycles on a grid other than the
+    first cycle's are left out. Reads the bodies of lazy entries.
+    """
+    cycles, order, _ = group_cycles(entries)
+    members = [(c, cycles[c][cam]) for c in order if cam in cycles[c]]
+    if not members:
+        return [], np.empty(0), [], np.empty((0, 0, 0))
+    frames = [e['data'] for _, e in members]
+    x = frames[0]["Wavenumber"].to_numpy(dtype=float)
+    keep = [k for k, df in enumerate(frames) if len(df) == len(x)]
+    present = set().union(*(frames[k].columns for k in keep))
+    columns = [c for c in CHANNELS if c in present]
+    stack = np.empty((len(keep), len(x), len(columns)))
+    layout = ["Wavenumber"] + columns
+    for i, k in enumerate(keep):
+        df = frames[k]
+        if list(df.columns) == layout:   # the usual case: one copy of the whole frame
+            stack[i] = df.to_numpy(dtype=float)[:, 1:]
+            continue
+        for j, col in enumerate(columns):
+            stack[i, :, j] = channel(df, col)
+    return [members[k][0] for k in keep], x, columns, stack
+
+
+@dataclass
+class BandResult:
+    """Band integrals and peak positions of one camera, per cycle (rows) and band (columns)."""
+    camera: str
+    cycles: list
+    bands: List[Band]
+    raman: np.ndarray        # (cycles, bands) integrals
+    roa: np.ndarray
+    raman_peak: np.ndarray   # (cycles, bands) wavenumber of the Raman maximum, NaN: band off the grid
+    roa_peak: np.ndarray     # wavenumber of the largest |ROA|
+
+    @property
+    def cid(self) -> np.ndarray:
+        """ROA over Raman integral of each cycle and band (NaN where Raman is 0)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.raman != 0, self.roa / self.raman, np.nan)
+
+    @property
+    def cid_change(self) -> np.ndarray:
+        """Relative change of the CID from the previous cycle (NaN for the first)."""
+        cid = self.cid
+        change = np.full_like(cid, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change[1:] = np.abs(np.diff(cid, axis=0)) / np.abs(cid[1:])
+        return change
+
+    def extended(self, later: "BandResult") -> "BandResult":
+        """This result followed by the cycles of a later one (same camera and bands)."""
+        return BandResult(self.camera, self.cycles + later.cycles, self.bands,
+                          *(np.vstack([getattr(self, f), getattr(later, f)])
+                            for f in ("raman", "roa", "raman_peak", "roa_peak")))
+
+    def snr(self) -> np.ndarray:
+        """BandSNR of the ROA integrals after each cycle, shape (cycles, bands)."""
+        tracker = BandSNR(len(self.bands))
+        for cycle, roa in zip(self.cycles, self.roa):
+            tracker.add(cycle, roa)
+        return tracker.curve
+
+
+class BandSNR:
+    """
+    Running ROA-to-noise ratio of bands, updated one cycle at a time.
+
+    add() takes the cumulative ROA integral of every band after a cycle.
+    Its increment over the previous cycle is what that cycle contributed;
+    the mean m and scatter σ of the increments so far are kept with
+    Welford's method, so an update is O(bands). The cumulative integral
+    of n cycles is n·m with noise σ·√n, giving SNR = √n·|m|/σ: it grows
+    as √n while the acquisition is stable. It needs two cycles (NaN before).
+    """
+    def __init__(self, n_bands: int):
+        self.count = 0
+        self._mean = np.zeros(n_bands)
+        self._m2 = np.zeros(n_bands)
+        self._last = np.zeros(n_bands)   # cumulative integral of the previous cycle
+        self.cycles: list = []
+        self._curve: list = []
+
+    def add(self, cycle, roa_integral: np.ndarray) -> np.ndarray:
+        """Add the next cycle (in acquisition order); returns the new SNR per band."""
+        roa_integral = np.asarray(roa_integral, dtype=float)
+        d = roa_integral - self._last
+        self._last = roa_integral
+        self.count += 1
+        step = d - self._mean
+        self._mean += step / self.count
+        self._m2 += step * (d - self._mean)
+        snr = self.snr()
+        self.cycles.append(cycle)
+        self._curve.append(snr)
+        return snr
+
+    def snr(self) -> np.ndarray:
+        n = self.count
+        if n < 2:
+            return np.full(len(self._mean), np.nan)
+        sigma = np.sqrt(self._m2 / (n - 1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(sigma > 0, np.sqrt(n) * np.abs(self._mean) / sigma, np.inf)
+
+    def cycles_to(self, target: float) -> np.ndarray:
+        """Further cycles until each band reaches SNR target at √n growth (0: reached)."""
+        snr = self.snr()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            needed = np.ceil(self.count * (target / snr) ** 2) - self.count
+        return np.where(snr >= target, 0.0, needed)
+
+    @property
+    def curve(self) -> np.ndarray:
+        """SNR after each added cycle, shape (cycles, bands)."""
+        return np.array(self._curve).reshape(len(self._curve), len(self._mean))
+
+
+def _peaks(x: np.ndarray, Y: np.ndarray, slices: List[slice]) -> np.ndarray:
+    """Wavenumber of the maximum of each band of each row of Y (rows, points)."""
+    out = np.full((len(Y), len(slices)), np.nan)
+    for j, s in enumerate(slices):
+        if s.stop > s.start:
+            out[:, j] = x[s][np.argmax(Y[:, s], axis=1)]
+    return out
+
+
+def band_result(cam: str, cycles: list, x: np.ndarray, columns: List[str],
+                stack: np.ndarray, bands: List[Band], modality: str = "SCP") -> BandResult:
+    """Integrate and peak-pick the bands of one modality in a stack from stack_cycles()."""
+    r_col, o_col = MODALITIES[modality]
+    raman = stack[:, :, columns.index(r_col)] if r_col in columns else np.zeros(stack.shape[:2])
+    roa = stack[:, :, columns.index(o_col)] if o_col in columns else np.zeros(stack.shape[:2])
+    W = band_weights(x, bands)
+    slices = band_slices(x, bands)
+    return BandResult(cam, list(cycles), list(bands), raman @ W, roa @ W,
+                      _peaks(x, raman, slices), _peaks(x, np.abs(roa), slices))
+
+
+@timed("analyze_bands")
+def analyze_bands(entries: Iterable[dict], bands: List[Band], modality: str = "SCP",
+                  cams: Iterable[str] = ("A", "B")) -> Dict[str, BandResult]:
+    """band_result() of every camera with cycles among one experiment's entries."""
+    entries = [e for e in entries if isinstance(e['file_index'], int)]
+    results = {}
+    for cam in cams:
+        cycles, x, columns, stack = stack_cycles(entries, cam)
+        if cycles:
+            results[cam] = band_result(cam, cycles, x, columns, stack, bands, modality)
+    return results
+
+
+def convergence_table(results: Dict[str, BandResult]) -> pd.DataFrame:
+    """
+    One row per camera, cycle and band with the columns of TABLE_COLUMNS;
+    bands outside a camera's range have no rows for that camera.
+    """
+    parts = []
+    for cam, res in sorted(results.items()):
+        n, b = res.raman.shape
+        parts.append(pd.DataFrame({
+            "Camera": cam,
+            "Cycle": np.repeat(res.cycles, b),
+            "Band": [band.name for band in res.bands] * n,
+            "Raman": res.raman.ravel(),
+            "ROA": res.roa.ravel(),
+            "CID": res.cid.ravel(),
+            "CID change": res.cid_change.ravel(),
+            "SNR": res.snr().ravel(),
+            "Raman peak": res.raman_peak.ravel(),
+            "ROA peak": res.roa_peak.ravel(),
+        }))
+    if not parts:
+        return pd.DataFrame(columns=TABLE_COLUMNS)
+    table = pd.concat(parts, ignore_index=True)
+    return table[table["Raman peak"].notna()].reset_index(drop=True)
+
+
+def detect_bands(x: np.ndarray, y: np.ndarray, max_bands: int = 8,
+                 min_snr: float = 10.0) -> List[Band]:
+    """
+    The most prominent peaks of a (Raman) spectrum as bands spanning their
+    full width at half prominence, in wavenumber order. Peaks must stand
+    out from the noise (noise_levels()) by at least min_snr.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if len(y) < 3:
+        return []
+    noise = float(noise_levels(y[None, :])[0]) or float(np.ptp(y)) * 1e-3
+    peaks, props = find_peaks(y, prominence=min_snr * noise)
+    if not len(peaks):
+        return []
+    top = np.sort(peaks[np.argsort(props["prominences"])[::-1][:max_bands]])
+    _, _, left, right = peak_widths(y, top, rel_height=0.5)
+    idx = np.arange(len(x))
+    lo, hi = np.interp(left, idx, x), np.interp(right, idx, x)
+    return [Band(f"{x[p]:.0f}", round(float(a), 1), round(float(b), 1))
+            for p, a, b in zip(top, lo, hi)]
@@ -0,0 +1,258 @@
+# band_window.py
+import os
+import time
+import numpy as np
+from PyQt6.QtWidgets import (
+    QWidget, QHBoxLayout, QVBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox, QDoubleSpinBox,
+    QTableWidget, QTableWidgetItem, QSplitter, QFileDialog, QMessageBox
+)
+from PyQt6.QtCore import Qt
+from matplotlib import rcParams
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from band_analysis import (BandSNR, analyze_bands, convergence_table, detect_bands,
+                           format_bands, parse_bands)
+from cycle_stats import group_cycles
+from file_loader import MODALITIES, channel
+
+BAND_COLORS = rcParams['axes.prop_cycle'].by_key()['color']
+CAMERA_STYLES = {'A': '-', 'B': '--'}
+PROJECTION_SPAN = 3   # the √n projection reaches at most this many times the cycles so far
+
+
+class BandConvergenceWindow(QWidget):
+    """
+    Raman and ROA integrals of a list of bands in every cycle of one
+    experiment (band_analysis.py): a table of the newest cycle and the
+    ROA integral, CID and SNR of each band against the accumulated cycles.
+    Cycles arriving in live mode are added incrementally (add_cycle_entries).
+    """
+    SUMMARY_COLUMNS = ["Band", "Camera", "Raman", "ROA", "CID", "CID change",
+                       "SNR", "Cycles to target", "Raman peak", "ROA peak"]
+
+    def __init__(self, main_window, exp_name):
+        super().__init__()
+        self.main_window = main_window
+        self.exp_name = exp_name
+        self.setWindowTitle(f"Band convergence – {exp_name}")
+        self.resize(950, 650)
+        self.results = {}
+        self.snr = {}      # camera -> BandSNR of the analyzed bands
+        self.bands = []
+
+        # ── Band list and analysis controls ──
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Bands"))
+        self.edit_bands = QLineEdit(main_window.settings.value("bandList", ""))
+        self.edit_bands.setPlaceholderText("e.g. 730-790, amide I: 1640-1690")
+        self.edit_bands.setToolTip("Comma-separated wavenumber ranges, optionally named (name: from-to).")
+        self.edit_bands.returnPressed.connect(self.analyze)
+        controls.addWidget(self.edit_bands, 1)
+        self.btn_detect = QPushButton("Detect peaks")
+        self.btn_detect.setToolTip("Fill in the most prominent Raman peaks of the newest cycle.")
+        self.btn_detect.clicked.connect(self.on_detect)
+        controls.addWidget(self.btn_detect)
+        self.modality_combo = QComboBox()
+        self.modality_combo.addItems(MODALITIES)
+        checked = [mod for mod, on in main_window.get_modalities().items() if on]
+        if checked:
+            self.modality_combo.setCurrentText(checked[0])
+        self.modality_combo.currentIndexChanged.connect(self.analyze)
+        controls.addWidget(self.modality_combo)
+        self.btn_analyze = QPushButton("Analyze")
+        self.btn_analyze.clicked.connect(self.analyze)
+        controls.addWidget(self.btn_analyze)
+        controls.addWidget(QLabel("Target SNR"))
+        self.target_spin = QDoubleSpinBox()
+        self.target_spin.setRange(1, 1e6)
+        self.target_spin.setDecimals(0)
+        self.target_spin.setValue(main_window.settings.value("targetSNR", 100.0, type=float))
+        self.target_spin.setToolTip("ROA-to-noise ratio at which a band is measured well enough.")
+        self.target_spin.valueChanged.connect(self._on_target_changed)
+        controls.addWidget(self.target_spin)
+
+        # ── Newest-cycle table (left), convergence plot (right) ──
+        splitter = QSplitter(Qt.Orientation.Horizontal, self)
+        self.table = QTableWidget(0, len(self.SUMMARY_COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.SUMMARY_COLUMNS)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        splitter.addWidget(self.table)
+        self.figure = Figure(layout="tight")
+        self.canvas = FigureCanvas(self.figure)
+        self.ax_roa = self.figure.add_subplot(311)
+        self.ax_cid = self.figure.add_subplot(312, sharex=self.ax_roa)
+        self.ax_snr = self.figure.add_subplot(313)   # own x range: it extends into the projection
+        splitter.addWidget(self.canvas)
+        splitter.setSizes([int(0.45 * self.width()), int(0.55 * self.width())])
+
+        bottom = QHBoxLayout()
+        self.status = QLabel()
+        bottom.addWidget(self.status, 1)
+        self.btn_export = QPushButton("Export table…")
+        self.btn_export.setToolTip("Save the integrals of every cycle, camera and band as CSV.")
+        self.btn_export.clicked.connect(self.on_export)
+        bottom.addWidget(self.btn_export)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addWidget(splitter)
+        layout.addLayout(bottom)
+
+        if self.edit_bands.text().strip():
+            self.analyze()
+
+    def _entries(self):
+        return [e for e in self.main_window.data_entries
+                if e['name'] == self.exp_name and isinstance(e['file_index'], int)]
+
+    def on_detect(self):
+        cycles, order, _ = group_cycles(self._entries())
+        if not order:
+            return
+        r_col = MODALITIES[self.modality_combo.currentText()][0]
+        bands = []
+        for cam, e in sorted(cycles[order[-1]].items()):
+            df = e['data']
+            bands.extend(detect_bands(df["Wavenumber"].to_numpy(), channel(df, r_col), max_bands=6))
+        if not bands:
+            self.status.setText("No peaks stand out from the noise.")
+            return
+        self.edit_bands.setText(format_bands(sorted(bands, key=lambda b: b.lo)))
+        self.analyze()
+
+    def analyze(self):
+        try:
+            bands = parse_bands(self.edit_bands.text())
+        except ValueError as exc:
+            QMessageBox.warning(self, "Band convergence", str(exc))
+            return
+        if not bands:
+            return
+        self.main_window.settings.setValue("bandList", self.edit_bands.text())
+        t0 = time.perf_counter()
+        self.bands = bands
+        self.results = analyze_bands(self._entries(), bands, self.modality_combo.currentText())
+        self.snr = {}
+        for cam, res in self.results.items():
+            self.snr[cam] = BandSNR(len(bands))
+            for cycle, roa in zip(res.cycles, res.roa):
+                self.snr[cam].add(cycle, roa)
+        elapsed = time.perf_counter() - t0
+        self._fill_table()
+        self._draw()
+        n = max((len(res.cycles) for res in self.results.values()), default=0)
+        self.status.setText(f"{n} cycles × {len(bands)} bands × {len(self.results)} cameras "
+                            f"in {elapsed * 1000:.0f} ms. {self._target_summary()}")
+
+    def add_cycle_entries(self, entries):
+        """
+        Add newly acquired cycles: only they are integrated, and the SNR
+        estimators are updated, one O(points) step per cycle and camera.
+        Cycles older than the newest one analyzed mean a full re-analysis.
+        """
+        new = [e for e in entries if e['name'] == self.exp_name and isinstance(e['file_index'], int)]
+        if not new or not self.bands:
+            return
+        added = analyze_bands(new, self.bands, self.modality_combo.currentText())
+        if any(cam in self.results and res.cycles[0] <= self.results[cam].cycles[-1]
+               for cam, res in added.items()):
+            self.analyze()
+            return
+        for cam, res in added.items():
+            self.results[cam] = self.results[cam].extended(res) if cam in self.results else res
+            tracker = self.snr.setdefault(cam, BandSNR(len(self.bands)))
+            for cycle, roa in zip(res.cycles, res.roa):
+                tracker.add(cycle, roa)
+        self._fill_table()
+        self._draw()
+        self.status.setText(f"Live: cycle {max(res.cycles[-1] for res in added.values())}. "
+                            f"{self._target_summary()}")
+
+    def _on_target_changed(self, value):
+        self.main_window.settings.setValue("targetSNR", value)
+        if self.results:
+            self._fill_table()
+            self._draw()
+            self.status.setText(self._target_summary())
+
+    def _target_summary(self) -> str:
+        """Which band (and camera) needs the most further cycles to reach the target SNR."""
+        target = self.target_spin.value()
+        worst = None   # (cycles to go, band name, camera)
+        for cam, tracker in self.snr.items():
+            for j, needed in enumerate(tracker.cycles_to(target)):
+                if np.isnan(self.results[cam].raman_peak[-1, j]) or not np.isfinite(needed):
+                    continue
+                if worst is None or needed > worst[0]:
+                    worst = (needed, self.bands[j].name, cam)
+        if worst is None:
+            return ""
+        if worst[0] == 0:
+            return f"All bands have reached SNR {target:g}."
+        return f"SNR {target:g} in about {worst[0]:.0f} more cycles (band {worst[1]}, camera {worst[2]})."
+
+    def _fill_table(self):
+        rows = []
+        target = self.target_spin.value()
+        for cam, res in sorted(self.results.items()):
+            cid, change = res.cid[-1], res.cid_change[-1]
+            snr, to_go = self.snr[cam].snr(), self.snr[cam].cycles_to(target)
+            for j, band in enumerate(res.bands):
+                if np.isnan(res.raman_peak[-1, j]):
+                    continue   # band outside this camera's range
+                rows.append([band.name, cam, f"{res.raman[-1, j]:.4g}", f"{res.roa[-1, j]:.4g}",
+                             f"{cid[j]:.3g}", f"{change[j]:.2%}" if np.isfinite(change[j]) else "",
+                             f"{snr[j]:.1f}" if np.isfinite(snr[j]) else "",
+                             f"{to_go[j]:.0f}" if np.isfinite(to_go[j]) else "",
+                             f"{res.raman_peak[-1, j]:.1f}", f"{res.roa_peak[-1, j]:.1f}"])
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, text in enumerate(row):
+                self.table.setItem(r, c, QTableWidgetItem(text))
+        self.table.resizeColumnsToContents()
+
+    def _draw(self):
+        for ax in (self.ax_roa, self.ax_cid, self.ax_snr):
+            ax.clear()
+        for cam, res in sorted(self.results.items()):
+            tracker = self.snr[cam]
+            curve = tracker.curve
+            for j, band in enumerate(res.bands):
+                if np.isnan(res.raman_peak[-1, j]):
+                    continue
+                style = dict(color=BAND_COLORS[j % len(BAND_COLORS)],
+                             linestyle=CAMERA_STYLES.get(cam, '-'), label=f"{band.name} ({cam})")
+                self.ax_roa.plot(res.cycles, res.roa[:, j], **style)
+                self.ax_cid.plot(res.cycles, res.cid[:, j], **style)
+                self.ax_snr.plot(tracker.cycles, curve[:, j], **style)
+                to_go = tracker.cycles_to(self.target_spin.value())[j]
+                if tracker.count >= 2 and np.isfinite(curve[-1, j]) and to_go > 0:
+                    # √n growth from the current estimate, until it reaches the target
+                    n = np.linspace(tracker.count, min(tracker.count + to_go,
+                                                       PROJECTION_SPAN * tracker.count), 50)
+                    self.ax_snr.plot(tracker.cycles[-1] + n - tracker.count,
+                                     curve[-1, j] * np.sqrt(n / tracker.count),
+                                     color=style['color'], linestyle=':', linewidth=0.8)
+        self.ax_snr.axhline(self.target_spin.value(), color="gray", linewidth=0.8)
+        self.ax_roa.set_ylabel("ROA integral")
+        self.ax_cid.set_ylabel("CID (ROA / Raman)")
+        self.ax_snr.set_ylabel("ROA SNR")
+        self.ax_snr.set_xlabel("Cycle")
+        if self.ax_roa.lines:
+            self.ax_roa.legend(fontsize="small", ncol=2)
+        self.canvas.draw_idle()
+
+    def on_export(self):
+        if not self.results:
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export band table",
+            os.path.join(self.main_window.working_dir, f"{self.exp_name}_bands.csv"), "CSV (*.csv)")
+        if not path:
+            return
+        try:
+            convergence_table(self.results).to_csv(path, index=False)
+        except OSError as exc:
+            QMessageBox.warning(self, "Export band table", f"Could not write the table:\n{exc}")
+            return
+        self.status.setText(f"Wrote {os.path.basename(path)}")
@@ -1,9 +1,12 @@
 # baseline_manager.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, Iterable, Callable
+from typing import Dict, Iterable, Callable, List
 import numpy as np
 import pandas as pd
+from baseline_methods import compute_baseline
+from instrumentation import timed
+from pyramid import invalidate
 
 # Map UI modality toggles → Raman column names
 MOD_TO_COL = {
@@ -19,6 +22,15 @@ class BaselineParams:
     p: float = 0.01           # ALS asymmetry parameter
     niter: int = 10           # ALS iterations
     start_wavenumber: float = 0.0  # from which wavenumber to start fitting
+    method: str = "als"       # key of baseline_methods.BASELINE_METHODS
+    order: int = 3            # polynomial order ("poly")
+    half_window: int = 50     # ball radius in points ("rolling_ball")
+
+@dataclass
+class BaselineBatch:
+    """Channels with the same fitted length, fitted together as one 2D array."""
+    Y: np.ndarray     # one fitted tail per row
+    targets: list     # per row: (entry baselines dict, column, start index, full spectrum)
 
 class BaselineManager:
     """
@@ -29,21 +41,37 @@ class BaselineManager:
     """
     def __init__(self,
                  uid_fn: Callable[[dict], str],
-                 als_fn: Callable[..., np.ndarray]):
+                 als_fn: Callable[..., np.ndarray] | None = None):
         self._uid_fn = uid_fn
-        self._als_fn = als_fn
+        self._als_fn = als_fn   # overrides the registry's "als" method if given
         self._cache: Dict[str, Dict[str, np.ndarray]] = {}
+        self._params: Dict[str, BaselineParams] = {}   # what each cached baseline was fitted with
 
     # ---------- Public API ----------
+    @timed("BaselineManager.create")
     def create(self,
                entries: Iterable[dict],
                mods: Dict[str, bool],
                params: BaselineParams) -> None:
-        """Compute and attach baselines to each entry in-place."""
+        """
+        Compute and attach baselines to each entry in-place. Channels of equal
+        length are fitted together as one 2D batch.
+        """
+        for batch in self.plan(entries, mods, params):
+            self.apply(batch, self._fit(batch.Y, params))
+
+    def plan(self,
+             entries: Iterable[dict],
+             mods: Dict[str, bool],
+             params: BaselineParams) -> List[BaselineBatch]:
+        """
+        First half of create(): reset and register the entries' baselines
+        and return the batches to fit. Fit them anywhere (e.g. in a
+        ComputeServer) and hand each result to apply().
+        """
+        jobs = []   # (entry baselines, column, idx0, y)
         for e in entries:
             e.pop("baselines", None)  # reset
-            uid = self._uid_fn(e)
-
             df: pd.DataFrame = e["data"]
             x = df["Wavenumber"].to_numpy()
             idx0 = np.searchsorted(x, params.start_wavenumber)
@@ -54,16 +82,31 @@ class BaselineManager:
                     continue
                 col = MOD_TO_COL.get(mod)
                 if col not in df.columns:
-                    continue
-                y = df[col].to_numpy()
-                y_tail = y[idx0:]
-                z_tail = self._als_fn(y_tail, lam=params.lam, p=params.p, niter=params.niter)
-                z = np.zeros_like(y)
-                z[idx0:] = z_tail
-                bas_dict[col] = z
-
+                    continue  # absent modality: all zeros, nothing to fit
+                jobs.append((bas_dict, col, idx0, df[col].to_numpy()))
             e["baselines"] = bas_dict
+            uid = self._uid_fn(e)
             self._cache[uid] = bas_dict
+            self._params[uid] = params
+
+        groups: Dict[int, list] = {}
+        for job in jobs:
+            groups.setdefault(len(job[3]) - job[2], []).append(job)
+        batches = []
+        for length, group in groups.items():
+            batch = BaselineBatch(np.vstack([y[idx0:] for _, _, idx0, y in group]), group)
+            if length:
+                batches.append(batch)
+            else:   # fitting starts past the end: nothing to fit
+                self.apply(batch, batch.Y)
+        return batches
+
+    def apply(self, batch: BaselineBatch, Z: np.ndarray) -> None:
+        """Attach the fitted tails Z of a batch from plan()."""
+        for (bas_dict, col, idx0, y), z_tail in zip(batch.targets, Z):
+            z = np.zeros_like(y)
+            z[idx0:] = z_tail
+            bas_dict[col] = z
 
     def subtract(self, entries: Iterable[dict],) -> None:
         """Subtract cached/attached baselines from spectra in-place, then clear them so repeat subtract does nothing."""
@@ -79,6 +122,7 @@ class BaselineManager:
                 y = df[col].to_numpy()
                 new_y = y - z
                 df[col] = new_y
+            invalidate(df)
             self.clear([e])
 
 
@@ -86,15 +130,38 @@ class BaselineManager:
         """Remove baselines either globally or just for given entries."""
         if entries is None:
             self._cache.clear()
+            self._params.clear()
             return
         for e in entries:
             e.pop("baselines", None)
-            self._cache.pop(self._uid_fn(e), None)
+            uid = self._uid_fn(e)
+            self._cache.pop(uid, None)
+            self._params.pop(uid, None)
 
     def has_any(self, entries: Iterable[dict]) -> bool:
         return any(self._has_for_entry(e) for e in entries)
 
+    def params_for(self, entry: dict) -> BaselineParams | None:
+        """Parameters the entry's cached baseline was created with."""
+        return self._params.get(self._uid_fn(entry))
+
+    def snapshot(self) -> tuple[Dict[str, Dict[str, np.ndarray]], Dict[str, BaselineParams]]:
+        """Cached baselines and their parameters by UID (see session.py)."""
+        return dict(self._cache), dict(self._params)
+
+    def restore(self, cache: Dict[str, Dict[str, np.ndarray]],
+                params: Dict[str, BaselineParams]) -> None:
+        """Replace the cache with a snapshot; attached to entries on first use."""
+        self._cache = dict(cache)
+        self._params = dict(params)
+
     # ---------- Internals ----------
+    def _fit(self, Y: np.ndarray, params: BaselineParams) -> np.ndarray:
+        if params.method == "als" and self._als_fn is not None:
+            return np.vstack([self._als_fn(y, lam=params.lam, p=params.p, niter=params.niter)
+                              for y in Y])
+        return compute_baseline(Y, params)
+
     def _has_for_entry(self, entry: dict) -> bool:
         return ("baselines" in entry and entry["baselines"]) or \
                (self._uid_fn(entry) in self._cache)
@@ -0,0 +1,136 @@
+# baseline_methods.py
+"""
+Registry of baseline algorithms.
+
+Every method takes a 2D array (one spectrum per row, all of the same
+length) and the BaselineParams, and returns the baselines in the same
+shape; compute_baseline() also accepts a single 1D spectrum.
+
+    als          asymmetric least squares (Eilers & Boelens), the reference
+    arpls        asymmetrically reweighted penalized least squares (Baek et al.)
+    airpls       adaptive iteratively reweighted penalized least squares (Zhang et al.)
+    poly         iterative modified polynomial fit (Lieber & Mahadevan-Jansen)
+    rolling_ball morphological opening + smoothing, no iterations
+
+The penalized methods share one banded system per spectrum length and
+solve it per row; poly and rolling_ball are vectorized over all rows.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+import numpy as np
+from numpy.polynomial import polynomial as P
+from scipy.ndimage import grey_opening, uniform_filter1d
+from data_processor import baseline_als, penalty_bands, weighted_smooth
+
+
+@dataclass(frozen=True)
+class BaselineMethod:
+    name: str
+    label: str                 # shown in the method combo box
+    fn: Callable               # fn(Y 2D, params) -> Z 2D
+    params: Tuple[str, ...]    # BaselineParams fields the method reads
+
+
+BASELINE_METHODS: Dict[str, BaselineMethod] = {}
+
+
+def register(name: str, label: str, params: Tuple[str, ...]):
+    def deco(fn):
+        BASELINE_METHODS[name] = BaselineMethod(name, label, fn, params)
+        return fn
+    return deco
+
+
+def get_method(name: str) -> BaselineMethod:
+    try:
+        return BASELINE_METHODS[name]
+    except KeyError:
+        raise ValueError(f"unknown baseline method {name!r}; "
+                         f"known: {', '.join(BASELINE_METHODS)}") from None
+
+
+def compute_baseline(y: np.ndarray, params) -> np.ndarray:
+    """Baseline(s) of one spectrum (1D) or a stack of spectra (2D) with params.method."""
+    y = np.asarray(y, dtype=float)
+    Y = np.atleast_2d(y)
+    if Y.shape[1] < 4:
+        return np.zeros_like(y)
+    Z = get_method(params.method).fn(Y, params)
+    return Z.reshape(y.shape)
+
+
+# ---------- Methods ----------
+@register("als", "ALS", ("lam", "p", "niter"))
+def _als(Y, params):
+    return np.vstack([baseline_als(y, lam=params.lam, p=params.p, niter=params.niter)
+                      for y in Y])
+
+
+@register("arpls", "arPLS", ("lam", "niter"))
+def _arpls(Y, params, ratio: float = 1e-3):
+    bands = penalty_bands(Y.shape[1], params.lam)
+    Z = np.empty_like(Y)
+    for row, y in enumerate(Y):
+        w = np.ones_like(y)
+        for _ in range(params.niter):
+            z = weighted_smooth(bands, w, y)
+            d = y - z
+            neg = d[d < 0]
+            if neg.size < 2:
+                break
+            m, s = neg.mean(), neg.std() or 1.0
+            # logistic weights: ~1 for noise around the baseline, ~0 above it
+            w_new = 0.5 * (1 - np.tanh(np.clip((d - (2 * s - m)) / s, -50, 50)))
+            done = np.linalg.norm(w - w_new) / np.linalg.norm(w) < ratio
+            w = w_new
+            if done:
+                break
+        Z[row] = z
+    return Z
+
+
+@register("airpls", "airPLS", ("lam", "niter"))
+def _airpls(Y, params):
+    bands = penalty_bands(Y.shape[1], params.lam)
+    Z = np.empty_like(Y)
+    for row, y in enumerate(Y):
+        w = np.ones_like(y)
+        total = np.abs(y).sum()
+        for t in range(1, params.niter + 1):
+            z = weighted_smooth(bands, w, y)
+            d = y - z
+            neg = d < 0
+            dssn = -d[neg].sum()
+            if dssn < 1e-3 * total or not neg.any():
+                break
+            w = np.zeros_like(y)
+            w[neg] = np.exp(np.minimum(t * -d[neg] / dssn, 50))
+            w[0] = w[-1] = np.exp(t * d[neg].max() / dssn)
+        Z[row] = z
+    return Z
+
+
+@register("poly", "Polynomial", ("order", "niter"))
+def _poly(Y, params, tol: float = 1e-3):
+    x = np.linspace(-1, 1, Y.shape[1])
+    V = P.polyvander(x, params.order)
+    pinv = np.linalg.pinv(V)   # least-squares fit shared by all rows
+    work = Y.copy()
+    active = np.arange(len(Y))   # rows still changing; converged rows stay as they are
+    for _ in range(params.niter):
+        W = work[active]
+        clipped = np.minimum(W, (W @ pinv.T) @ V.T)
+        change = np.linalg.norm(clipped - W, axis=1) / np.maximum(np.linalg.norm(W, axis=1), 1e-12)
+        work[active] = clipped
+        active = active[change >= tol]
+        if not active.size:
+            break
+    return (work @ pinv.T) @ V.T
+
+
+@register("rolling_ball", "Rolling ball", ("half_window",))
+def _rolling_ball(Y, params):
+    size = 2 * min(params.half_window, Y.shape[1] // 2) + 1
+    opened = grey_opening(Y, size=(1, size), mode='nearest')
+    return uniform_filter1d(opened, size, axis=1, mode='nearest')
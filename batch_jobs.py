@@ -0,0 +1,147 @@
+# batch_jobs.py
+"""
+Batch processing of whole experiments.
+
+A Recipe says what to do with each experiment (despike, sum its cycles,
+normalize, subtract a baseline, merge cameras A and B, export);
+process_experiment() runs it through the memoized pipeline (pipeline.py)
+and JobQueue runs it for many experiments in a thread pool, with per-job
+progress, retries and a results summary.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from PyQt6.QtCore import QObject, pyqtSignal
+from baseline_manager import BaselineParams
+from instrumentation import span
+from pipeline import PIPELINE
+
+EXPORT_FORMATS = ("combined", "separate")
+
+
+@dataclass
+class Recipe:
+    output_dir: str
+    modalities: List[str] = field(default_factory=lambda: ["SCP"])
+    despike: bool = False            # remove cosmic-ray spikes from the cycles
+    sum_cycles: bool = True          # sum the Δs of all cycles (else: newest cycle as is)
+    reject_outliers: bool = False    # leave spiky/outlying cycles out of the sum
+    normalize: bool = False          # divide by the accumulation time
+    baseline: Optional[BaselineParams] = None  # subtract a baseline from Raman
+    merge: bool = True               # merge cameras A and B into one spectrum
+    export_format: str = "combined"  # one of EXPORT_FORMATS
+
+    def stages(self) -> List[str]:
+        return PIPELINE.active_stages(self)
+
+
+@dataclass
+class JobResult:
+    name: str
+    status: str = "pending"          # "ok", "failed" or "cancelled"
+    attempts: int = 0
+    outputs: List[str] = field(default_factory=list)
+    error: str = ""
+    seconds: float = 0.0
+
+
+def process_experiment(name: str, entries: List[dict], recipe: Recipe,
+                       progress: Callable[[int, int, str], None] | None = None) -> List[str]:
+    """
+    Apply recipe to one experiment's file entries; returns the written paths.
+    progress(stage number, number of stages, stage name) is called before each
+    stage. Stage results are memoized (see pipeline.py), so re-running with a
+    changed late-stage setting only recomputes from that stage on.
+    """
+    return PIPELINE.run(name, entries, recipe, progress).outputs
+
+
+class JobQueue(QObject):
+    """
+    Run a Recipe over many experiments in a pool of worker threads.
+
+    Each experiment is one job. A job failing with an I/O error (file still
+    being written, network share hiccup) is retried up to max_retries
+    times; other errors fail it at once. Signals are emitted from the
+    worker threads and delivered to receivers in the GUI thread.
+    """
+    job_progress = pyqtSignal(str, int, int, str)  # experiment, stage no., stages, stage
+    job_finished = pyqtSignal(object)              # JobResult
+    finished = pyqtSignal(list)                    # all JobResults, in submission order
+
+    def __init__(self, max_workers: int | None = None, max_retries: int = 1, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_retries = max_retries
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._results: Dict[str, JobResult] = {}
+        self._pending = 0
+        self._executor = None
+
+    def start(self, jobs: Dict[str, List[dict]], recipe: Recipe) -> None:
+        """jobs: experiment name -> its entries."""
+        self._cancel.clear()
+        self._results = {name: JobResult(name) for name in jobs}
+        self._pending = len(jobs)
+        if not jobs:
+            self.finished.emit([])
+            return
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="batch")
+        for name, entries in jobs.items():
+            self._executor.submit(self._run, name, entries, recipe)
+        self._executor.shutdown(wait=False)
+
+    def cancel(self) -> None:
+        """Jobs not started yet are skipped; running ones finish their attempt."""
+        self._cancel.set()
+
+    def is_running(self) -> bool:
+        return self._pending > 0
+
+    def results(self) -> List[JobResult]:
+        return list(self._results.values())
+
+    def _run(self, name, entries, recipe):
+        result = self._results[name]
+        t0 = time.perf_counter()
+        while result.attempts <= self.max_retries:
+            if self._cancel.is_set():
+                result.status = "cancelled"
+                break
+            result.attempts += 1
+            try:
+                with span("batch_job", experiment=name, attempt=result.attempts):
+                    result.outputs = process_experiment(
+                        name, entries, recipe,
+                        progress=lambda i, n, stage: self.job_progress.emit(name, i, n, stage))
+                result.status, result.error = "ok", ""
+                break
+            except OSError as exc:
+                result.status, result.error = "failed", f"{type(exc).__name__}: {exc}"
+            except Exception as exc:  # reported per job; the batch goes on
+                result.status, result.error = "failed", f"{type(exc).__name__}: {exc}"
+                break
+        result.seconds = time.perf_counter() - t0
+        self.job_finished.emit(result)
+        with self._lock:
+            self._pending -= 1
+            done = self._pending == 0
+        if done:
+            self.finished.emit(self.results())
+
+
+def summarize(results: List[JobResult]) -> str:
+    """Human-readable summary of a finished batch."""
+    counts = {s: sum(1 for r in results if r.status == s) for s in ("ok", "failed", "cancelled")}
+    n_files = sum(len(r.outputs) for r in results if r.status == "ok")
+    lines = [f"{counts['ok']} succeeded, {counts['failed']} failed, "
+             f"{counts['cancelled']} cancelled; {n_files} files written."]
+    for r in results:
+        if r.status == "failed":
+            lines.append(f"{r.name}: {r.error} (after {r.attempts} attempts)")
+    return "\n".join(lines)
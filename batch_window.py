@@ -0,0 +1,193 @@
+# batch_window.py
+import os
+from PyQt6.QtWidgets import (
+    QWidget, QListWidget, QListWidgetItem, QPushButton, QVBoxLayout, QHBoxLayout,
+    QCheckBox, QComboBox, QFormLayout, QGroupBox, QLineEdit, QSpinBox, QLabel,
+    QTableWidget, QTableWidgetItem, QProgressBar, QFileDialog, QMessageBox, QSplitter
+)
+from PyQt6.QtCore import Qt
+from batch_jobs import JobQueue, Recipe, summarize
+
+
+class BatchProcessingWindow(QWidget):
+    """
+    Apply one processing recipe to many experiments: despike, sum cycles, normalize,
+    subtract a baseline (parameters of the main window's baseline panel),
+    merge cameras and export, with one job per experiment.
+    """
+    COLUMNS = ["Experiment", "Progress", "Status", "Attempts", "Result"]
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.setWindowTitle("Batch processing")
+        self.resize(900, 550)
+        self.queue = None
+        self._rows = {}
+
+        splitter = QSplitter(Qt.Orientation.Horizontal, self)
+
+        # ── Left panel: experiments + recipe ──
+        left = QWidget()
+        left_layout = QVBoxLayout(left)
+        left_layout.addWidget(QLabel("Experiments"))
+        self.list_widget = QListWidget()
+        selected = {e['name'] for e in main_window.get_selected_entries()}
+        names = sorted({e['name'] for e in main_window.data_entries
+                        if isinstance(e['file_index'], int)})
+        for name in names:
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if not selected or name in selected
+                               else Qt.CheckState.Unchecked)
+            self.list_widget.addItem(item)
+        left_layout.addWidget(self.list_widget)
+
+        grp = QGroupBox("Recipe")
+        form = QFormLayout()
+        self.chk_despike = QCheckBox("Remove cosmic spikes")
+        self.chk_despike.setChecked(main_window.despike)
+        self.chk_sum = QCheckBox("Sum all cycles (otherwise: newest cycle)")
+        self.chk_sum.setChecked(True)
+        self.chk_reject = QCheckBox("Leave outlier cycles out of the sum")
+        self.chk_sum.toggled.connect(self.chk_reject.setEnabled)
+        self.chk_norm = QCheckBox("Normalize by accumulation time")
+        self.chk_norm.setChecked(main_window.normalized)
+        self.chk_baseline = QCheckBox("Subtract baseline (Raman Baseline Removal settings)")
+        self.chk_merge = QCheckBox("Merge cameras A and B")
+        self.chk_merge.setChecked(True)
+        for cb in (self.chk_despike, self.chk_sum, self.chk_reject, self.chk_norm, self.chk_baseline, self.chk_merge):
+            form.addRow(cb)
+
+        self.combo_format = QComboBox()
+        self.combo_format.addItem("Combined (all channels in one file)", "combined")
+        self.combo_format.addItem("Separate (Raman/ROA file per modality)", "separate")
+        form.addRow("Export:", self.combo_format)
+
+        out_row = QHBoxLayout()
+        self.edit_out = QLineEdit(os.path.join(main_window.working_dir, "batch"))
+        btn_browse = QPushButton("Browse…")
+        btn_browse.clicked.connect(self.on_browse)
+        out_row.addWidget(self.edit_out)
+        out_row.addWidget(btn_browse)
+        form.addRow("Output:", out_row)
+
+        self.spin_workers = QSpinBox()
+        self.spin_workers.setRange(1, max(1, os.cpu_count() or 1))
+        self.spin_workers.setValue(min(4, self.spin_workers.maximum()))
+        form.addRow("Workers:", self.spin_workers)
+        self.spin_retries = QSpinBox()
+        self.spin_retries.setRange(0, 5)
+        self.spin_retries.setValue(1)
+        self.spin_retries.setToolTip("Retries of a job that failed reading or writing files.")
+        form.addRow("Retries:", self.spin_retries)
+        grp.setLayout(form)
+        left_layout.addWidget(grp)
+
+        btns = QHBoxLayout()
+        self.btn_run = QPushButton("Run")
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.setEnabled(False)
+        btns.addWidget(self.btn_run)
+        btns.addWidget(self.btn_cancel)
+        left_layout.addLayout(btns)
+        self.btn_run.clicked.connect(self.on_run)
+        self.btn_cancel.clicked.connect(self.on_cancel)
+
+        # ── Right panel: job table ──
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+
+        splitter.addWidget(left)
+        splitter.addWidget(self.table)
+        splitter.setStretchFactor(1, 1)
+        layout = QVBoxLayout(self)
+        layout.addWidget(splitter)
+
+    def recipe(self) -> Recipe:
+        baseline = self.main_window.baseline_params() if self.chk_baseline.isChecked() else None
+        return Recipe(
+            output_dir=self.edit_out.text(),
+            modalities=[m for m, on in self.main_window.get_modalities().items() if on],
+            despike=self.chk_despike.isChecked(),
+            sum_cycles=self.chk_sum.isChecked(),
+            reject_outliers=self.chk_sum.isChecked() and self.chk_reject.isChecked(),
+            normalize=self.chk_norm.isChecked(),
+            baseline=baseline,
+            merge=self.chk_merge.isChecked(),
+            export_format=self.combo_format.currentData(),
+        )
+
+    def on_browse(self):
+        out_dir = QFileDialog.getExistingDirectory(self, "Select Output Directory", self.edit_out.text())
+        if out_dir:
+            self.edit_out.setText(out_dir)
+
+    def on_run(self):
+        names = [self.list_widget.item(i).text() for i in range(self.list_widget.count())
+                 if self.list_widget.item(i).checkState() == Qt.CheckState.Checked]
+        recipe = self.recipe()
+        if not names:
+            QMessageBox.warning(self, "Batch processing", "No experiments selected.")
+            return
+        if not recipe.modalities:
+            QMessageBox.warning(self, "Batch processing", "No modalities selected.")
+            return
+        jobs = {name: [] for name in names}
+        for e in self.main_window.data_entries:
+            if e['name'] in jobs and isinstance(e['file_index'], int):
+                jobs[e['name']].append(e)
+
+        self.table.setRowCount(len(names))
+        self._rows = {}
+        for row, name in enumerate(names):
+            self._rows[name] = row
+            self.table.setItem(row, 0, QTableWidgetItem(name))
+            bar = QProgressBar()
+            bar.setRange(0, len(recipe.stages()))
+            self.table.setCellWidget(row, 1, bar)
+            for col, text in ((2, "queued"), (3, "0"), (4, "")):
+                self.table.setItem(row, col, QTableWidgetItem(text))
+
+        self.queue = JobQueue(max_workers=self.spin_workers.value(),
+                              max_retries=self.spin_retries.value(), parent=self)
+        self.queue.job_progress.connect(self.on_job_progress)
+        self.queue.job_finished.connect(self.on_job_finished)
+        self.queue.finished.connect(self.on_finished)
+        self.btn_run.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.queue.start(jobs, recipe)
+
+    def on_cancel(self):
+        if self.queue is not None:
+            self.queue.cancel()
+
+    def on_job_progress(self, name, stage_no, n_stages, stage):
+        row = self._rows[name]
+        self.table.cellWidget(row, 1).setValue(stage_no)
+        self.table.item(row, 2).setText(stage)
+
+    def on_job_finished(self, result):
+        row = self._rows[result.name]
+        bar = self.table.cellWidget(row, 1)
+        if result.status == "ok":
+            bar.setValue(bar.maximum())
+        self.table.item(row, 2).setText(f"{result.status} ({result.seconds:.1f} s)")
+        self.table.item(row, 3).setText(str(result.attempts))
+        if result.outputs and not result.error:
+            self.table.item(row, 4).setText(
+                f"{len(result.outputs)} files in {os.path.dirname(result.outputs[0])}")
+        else:
+            self.table.item(row, 4).setText(result.error)
+
+    def on_finished(self, results):
+        self.btn_run.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+        QMessageBox.information(self, "Batch processing", summarize(results))
+
+    def closeEvent(self, event):
+        if self.queue is not None and self.queue.is_running():
+            self.queue.cancel()
+        super().closeEvent(event)
@@ -0,0 +1,333 @@
+# benchmarks/run.py
+"""
+Benchmark harness for the loading and processing hot paths.
+
+    python -m benchmarks.run                      # default sizes 10,100,1000
+    python -m benchmarks.run --sizes 10,10000 --only load
+    python -m benchmarks.run --save mymachine     # store as a baseline
+    python -m benchmarks.run --compare mymachine  # compare with a baseline
+
+Run from the repository root. Synthetic data (benchmarks/synthetic.py) is
+generated once per size under --data-dir and reused. Each case reports the
+median and best wall time over --repeat runs and the peak traced memory of
+one extra run. Plotting runs on Qt's offscreen platform with the Agg canvas.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate  # noqa: E402
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+CASES = []
+
+
+def case(name, sized=True, max_size=None):
+    """
+    Register a benchmark. The function gets (ctx, size) and returns the
+    zero-argument callable to time; setup happens before it is returned.
+    """
+    def deco(fn):
+        CASES.append({"name": name, "fn": fn, "sized": sized, "max_size": max_size})
+        return fn
+    return deco
+
+
+class Context:
+    """Lazily generated data directories and shared objects."""
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._app = None
+
+    def directory(self, size):
+        path = os.path.join(self.data_dir, f"cycles_{size}")
+        marker = os.path.join(path, ".complete")
+        if not os.path.exists(marker):
+            generate(path, size, spikes=max(1, size // 50))
+            open(marker, "w").close()
+        return path
+
+    def entries(self, size):
+        from file_loader import load_data_files
+        return load_data_files(self.directory(size))
+
+    def qt_app(self):
+        if self._app is None:
+            from PyQt6.QtWidgets import QApplication
+            self._app = QApplication.instance() or QApplication([])
+        return self._app
+
+
+# ---------- Cases ----------
+@case("load")
+def bench_load(ctx, size):
+    from file_loader import load_data_files, clear_cache
+    directory = ctx.directory(size)
+
+    def run():
+        clear_cache()
+        load_data_files(directory)
+    return run
+
+
+@case("load_cached")
+def bench_load_cached(ctx, size):
+    from file_loader import load_data_files
+    directory = ctx.directory(size)
+    load_data_files(directory)
+    return lambda: load_data_files(directory)
+
+
+@case("load_lazy")
+def bench_load_lazy(ctx, size):
+    from file_loader import load_data_files, clear_cache
+    directory = ctx.directory(size)
+
+    def run():
+        clear_cache()
+        load_data_files(directory, lazy=True)
+    return run
+
+
+@case("load_despike")
+def bench_load_despike(ctx, size):
+    from file_loader import load_data_files, clear_cache
+    directory = ctx.directory(size)
+
+    def run():
+        clear_cache()
+        load_data_files(directory, despike=True)
+    return run
+
+
+@case("baseline_als", sized=False)
+def bench_als(ctx, size):
+    from data_processor import baseline_als
+    entry = ctx.entries(10)[0]
+    y = entry["data"]["SCP Raman"].to_numpy()
+    return lambda: baseline_als(y, lam=1e5, p=1e-5, niter=100)
+
+
+def _baseline_method_case(method):
+    def bench(ctx, size):
+        import numpy as np
+        from baseline_manager import BaselineParams
+        from baseline_methods import compute_baseline
+        Y = np.vstack([e["data"]["SCP Raman"].to_numpy() for e in ctx.entries(size)])
+        params = BaselineParams(lam=1e5, p=1e-5, niter=100, method=method)
+        return lambda: compute_baseline(Y, params)
+    return bench
+
+
+for _method in ("als", "arpls", "airpls", "poly", "rolling_ball"):
+    case(f"baseline_{_method}", max_size=100)(_baseline_method_case(_method))
+
+
+@case("merge_a_b", sized=False)
+def bench_merge(ctx, size):
+    from data_processor import merge_a_b
+    entries = ctx.entries(10)
+    a = next(e for e in entries if e["camera"] == "A")["data"]
+    b = next(e for e in entries if e["camera"] == "B")["data"]
+    return lambda: merge_a_b(a, b)
+
+
+@case("deltas_sum")
+def bench_deltas(ctx, size):
+    from cycle_stats import CycleAccumulator, group_cycles
+    cycles, order, prev = group_cycles(ctx.entries(size))
+
+    def run():
+        acc = CycleAccumulator(cycles, prev)
+        for c in order:
+            acc.add(c)
+        acc.frame("A"), acc.frame("B")
+    return run
+
+
+@case("outlier_rejection")
+def bench_outliers(ctx, size):
+    from cycle_stats import CycleAccumulator, group_cycles, find_outlier_cycles
+    cycles, order, prev = group_cycles(ctx.entries(size))
+    acc = CycleAccumulator(cycles, prev)
+    for c in order:
+        acc.delta(c, "A"), acc.delta(c, "B")
+    return lambda: find_outlier_cycles(acc, order)
+
+
+@case("band_analysis")
+def bench_bands(ctx, size):
+    from band_analysis import analyze_bands, convergence_table, parse_bands
+    entries = ctx.entries(size)
+    bands = parse_bands("300-340, 900-1000, 1000-1100, 1200-1350, 1600-1700, 2900-3000")
+    return lambda: convergence_table(analyze_bands(entries, bands))
+
+
+@case("band_snr_live_cycle")
+def bench_band_snr(ctx, size):
+    from band_analysis import BandSNR, analyze_bands, parse_bands
+    entries = [e for e in ctx.entries(size) if e["camera"] == "A"]
+    bands = parse_bands("300-340, 900-1000, 1000-1100, 1200-1350, 1600-1700")
+    tracker = BandSNR(len(bands))
+    history = analyze_bands(entries[:-1], bands)["A"]
+    for cycle, roa in zip(history.cycles, history.roa):
+        tracker.add(cycle, roa)
+
+    def run():   # one newly acquired cycle
+        res = analyze_bands(entries[-1:], bands)["A"]
+        tracker.add(res.cycles[0], res.roa[0])
+    return run
+
+
+@case("session_roundtrip")
+def bench_session(ctx, size):
+    import copy
+    import numpy as np
+    from file_loader import load_data_files
+    from session import load_session, save_session
+    entries = load_data_files(ctx.directory(size), lazy=True)
+    corrected = copy.deepcopy(entries[0])   # like "Subtract baseline" on a lazy cycle
+    corrected["data"]["SCP Raman"] -= 1.0
+    corrected["file_index"] = f"{corrected['file_index']}_blcorr"
+    entries.append(corrected)
+    path = os.path.join(tempfile.mkdtemp(prefix="roapy-bench-"), "session.npz")
+
+    def run():
+        save_session(path, entries, {}, {}, {})
+        return load_session(path)
+
+    save_session(path, entries, {}, {}, {})
+    st = os.stat(corrected["path"])   # a touched source file must not replace the correction
+    os.utime(corrected["path"], ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    restored = load_session(path).entries[-1]
+    if not np.array_equal(restored["data"]["SCP Raman"].to_numpy(),
+                          corrected["data"]["SCP Raman"].to_numpy()):
+        raise AssertionError("session lost the baseline-corrected spectrum")
+    return run
+
+
+@case("selection_select_all", max_size=1000)
+def bench_selection_window(ctx, size):
+    ctx.qt_app()
+    from selection_cycles import SelectionOfCyclesWindow
+
+    class _Main:
+        data_entries = ctx.entries(size)
+
+    def run():
+        win = SelectionOfCyclesWindow(_Main(), "bench")
+        win.select_all()
+        win.canvas.draw()
+        win.deleteLater()
+    return run
+
+
+@case("update_plot")
+def bench_update_plot(ctx, size):
+    ctx.qt_app()
+    from plotter import SpectraPlotter
+    plotter = SpectraPlotter(None)
+    plotter.canvas.resize(900, 700)
+    entries = ctx.entries(size)[:min(size, 100)]
+    mods = {"SCP": True}
+    return lambda: plotter.update_plot(entries, mods)
+
+
+# ---------- Runner ----------
+def measure(fn, repeat):
+    t0 = time.perf_counter()
+    fn()  # warm-up
+    if time.perf_counter() - t0 > 2.0:
+        repeat = 1  # very slow case: one timed run is enough
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_ms": statistics.median(times) * 1e3,
+            "min_ms": min(times) * 1e3,
+            "peak_mib": peak / 2**20}
+
+
+def run_all(sizes, only, repeat, data_dir):
+    ctx = Context(data_dir)
+    results = {}
+    for c in CASES:
+        if only and not any(o in c["name"] for o in only):
+            continue
+        for size in (sizes if c["sized"] else [None]):
+            if c["max_size"] and size > c["max_size"]:
+                continue
+            key = c["name"] if size is None else f"{c['name']}[{size}]"
+            fn = c["fn"](ctx, size)
+            results[key] = measure(fn, repeat)
+            r = results[key]
+            print(f"{key:<32} {r['median_ms']:>10.2f} ms  (min {r['min_ms']:.2f})"
+                  f"  peak {r['peak_mib']:.1f} MiB", flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print per-case ratios against a stored baseline; returns #regressions."""
+    regressions = 0
+    print(f"\n{'case':<32} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for key, r in results.items():
+        b = baseline.get(key)
+        if b is None:
+            print(f"{key:<32} {'-':>10} {r['median_ms']:>10.2f}")
+            continue
+        ratio = r["median_ms"] / max(b["median_ms"], 1e-9)
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 - tolerance:
+            flag = "  faster"
+        print(f"{key:<32} {b['median_ms']:>10.2f} {r['median_ms']:>10.2f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ROApy benchmarks")
+    ap.add_argument("--sizes", default="10,100,1000",
+                    help="comma-separated cycle counts (10 to 10000)")
+    ap.add_argument("--only", default="", help="comma-separated case name filters")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "roapy-bench"))
+    ap.add_argument("--save", metavar="NAME", help="store results as baselines/NAME.json")
+    ap.add_argument("--compare", metavar="NAME", help="compare with baselines/NAME.json")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="relative slowdown reported as a regression")
+    args = ap.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    only = [s for s in args.only.split(",") if s]
+    results = run_all(sizes, only, args.repeat, args.data_dir)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nsaved baseline {path}")
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
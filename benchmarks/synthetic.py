@@ -0,0 +1,70 @@
+# benchmarks/synthetic.py
+"""
+Synthetic Zebr output files for benchmarking, scaled from examples/.
+
+Each camera's example spectrum is used as the per-cycle signal; cycles add
+Gaussian noise and are written cumulatively with the original header, the
+same ``%g`` number format and descending wavenumber order as the
+instrument, as ``<name>_<A|B>-<index>_out.txt``.
+"""
+import argparse
+import glob
+import os
+import re
+import numpy as np
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+
+
+def _templates():
+    """camera -> (header line, body array) from the bundled example files."""
+    out = {}
+    for path in sorted(glob.glob(os.path.join(EXAMPLES_DIR, "*_out.txt"))):
+        m = re.match(r".+_([AB])-\d+_out\.txt", os.path.basename(path))
+        if not m or m.group(1) in out:
+            continue
+        with open(path) as f:
+            header = f.readline()
+        out[m.group(1)] = (header, np.loadtxt(path, skiprows=1))
+    return out
+
+
+def generate(directory: str, n_cycles: int, name: str = "bench",
+             seed: int = 0, spikes: int = 0) -> list[str]:
+    """
+    Write n_cycles cumulative cycles per camera into directory.
+    ``spikes`` single-pixel cosmic-ray hits are added at random cycles.
+    Returns the written paths.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for cam, (header, body) in _templates().items():
+        x = body[:, 0]
+        signal = body[:, 1:]
+        noise = np.maximum(np.abs(signal).std(axis=0), 1.0) * 0.05
+        spike_at = {(int(rng.integers(n_cycles)), int(rng.integers(len(x)))) for _ in range(spikes)}
+        cum = np.zeros_like(signal)
+        for k in range(n_cycles):
+            delta = signal + rng.normal(0.0, 1.0, signal.shape) * noise
+            delta[:, ~signal.any(axis=0)] = 0.0  # keep absent modalities absent
+            for (kk, p) in spike_at:
+                if kk == k:
+                    delta[p, 0] += 50 * noise[0]
+            cum += delta
+            path = os.path.join(directory, f"{name}_{cam}-{k:03d}_out.txt")
+            with open(path, "w") as f:
+                f.write(header)
+                np.savetxt(f, np.column_stack([x, cum]), fmt="%g", delimiter="\t")
+            paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("directory")
+    ap.add_argument("cycles", type=int)
+    ap.add_argument("--spikes", type=int, default=0)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    print(f"wrote {len(generate(args.directory, args.cycles, seed=args.seed, spikes=args.spikes))} files")
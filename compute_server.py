@@ -0,0 +1,206 @@
+# compute_server.py
+"""
+Local compute service for the GUI.
+
+Heavy numerical work (baselines, A/B merges, cycle Δs, exports) runs in a
+pool of worker processes. It then neither competes with Qt and
+matplotlib for the GUI's GIL nor is limited to one core.
+
+Arrays travel through shared memory (shared_spectra.py). The GUI copies
+each input array once into a block that the worker maps; spectra
+already in a SpectrumStore are passed by descriptor and not copied at
+all. The worker writes its result into a new block that the GUI maps as
+is. Only block names, shapes and the small job parameters are pickled.
+
+    server = ComputeServer(parent=window)
+    server.submit("baseline", Y, params=asdict(params),
+                  on_done=lambda Z, error: ...)   # called in the GUI thread
+
+Jobs are registered with @job like the baseline methods; a job gets the
+mapped input arrays (or None) and keyword parameters and returns an
+array, a dict of arrays or a small picklable value.
+"""
+from __future__ import annotations
+import itertools
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import QObject, pyqtSignal
+from instrumentation import count
+from shared_spectra import SharedArray, SpectrumDescriptor, share, attach, adopt, release, open_array, detach
+
+
+# ---------- Arguments ----------
+def frame_array(df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
+    """A spectrum frame as one 2D float array plus its column names."""
+    return df.to_numpy(dtype=float), list(df.columns)
+
+
+# ---------- Jobs ----------
+JOBS: Dict[str, Callable] = {}
+
+
+def job(name: str):
+    def deco(fn):
+        JOBS[name] = fn
+        return fn
+    return deco
+
+
+@job("baseline")
+def _baseline_job(Y, params: dict):
+    from baseline_manager import BaselineParams
+    from baseline_methods import compute_baseline
+    return compute_baseline(Y, BaselineParams(**params))
+
+
+@job("merge")
+def _merge_job(a, b, columns_a: List[str], columns_b: List[str]):
+    from data_processor import merge_a_b
+    merged = merge_a_b(pd.DataFrame(a, columns=columns_a), pd.DataFrame(b, columns=columns_b))
+    return {col: merged[col].to_numpy() for col in merged.columns}
+
+
+@job("delta")
+def _delta_job(stack, prev=None):
+    """Δs of stacked cumulative spectra (cycles, points, columns); prev: the cycle before the first."""
+    out = np.empty_like(stack, dtype=float)
+    out[0] = stack[0] if prev is None else stack[0] - prev
+    np.subtract(stack[1:], stack[:-1], out=out[1:])
+    return out
+
+
+@job("export_combined")
+def _export_combined_job(a, b, sa=None, sb=None, *, columns_a: List[str], columns_b: List[str],
+                         path: str):
+    from data_processor import merge_a_b, merge_uncertainty
+    from exporter import export_combined
+    df_a, df_b = pd.DataFrame(a, columns=columns_a), pd.DataFrame(b, columns=columns_b)
+    sigma = None
+    if sa is not None and sb is not None:
+        sigma = merge_uncertainty(pd.DataFrame(sa, columns=columns_a),
+                                  pd.DataFrame(sb, columns=columns_b))
+    export_combined(path, merge_a_b(df_a, df_b), sigma)
+    return path
+
+
+@job("export_separately")
+def _export_separately_job(data, sigma=None, *, columns: List[str], base: str, camera: str,
+                           file_index, modalities: List[str], sigma_columns: List[str] = None):
+    from exporter import export_separately
+    entry = {"camera": camera, "file_index": file_index,
+             "data": pd.DataFrame(data, columns=columns)}
+    if sigma is not None:
+        entry["uncertainty"] = pd.DataFrame(sigma, columns=sigma_columns or columns)
+    export_separately(base, [entry], modalities)
+    return 2 * len(modalities)
+
+
+def _run_job(kind: str, descs, kwargs):
+    """Worker side: map the inputs, run the job, put array results in new blocks."""
+    blocks = [attach(desc) if isinstance(desc, SharedArray) else
+              (None, open_array(desc).T if isinstance(desc, SpectrumDescriptor) else None)
+              for desc in descs]
+    try:
+        return _export_result(JOBS[kind](*(arr for _, arr in blocks), **kwargs))
+    finally:
+        shms = [shm for shm, _ in blocks if shm is not None]
+        stores = {desc.block for desc in descs if isinstance(desc, SpectrumDescriptor)}
+        del blocks   # drop the views before unmapping
+        for shm in shms:
+            try:
+                shm.close()
+            except BufferError:   # a failed job's traceback still holds a view
+                pass
+        for name in stores:   # the GUI unlinks stores after the job: don't keep them mapped
+            detach(name)
+
+
+def _export_result(result):
+    if isinstance(result, np.ndarray):
+        shm, desc = share(result)
+        shm.close()   # the GUI adopts and unlinks it
+        return desc
+    if isinstance(result, dict):
+        return {k: _export_result(v) for k, v in result.items()}
+    return result
+
+
+def _import_result(result):
+    if isinstance(result, SharedArray):
+        return adopt(result)
+    if isinstance(result, dict):
+        return {k: _import_result(v) for k, v in result.items()}
+    return result
+
+
+# ---------- Server ----------
+class ComputeServer(QObject):
+    """
+    Pool of worker processes for the GUI. submit() returns at once; the
+    on_done(result, error) callback runs later in the GUI thread, with
+    error "" on success. Jobs run in submission order as workers free up.
+    """
+    _finished = pyqtSignal(int, object, str)   # job id, result, error (from the pool's thread)
+
+    def __init__(self, max_workers: int | None = None, parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self._executor = None
+        self._ids = itertools.count(1)
+        self._callbacks: Dict[int, Callable] = {}
+        self._finished.connect(self._deliver)
+
+    def submit(self, kind: str, *arrays, on_done: Callable | None = None, **kwargs) -> int:
+        """
+        Run JOBS[kind](*arrays, **kwargs) in a worker; returns the job id.
+        An array argument may also be None or the SpectrumDescriptor of a
+        spectrum in a live SpectrumStore, which the job gets as a
+        (points, columns) array.
+        """
+        if kind not in JOBS:
+            raise ValueError(f"unknown compute job {kind!r}")
+        if self._executor is None:
+            # spawn: workers must not inherit the GUI's Qt state
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=mp.get_context("spawn"))
+        job_id = next(self._ids)
+        blocks, descs = [], []
+        for arr in arrays:
+            if arr is None or isinstance(arr, SpectrumDescriptor):
+                descs.append(arr)
+                continue
+            shm, desc = share(np.asarray(arr))
+            blocks.append(shm)
+            descs.append(desc)
+        if on_done is not None:
+            self._callbacks[job_id] = on_done
+        count(f"compute_{kind}")
+        future = self._executor.submit(_run_job, kind, descs, kwargs)
+        future.add_done_callback(lambda f: self._done(job_id, f, blocks))
+        return job_id
+
+    def shutdown(self) -> None:
+        """Drop queued jobs; running ones finish in the background."""
+        self._callbacks.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _done(self, job_id, future, blocks):
+        for shm in blocks:
+            release(shm)
+        if future.cancelled():
+            return
+        try:
+            result, error = _import_result(future.result()), ""
+        except Exception as exc:  # reported to the caller
+            result, error = None, f"{type(exc).__name__}: {exc}"
+        self._finished.emit(job_id, result, error)
+
+    def _deliver(self, job_id, result, error):
+        callback = self._callbacks.pop(job_id, None)
+        if callback is not None:
+            callback(result, error)
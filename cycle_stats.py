@@ -0,0 +1,338 @@
+# cycle_stats.py
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, Iterable
+import numpy as np
+import pandas as pd
+from data_processor import noise_levels
+from file_loader import CHANNELS, channel
+from despike import robust_scores
+
+
+def group_cycles(entries: Iterable[dict]):
+    """
+    Group one experiment's entries by cycle.
+
+    Returns (cycles, sorted_cycles, prev_cycle): cycle index -> {camera: entry},
+    the real (integer) cycle indices in order, and each cycle's predecessor
+    for the Δ calculation. Derived spectra (string indices) are kept in
+    ``cycles`` but not in the ordering.
+    """
+    cycles: Dict[Hashable, Dict[str, dict]] = {}
+    for e in entries:
+        cycles.setdefault(e['file_index'], {})[e['camera']] = e
+    sorted_cycles = sorted(k for k in cycles if isinstance(k, int))
+    prev_cycle = {
+        cycle: (sorted_cycles[i-1] if i > 0 else None)
+        for i, cycle in enumerate(sorted_cycles)
+    }
+    return cycles, sorted_cycles, prev_cycle
+
+
+def summed_info(info: dict, n_cycles: int) -> dict:
+    """Metadata of a sum of n_cycles Δ cycles acquired like the file described by info."""
+    tt = info.get('total_time', 0)
+    if isinstance(tt, (list, tuple)):
+        total_time_per_file = sum(tt)
+    else:
+        total_time_per_file = float(tt) if tt is not None else 0
+    return {
+        'num_cycles': info.get('num_cycles', 1) * n_cycles,
+        'gain': info.get('gain', None),
+        'power': info.get('power', None),
+        'total_time': [total_time_per_file * n_cycles],
+    }
+
+
+def delta_array(curr_df: pd.DataFrame, prev_df: pd.DataFrame | None,
+                columns: Iterable[str]) -> np.ndarray:
+    """
+    Δ of one cumulative spectrum against the previous cycle, shape
+    (points, len(columns)). The first cycle (prev_df None) is its own Δ.
+    """
+    cols = [channel(curr_df, c).astype(float) for c in columns]
+    out = np.column_stack(cols) if cols else np.empty((len(curr_df), 0))
+    if prev_df is not None:
+        out -= np.column_stack([channel(prev_df, c) for c in columns])
+    return out
+
+
+def weighted_combination(stack: np.ndarray, noise_col: int):
+    """
+    Inverse-variance weighted combination of stacked Δs (cycles, points,
+    columns). Each cycle is weighted by 1/σ², σ being its noise in column
+    noise_col (noise_levels()). Returns (total, sigma, weights):
+
+    - total: n times the weighted mean, on the scale of a plain sum of the
+      n cycles (and of summed_info());
+    - sigma: its per-point standard error, from the weighted scatter of the
+      cycles around the mean, or from each column's noise for one cycle;
+    - weights: the normalized cycle weights.
+    """
+    n = len(stack)
+    sigma_c = noise_levels(stack[:, :, noise_col])
+    positive = sigma_c > 0
+    if positive.any():
+        # a noiseless (constant) channel gets the best weight seen, not an infinite one
+        W = 1.0 / np.maximum(sigma_c, sigma_c[positive].min()) ** 2
+    else:
+        W = np.ones(n)
+    mean = np.tensordot(W / W.sum(), stack, axes=1)
+    if n > 1:
+        var_mean = np.tensordot(W, (stack - mean) ** 2, axes=1) / ((n - 1) * W.sum())
+        sigma = np.sqrt(var_mean)
+    else:
+        sigma = np.broadcast_to(noise_levels(stack[0].T), mean.shape).copy()
+    return n * mean, n * sigma, W / W.sum()
+
+
+class DeltaAccumulator:
+    """
+    Running sum, mean and variance (Welford) of Δ spectra on one
+    wavenumber grid. Adding or removing one Δ is O(points).
+    """
+    def __init__(self, wavenumber: np.ndarray, columns: list[str]):
+        self.wavenumber = np.asarray(wavenumber)
+        self.columns = list(columns)
+        shape = (len(self.wavenumber), len(self.columns))
+        self.count = 0
+        self._sum = np.zeros(shape)
+        self._mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+
+    def add(self, delta: np.ndarray) -> None:
+        self.count += 1
+        self._sum += delta
+        d = delta - self._mean
+        self._mean += d / self.count
+        self._m2 += d * (delta - self._mean)
+
+    def remove(self, delta: np.ndarray) -> None:
+        if self.count <= 1:
+            self.reset()
+            return
+        old_mean = self._mean
+        self.count -= 1
+        self._sum -= delta
+        self._mean = old_mean + (old_mean - delta) / self.count
+        self._m2 -= (delta - self._mean) * (delta - old_mean)
+
+    def reset(self) -> None:
+        self.count = 0
+        self._sum[:] = 0.0
+        self._mean[:] = 0.0
+        self._m2[:] = 0.0
+
+    @property
+    def sum(self) -> np.ndarray:
+        return self._sum.copy()
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self._mean.copy()
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Per-point sample variance (ddof=1); zeros for fewer than two Δs."""
+        if self.count < 2:
+            return np.zeros_like(self._m2)
+        return np.clip(self._m2, 0.0, None) / (self.count - 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+    def frame(self, values: np.ndarray) -> pd.DataFrame:
+        """Wrap one of the statistics as a spectrum DataFrame."""
+        df = pd.DataFrame(values, columns=self.columns)
+        df.insert(0, "Wavenumber", self.wavenumber)
+        return df
+
+
+class CycleAccumulator:
+    """
+    Per-camera DeltaAccumulators for the selected cycles of one experiment.
+
+    ``cycles`` maps cycle index -> {camera: entry} and ``prev_cycle`` maps
+    each cycle to the one it is differenced against. Δ arrays are cached, so
+    toggling a cycle and reading the sum/mean/std are all O(points).
+    """
+    def __init__(self, cycles: Dict[Hashable, Dict[str, dict]],
+                 prev_cycle: Dict[Hashable, Hashable | None]):
+        self._cycles = cycles
+        self._prev = dict(prev_cycle)
+        self._deltas: Dict[tuple, np.ndarray] = {}
+        self._delta_sig: Dict[Hashable, tuple] = {}  # cycle -> inputs of its cached Δs
+        self._acc: Dict[str, DeltaAccumulator] = {}
+        self._columns: Dict[str, list[str]] = {}   # camera -> channels present in any cycle
+        self._added: Dict[Hashable, tuple] = {}  # cycle -> signature it was added with
+
+    @property
+    def selected(self) -> set:
+        return set(self._added)
+
+    def delta(self, cycle, cam: str) -> np.ndarray | None:
+        key = (cycle, cam)
+        if key not in self._deltas:
+            entry = self._cycles.get(cycle, {}).get(cam)
+            if entry is None:
+                return None
+            prev = self._prev.get(cycle)
+            prev_entry = self._cycles.get(prev, {}).get(cam) if prev is not None else None
+            prev_df = prev_entry['data'] if prev_entry is not None else None
+            self._deltas[key] = delta_array(entry['data'], prev_df, self.columns(cam))
+            self._delta_sig.setdefault(cycle, self._signature(cycle))
+        return self._deltas[key]
+
+    def columns(self, cam: str) -> list[str]:
+        if cam in self._acc:
+            return self._acc[cam].columns
+        if cam not in self._columns:
+            present = set()
+            for cams in self._cycles.values():
+                if cam in cams:
+                    present.update(cams[cam]['data'].columns)
+            self._columns[cam] = [c for c in CHANNELS if c in present]
+        return self._columns[cam]
+
+    def add(self, cycle) -> None:
+        if cycle in self._added:
+            return
+        sig = self._signature(cycle)
+        self._added[cycle] = sig
+        for cam in sig[1]:
+            self._accumulator(cam, cycle).add(self.delta(cycle, cam))
+
+    def remove(self, cycle) -> None:
+        sig = self._added.pop(cycle, None)
+        if sig is None:
+            return
+        for cam in sig[1]:
+            self._acc[cam].remove(self.delta(cycle, cam))
+
+    def update_cycles(self, prev_cycle: Dict[Hashable, Hashable | None]) -> None:
+        """
+        Re-link after cycles were added. Cached Δs whose inputs changed (new
+        camera, different predecessor) are dropped; selected ones are swapped
+        in the running statistics in O(points) each.
+        """
+        self._prev = dict(prev_cycle)
+        self._columns.clear()
+        stale = {c for c, sig in self._delta_sig.items() if sig != self._signature(c)}
+        reselect = [c for c in self._added if c in stale]
+        for c in reselect:
+            self.remove(c)  # still uses the old cached Δs
+        self._deltas = {k: v for k, v in self._deltas.items() if k[0] not in stale}
+        for c in stale:
+            del self._delta_sig[c]
+        for c in reselect:
+            self.add(c)
+
+    def stacked(self, cam: str, cycles: Iterable[Hashable]):
+        """
+        Δs of the given cycles for one camera as one array of shape
+        (n_cycles, points, columns), plus the cycles actually present.
+        """
+        keys = [c for c in cycles if cam in self._cycles.get(c, {})]
+        if not keys:
+            return keys, np.empty((0, 0, 0))
+        return keys, np.stack([self.delta(c, cam) for c in keys])
+
+    def weighted(self, cams: Iterable[str], cycles: Iterable[Hashable],
+                 noise_column: str = "SCP ROA") -> Dict[str, tuple]:
+        """
+        weighted_combination() of the given cycles for each camera, the
+        cameras in parallel. Returns {camera: (total frame, sigma frame,
+        {cycle: weight})} for the cameras that have any of the cycles.
+        """
+        cycles = list(cycles)
+        jobs = {}
+        for cam in cams:
+            keys, stack = self.stacked(cam, cycles)   # reads the bodies: main thread
+            if not keys:
+                continue
+            cols = self.columns(cam)
+            roa = [c for c in cols if "ROA" in c]
+            noise_col = cols.index(noise_column if noise_column in cols else (roa or cols)[0])
+            jobs[cam] = (keys, stack, noise_col)
+        if not jobs:
+            return {}
+        with ThreadPoolExecutor(len(jobs), thread_name_prefix="weighted") as pool:
+            results = dict(zip(jobs, pool.map(lambda job: weighted_combination(job[1], job[2]),
+                                              jobs.values())))
+        out = {}
+        for cam, (total, sigma, weights) in results.items():
+            keys = jobs[cam][0]
+            x = self._cycles[keys[0]][cam]['data']["Wavenumber"].to_numpy()
+            frames = []
+            for values in (total, sigma):
+                df = pd.DataFrame(values, columns=self.columns(cam))
+                df.insert(0, "Wavenumber", x)
+                frames.append(df)
+            out[cam] = (frames[0], frames[1], dict(zip(keys, weights.tolist())))
+        return out
+
+    def count(self, cam: str) -> int:
+        acc = self._acc.get(cam)
+        return acc.count if acc is not None else 0
+
+    def frame(self, cam: str, stat: str = "sum") -> pd.DataFrame | None:
+        """Sum, mean or std of the selected Δs for one camera, or None if empty."""
+        acc = self._acc.get(cam)
+        if acc is None or acc.count == 0:
+            return None
+        return acc.frame(getattr(acc, stat))
+
+    # ---------- Internals ----------
+    def _signature(self, cycle) -> tuple:
+        """What the cached Δs of a cycle depend on."""
+        prev = self._prev.get(cycle)
+        return (prev, tuple(sorted(self._cycles.get(cycle, {}))),
+                tuple(sorted(self._cycles.get(prev, {}))) if prev is not None else ())
+
+    def _accumulator(self, cam: str, cycle) -> DeltaAccumulator:
+        if cam not in self._acc:
+            x = self._cycles[cycle][cam]['data']["Wavenumber"].to_numpy()
+            self._acc[cam] = DeltaAccumulator(x, self.columns(cam))
+        return self._acc[cam]
+
+
+def find_outlier_cycles(acc: CycleAccumulator, cycles: list,
+                        spike_z: float = 10.0, cycle_z: float = 5.0,
+                        max_spike_points: int = 5) -> Dict[Hashable, str]:
+    """
+    Flag bad cycles from robust statistics of all their Δs at once.
+
+    For every camera the Δs are stacked to (cycles, points, columns) and each
+    value gets a robust z-score against the other cycles. A cycle is flagged as
+      * "spike"   if a few points (≤ max_spike_points) exceed spike_z, the
+                  signature of a cosmic-ray hit;
+      * "outlier" if its mean (clipped) |z| is more than cycle_z MADs above
+                  that of the other cycles (lamp drop-outs, bad focus, …).
+    Needs at least three cycles; returns {cycle: reason}.
+    """
+    flagged: Dict[Hashable, str] = {}
+    for cam in ('A', 'B'):
+        keys, d = acc.stacked(cam, cycles)
+        n = len(keys)
+        if n < 3:
+            continue
+        z = np.abs(robust_scores(d)[0])
+        n_spike = np.count_nonzero(z > spike_z, axis=(1, 2))
+        score = np.minimum(z, spike_z).mean(axis=(1, 2))
+        s_med = np.median(score)
+        s_mad = max(1.4826 * np.median(np.abs(score - s_med)), 1e-12)
+        deviant = ((score - s_med) / s_mad > cycle_z) & (score > 1.5 * s_med)
+
+        for k, cycle in enumerate(keys):
+            if deviant[k] or n_spike[k] > max_spike_points:
+                flagged[cycle] = "outlier"
+            elif n_spike[k] > 0:
+                flagged.setdefault(cycle, "spike")
+    return flagged
+
+
+def experiment_outliers(entries: Iterable[dict], **kwargs) -> Dict[Hashable, str]:
+    """find_outlier_cycles over all real cycles of one experiment's entries."""
+    cycles, sorted_cycles, prev_cycle = group_cycles(entries)
+    return find_outlier_cycles(CycleAccumulator(cycles, prev_cycle), sorted_cycles, **kwargs)
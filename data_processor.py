@@ -1,21 +1,68 @@
 # data_processor.py
+import logging
 import pandas as pd
 import numpy as np
 from scipy.interpolate import interp1d
+from scipy.linalg import solveh_banded
 from scipy.sparse import diags
-from scipy.sparse.linalg import spsolve
+from file_loader import CHANNELS, channel
+
+log = logging.getLogger(__name__)
 
 def merge_a_b(a_df, b_df):
     """Interpolates and combines two spectra."""
     common_x = sorted(set(a_df["Wavenumber"]).union(b_df["Wavenumber"]))
     merged = pd.DataFrame({"Wavenumber": common_x})
-    for col in a_df.columns[1:]:
-        f_a = interp1d(a_df["Wavenumber"], a_df[col], bounds_error=False, fill_value=0)
-        f_b = interp1d(b_df["Wavenumber"], b_df[col], bounds_error=False, fill_value=0)
+    # channels absent from both cameras stay absent (read back as zeros)
+    cols = [c for c in CHANNELS if c in a_df.columns or c in b_df.columns]
+    for col in cols:
+        f_a = interp1d(a_df["Wavenumber"], channel(a_df, col), bounds_error=False, fill_value=0)
+        f_b = interp1d(b_df["Wavenumber"], channel(b_df, col), bounds_error=False, fill_value=0)
         merged[col] = (f_a(common_x) + f_b(common_x)) / 2
     return merged
 
 
+def merge_uncertainty(a_sigma: pd.DataFrame, b_sigma: pd.DataFrame) -> pd.DataFrame:
+    """Per-point uncertainty of merge_a_b() of two spectra: σ of (a + b)/2 is √(σa² + σb²)/2."""
+    squares = merge_a_b(a_sigma.assign(**{c: a_sigma[c] ** 2 for c in a_sigma.columns[1:]}),
+                        b_sigma.assign(**{c: b_sigma[c] ** 2 for c in b_sigma.columns[1:]}))
+    return squares.assign(**{c: np.sqrt(squares[c] / 2) for c in squares.columns[1:]})
+
+
+def normalize_by_time(df: pd.DataFrame, info: dict) -> pd.DataFrame:
+    """Copy of df with intensities divided by the (first) total accumulation time."""
+    total_time = info.get('total_time', [1.0])
+    duration = float(total_time[0]) if isinstance(total_time, (list, tuple)) else float(total_time)
+    norm_df = df.copy()
+    for col in norm_df.columns:
+        if col != "Wavenumber":
+            norm_df[col] = norm_df[col] / duration
+    return norm_df
+
+
+def penalty_bands(L: int, lam: float) -> np.ndarray:
+    """
+    lam·D·Dᵀ (D: second differences) in the upper banded storage of
+    solveh_banded: row 2 - k holds the k-th superdiagonal.
+    """
+    D = diags([1.0, -2.0, 1.0], [0, -1, -2], shape=(L, L-2))
+    D = lam * (D @ D.T)
+    bands = np.zeros((3, L))
+    for k in range(3):
+        bands[2 - k, k:] = D.diagonal(k)
+    return bands
+
+
+def weighted_smooth(bands: np.ndarray, w: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Whittaker smoother: solve (W + lam·D·Dᵀ) z = W y. The system is
+    pentadiagonal and positive definite, so this is a banded Cholesky, O(L).
+    """
+    Z = bands.copy()
+    Z[2] += w
+    return solveh_banded(Z, w * y, check_finite=False)
+
+
 def baseline_als(
     y: np.ndarray,
     lam: float = 1e5,
@@ -31,19 +78,14 @@ def baseline_als(
     Stops early if the change in baseline is below tolerance.
     """
     L = len(y)
-    D = diags([1, -2, 1], [0, -1, -2], shape=(L, L-2))
-    D = lam * (D @ D.T)
+    bands = penalty_bands(L, lam)
     w = np.ones(L)
     last_z = np.zeros_like(y)
     last_z_norm = np.linalg.norm(last_z)
     eps = 1e-8
     for i in range(niter):
-        W = diags(w, 0)
-        Z = W + D
         try:
-            Z = Z.tocsc()
-            rhs = w * y
-            z = spsolve(Z, rhs)
+            z = weighted_smooth(bands, w, y)
         except Exception as exc:
             z = last_z.copy()
         z_norm = np.linalg.norm(z)
@@ -56,10 +98,38 @@ def baseline_als(
             delta_z = np.linalg.norm(z - last_z)
             rel_change = delta_z / (last_z_norm + eps)
             if (rel_change < tol) or (delta_z < min_delta):
-                print(f"Convergence reached at iteration {i+1}")
+                log.debug("ALS converged at iteration %d", i + 1)
                 last_z = z.copy()
                 break
         last_z = z.copy()
         last_z_norm = z_norm
     return last_z
 
+
+
+def estimate_noise(y: np.ndarray) -> float:
+    """
+    Robust point-to-point noise (standard deviation) of a spectrum.
+    Uses the MAD of second differences, which cancels smooth bands.
+    """
+    return float(noise_levels(np.asarray(y, dtype=float)[None, :])[0])
+
+
+def noise_levels(Y: np.ndarray) -> np.ndarray:
+    """estimate_noise() of every row of a 2D array at once."""
+    d2 = np.diff(np.asarray(Y, dtype=float), n=2, axis=-1)
+    if d2.shape[-1] == 0:
+        return np.zeros(d2.shape[:-1])
+    mad = np.median(np.abs(d2 - np.median(d2, axis=-1, keepdims=True)), axis=-1)
+    # second difference of white noise has variance 6·σ²
+    return 1.4826 * mad / np.sqrt(6.0)
+
+
+def estimate_snr(y: np.ndarray, window: int = 5) -> float:
+    """Peak of the smoothed signal over the estimated noise."""
+    y = np.asarray(y, dtype=float)
+    noise = estimate_noise(y)
+    if noise == 0.0:
+        return 0.0
+    smooth = np.convolve(y, np.ones(window) / window, mode="same")
+    return float(np.max(np.abs(smooth)) / noise)
@@ -0,0 +1,60 @@
+# despike.py
+from __future__ import annotations
+import numpy as np
+
+
+def robust_scores(stack: np.ndarray):
+    """
+    Signed robust z-scores of stacked spectra against the other cycles.
+
+    stack has shape (cycles, points, columns). Each value is compared with
+    the per-point median across cycles and scaled by the interquartile
+    spread (floored at the column's typical spread, since few cycles give
+    noisy per-point estimates). Returns (z, median) with shapes
+    (cycles, points, columns) and (points, columns).
+    """
+    n, n_points, n_cols = stack.shape
+    # (points * columns, cycles), contiguous along cycles
+    flat = np.ascontiguousarray(stack.reshape(n, -1).T, dtype=np.float32)
+    # quartiles by nested single-kth partitions (much faster than one
+    # partition with several kth values)
+    q1, q2, q3 = n // 4, n // 2, (3 * n) // 4
+    part = np.partition(flat, q2, axis=1)
+    med = part[:, q2:q2 + 1]
+    lower = np.partition(part[:, :q2], q1, axis=1)[:, q1]
+    upper = np.partition(part[:, q2 + 1:], q3 - q2 - 1, axis=1)[:, q3 - q2 - 1]
+    sigma = (upper - lower) / 1.349
+    typical = np.median(sigma.reshape(n_points, n_cols), axis=0)
+    floor = np.tile(np.maximum(typical, 1e-12), n_points)
+    sigma = np.maximum(sigma, floor)[:, None]
+    z = (flat - med) / sigma
+    return z.T.reshape(stack.shape), med.reshape(n_points, n_cols)
+
+
+def despike_cumulative(stack: np.ndarray, z_thresh: float = 10.0,
+                       max_points: int = 5):
+    """
+    Remove cosmic-ray spikes from a cumulative cycle series in one pass.
+
+    stack holds the cumulative spectra (cycles, points, columns) in cycle
+    order. A spike arrives in one cycle's Δ and then persists in every later
+    file, so Δs are scored against all cycles at once; a (cycle, point)
+    counts as a spike when any column exceeds z_thresh, as long as the cycle
+    has no more than max_points such points (otherwise the whole cycle is
+    off and is left for outlier rejection). Spiky Δ values are replaced by
+    the per-point median Δ and the series is re-accumulated.
+
+    Returns (corrected stack, boolean mask of corrected (cycle, point)).
+    """
+    n = stack.shape[0]
+    if n < 3:
+        return stack, np.zeros(stack.shape[:2], dtype=bool)
+    deltas = np.diff(stack, axis=0, prepend=np.zeros_like(stack[:1]))
+    z, med = robust_scores(deltas)
+    mask = (np.abs(z) > z_thresh).any(axis=2)
+    mask[mask.sum(axis=1) > max_points] = False
+    if not mask.any():
+        return stack, mask
+    k, p = np.nonzero(mask)
+    deltas[k, p] = med[p]
+    return np.cumsum(deltas, axis=0), mask
@@ -0,0 +1,83 @@
+# directory_loader.py
+import threading
+import time
+from PyQt6.QtCore import QThread, pyqtSignal
+from file_loader import load_data_file, scan_directory
+from instrumentation import span
+
+
+class DirectoryLoader(QThread):
+    """
+    Parses the spectrum files of one or more directories off the GUI thread.
+
+    A header-only index of all files (scan_directory) is emitted first so
+    the experiment/cycle tree can be laid out before any body is parsed;
+    files are then parsed in index order. Entries are handed over in batches (at most every ``batch_interval``
+    seconds) so the tree and plot can fill in while loading continues, with
+    progress reported as files parsed / total and bytes read. cancel() stops
+    after the file being parsed; the entries delivered so far stay valid.
+    An optional ``post_fn`` (e.g. despike_series) runs over all entries at
+    the end; it must not modify them, as the GUI is already using them. Its
+    result is emitted as ``post_processed`` for the GUI thread to apply.
+    """
+    indexed = pyqtSignal(list)             # header-only entries, see scan_directory
+    batch_loaded = pyqtSignal(list)
+    progress = pyqtSignal(int, int, int)   # files done, files total, bytes read
+    post_processed = pyqtSignal(list)      # what post_fn returned, before completed
+    completed = pyqtSignal(list, bool)     # all entries, cancelled
+
+    def __init__(self, directories, load_fn=load_data_file, post_fn=None,
+                 batch_interval: float = 0.1, parent=None):
+        super().__init__(parent)
+        self.directories = list(directories)
+        self._load_fn = load_fn
+        self._post_fn = post_fn
+        self._batch_interval = batch_interval
+        self._cancel = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def run(self):
+        with span("DirectoryLoader.run", dirs=len(self.directories)):
+            index = []
+            for directory in self.directories:
+                try:
+                    index.extend(scan_directory(directory))
+                except OSError:
+                    continue  # directory vanished or is unreadable
+            self.indexed.emit(index)
+            total = len(index)
+            self.progress.emit(0, total, 0)
+
+            loaded, batch = [], []
+            bytes_read = 0
+            last_emit = time.monotonic()
+            for i, item in enumerate(index, 1):
+                if self._cancel.is_set():
+                    break
+                try:
+                    entry = self._load_fn(item["path"])
+                    bytes_read += item["size"]
+                except (OSError, ValueError):
+                    entry = None  # unreadable or malformed file: skip it
+                if entry is not None:
+                    loaded.append(entry)
+                    batch.append(entry)
+                now = time.monotonic()
+                if now - last_emit >= self._batch_interval or i == total:
+                    if batch:
+                        self.batch_loaded.emit(batch)
+                        batch = []
+                    self.progress.emit(i, total, bytes_read)
+                    last_emit = now
+            if batch:
+                self.batch_loaded.emit(batch)
+
+            cancelled = self._cancel.is_set()
+            if self._post_fn is not None and loaded and not cancelled:
+                self.post_processed.emit(list(self._post_fn(loaded)))
+            self.completed.emit(loaded, cancelled)
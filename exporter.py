@@ -1,8 +1,26 @@
 # exporter.py
 import os
+import pandas as pd
+from file_loader import densify, channel
 
-def export_combined(filename, df):
-    df.to_csv(filename, sep="\t", index=False)
+UNCERTAINTY_SUFFIX = " Uncertainty"
+
+
+def with_uncertainty(df, sigma):
+    """df plus a '<channel> Uncertainty' column after each channel that sigma has."""
+    if sigma is None:
+        return df
+    out = pd.DataFrame({"Wavenumber": df["Wavenumber"]})
+    for col in df.columns[1:]:
+        out[col] = df[col]
+        if col in sigma.columns:
+            out[col + UNCERTAINTY_SUFFIX] = sigma[col].to_numpy()
+    return out
+
+
+def export_combined(filename, df, sigma=None):
+    """Write a spectrum (and its per-point uncertainty, if given) as TSV."""
+    with_uncertainty(densify(df), sigma).to_csv(filename, sep="\t", index=False)
 
 def export_separately(base_filename: str, spectra: list, modalities: list[str]):
     """
@@ -16,6 +34,8 @@ def export_separately(base_filename: str, spectra: list, modalities: list[str]):
         Path+prefix to use for each output file (without extension).
     spectra : list of dict
         Each dict has keys "camera", "file_index", and a pandas DataFrame under "data".
+        Modalities absent from a spectrum are written as zeros. Entries with an
+        "uncertainty" frame (noise-weighted sums) get an extra Uncertainty column.
     modalities : list of str
         Which modalities to export, e.g. ["SCP", "DCPI", "DCPII", "SCPc"].
     """
@@ -23,23 +43,24 @@ def export_separately(base_filename: str, spectra: list, modalities: list[str]):
         df    = entry["data"]
         cam   = entry["camera"]
         file_index = entry["file_index"]
+        sigma = entry.get("uncertainty")
 
         for mod in modalities:
             r_col = f"{mod} Raman"
             o_col = f"{mod} ROA"
 
             # Raman-only file
-            if r_col in df.columns:
-                subr = df[["Wavenumber", r_col]]
-                fname_r = f"{base_filename}_{cam}_{file_index}_{mod}_Raman.txt"
-                os.makedirs(os.path.dirname(fname_r), exist_ok=True)
-                subr.to_csv(fname_r, sep="\t", index=False)
+            subr = with_uncertainty(
+                pd.DataFrame({"Wavenumber": df["Wavenumber"], r_col: channel(df, r_col)}), sigma)
+            fname_r = f"{base_filename}_{cam}_{file_index}_{mod}_Raman.txt"
+            os.makedirs(os.path.dirname(fname_r), exist_ok=True)
+            subr.to_csv(fname_r, sep="\t", index=False)
 
             # ROA-only file
-            if o_col in df.columns:
-                subo = df[["Wavenumber", o_col]]
-                fname_o = f"{base_filename}_{cam}_{file_index}_{mod}_ROA.txt"
-                os.makedirs(os.path.dirname(fname_o), exist_ok=True)
-                subo.to_csv(fname_o, sep="\t", index=False)
+            subo = with_uncertainty(
+                pd.DataFrame({"Wavenumber": df["Wavenumber"], o_col: channel(df, o_col)}), sigma)
+            fname_o = f"{base_filename}_{cam}_{file_index}_{mod}_ROA.txt"
+            os.makedirs(os.path.dirname(fname_o), exist_ok=True)
+            subo.to_csv(fname_o, sep="\t", index=False)
 
 
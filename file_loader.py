@@ -1,53 +1,496 @@
 # file_loader.py
+import copy
 import os
 import glob
 import re
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
+from despike import despike_cumulative
+from instrumentation import span, timed, count
+from pyramid import pyramid_for
+
+# Modality → (Raman column, ROA column), in file order
+MODALITIES = {
+    "SCP":   ("SCP Raman",   "SCP ROA"),
+    "DCPI":  ("DCPI Raman",  "DCPI ROA"),
+    "DCPII": ("DCPII Raman", "DCPII ROA"),
+    "SCPc":  ("SCPc Raman",  "SCPc ROA"),
+}
+CHANNELS = [col for pair in MODALITIES.values() for col in pair]
+COLUMNS = ["Wavenumber"] + CHANNELS
+
+# path -> parsed file, reused while the file is unchanged (see _file_stamp).
+# Entries share these DataFrames, so they must be treated as read-only.
+# Records made by scan_directory() hold the header only ("data" is None);
+# "views" holds the ROI crops of "data" served to lazy entries (see crop).
+_PARSE_CACHE: dict = {}
+
+# Paths whose bodies were parsed for lazy entries, least recently used
+# first. Only these bodies are evicted; eagerly loaded entries hold theirs.
+_RESIDENT: "OrderedDict[str, None]" = OrderedDict()
+_resident_lock = threading.Lock()
+RESIDENT_LIMIT = 512
+
+
+def clear_cache() -> None:
+    """Drop all cached parses (and their despiked variants)."""
+    _PARSE_CACHE.clear()
+    with _resident_lock:
+        _RESIDENT.clear()
+
+
+def set_resident_limit(n: int) -> None:
+    """Maximum number of lazily parsed bodies kept in memory."""
+    global RESIDENT_LIMIT
+    RESIDENT_LIMIT = max(1, int(n))
+    _touch_resident(None)
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def channel(df: pd.DataFrame, col: str) -> np.ndarray:
+    """
+    Return one intensity channel as an array. Modalities that were absent
+    (all zeros) in the source file are not stored, so they read as zeros.
+    """
+    if col in df.columns:
+        return df[col].to_numpy()
+    present = [c for c in df.columns if c != "Wavenumber"]
+    dtype = df[present[0]].dtype if present else np.float64
+    return np.zeros(len(df), dtype=dtype)
+
+
+def densify(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of df with every channel column, absent ones filled with zeros."""
+    return pd.DataFrame({col: (df["Wavenumber"].to_numpy() if col == "Wavenumber"
+                               else channel(df, col)) for col in COLUMNS})
+
+
+def roi_key(roi):
+    """An ROI as a hashable (lo, hi) pair of floats, or None for the full range."""
+    return None if roi is None else (float(roi[0]), float(roi[1]))
+
+
+def crop(df: pd.DataFrame, roi) -> pd.DataFrame:
+    """
+    Rows of df with lo <= Wavenumber <= hi for roi = (lo, hi), renumbered
+    from 0. The result is a view: its columns share df's arrays (pandas
+    copies them only if one of the two is modified). None returns df, and
+    so does an ROI missing df's range (e.g. the other camera's): an empty
+    spectrum is of no use anywhere.
+    """
+    if roi is None:
+        return df
+    x = df["Wavenumber"].to_numpy()
+    i0, i1 = np.searchsorted(x, roi[0]), np.searchsorted(x, roi[1], side="right")
+    if i1 - i0 < 2:
+        return df
+    return df.iloc[i0:i1].reset_index(drop=True)
+
+
+def _cropped(cached, roi) -> pd.DataFrame:
+    """The body of a parse cache record cropped to roi, one view per ROI."""
+    if roi is None:
+        return cached["data"]
+    views = cached.setdefault("views", {})
+    df = views.get(roi)
+    if df is None:
+        df = views[roi] = crop(cached["data"], roi)
+    return df
+
+
+def _drop_absent_modalities(df: pd.DataFrame):
+    """Drop modalities whose Raman and ROA channels are both all zero."""
+    absent = []
+    for mod, (r_col, o_col) in MODALITIES.items():
+        if not df[r_col].fillna(0).any() and not df[o_col].fillna(0).any():
+            absent.append(mod)
+    drop = [col for mod in absent for col in MODALITIES[mod]]
+    return df.drop(columns=drop), absent
+
+
+_FILENAME_RE = re.compile(r"(.+)_([AB])-(\d+)_out\.txt")
+
+# One pass over the header line: each alternative is one "# ..." field.
+# Total times runs up to the next "#" and holds one value per modality.
+_HEADER_RE = re.compile(
+    r"Gain\s+(?P<gain>[\d.]+)"
+    r"|Power at sample\s+(?P<power>\d+)"
+    r"|Cycles\s+(?P<cycles>\d+)"
+    r"|Total times[^#]*?(?P<times>[\d.][^#]*)"
+)
+_NUMBER_RE = re.compile(r"[\d.]+")
+
+
+def parse_filename(filename: str):
+    """Return (name, camera, cycle index) of a ``<name>_<A|B>-<index>_out.txt`` file, or None."""
+    match = _FILENAME_RE.match(filename)
+    if not match:
+        return None
+    name, cam, file_index = match.groups()
+    return name, cam, int(file_index)
+
 
 def parse_header(header_line: str):
     info = {}
-    parts = header_line.strip("# \n").split("#")
-    for part in parts:
-        if "Gain" in part:
-            info["gain"] = float(re.search(r"Gain\s+([\d.]+)", part).group(1))
-        if "Power at sample" in part:
-            info["power"] = int(re.search(r"Power at sample\s+(\d+)", part).group(1))
-        if "Cycles" in part:
-            info["num_cycles"] = int(re.search(r"Cycles\s+(\d+)", part).group(1))
-        if "Total times" in part:
-            times = re.findall(r"([\d.]+)", part)
-            info["total_time"] = list(map(float, times))
+    for m in _HEADER_RE.finditer(header_line):
+        field = m.lastgroup
+        if field == "gain":
+            info["gain"] = float(m.group("gain"))
+        elif field == "power":
+            info["power"] = int(m.group("power"))
+        elif field == "cycles":
+            info["num_cycles"] = int(m.group("cycles"))
+        else:
+            info["total_time"] = [float(t) for t in _NUMBER_RE.findall(m.group("times"))]
     return info
 
-def load_data_files(directory):
-    pattern = os.path.join(directory, "*_out.txt")
-    files = glob.glob(pattern)
+
+def _read_header(path):
+    with open(path, 'r') as f:
+        return parse_header(f.readline())
+
+
+@timed("scan_directory")
+def scan_directory(directory):
+    """
+    Header-only index of a directory: one entry per spectrum file with
+    ``name``, ``camera``, ``file_index``, ``info`` and ``path`` but no
+    ``data``, ordered by experiment, cycle and camera. Only the first line
+    of each file is read (none for files already in the parse cache).
+    """
+    index = []
+    with os.scandir(directory) as it:
+        for de in it:
+            parsed = parse_filename(de.name)
+            if parsed is None or not de.is_file():
+                continue
+            st = de.stat()
+            stamp = (st.st_mtime_ns, st.st_size)
+            cached = _PARSE_CACHE.get(de.path)
+            if cached is not None and cached["stamp"] == stamp:
+                info = dict(cached["info"])
+            else:
+                try:
+                    info = _read_header(de.path)
+                except (OSError, UnicodeDecodeError):
+                    continue
+                # header-only record: lazy entries then need no further reads
+                _PARSE_CACHE[de.path] = {"stamp": stamp, "float32": None, "info": info,
+                                         "data": None, "absent": None, "despiked": None}
+            name, cam, file_index = parsed
+            index.append({"name": name, "camera": cam, "file_index": file_index,
+                          "info": info, "path": de.path, "size": st.st_size})
+    index.sort(key=lambda e: (e["name"], e["file_index"], e["camera"]))
+    return index
+
+
+def _parsed(path, float32: bool):
+    """The parse cache record of path with its body, parsing it if needed."""
+    stamp = _file_stamp(path)
+    cached = _PARSE_CACHE.get(path)
+    if (cached is None or cached["stamp"] != stamp or cached["float32"] != float32
+            or cached["data"] is None):
+        with span("parse_file"):
+            with open(path, 'r') as f:
+                header = f.readline()
+                info = parse_header(header)
+                df = pd.read_csv(f, sep=r'\s+', names=COLUMNS)
+            df = df.sort_values("Wavenumber", ascending=True).reset_index(drop=True)
+            df, absent = _drop_absent_modalities(df)
+            if float32:
+                df = df.astype({c: np.float32 for c in df.columns if c != "Wavenumber"})
+        cached = {"stamp": stamp, "float32": float32, "info": info,
+                  "data": df, "absent": absent, "despiked": None}
+        _PARSE_CACHE[path] = cached
+        pyramid_for(df)  # while parsing anyway (often on the loader thread): plots/thumbnails reuse it
+    else:
+        count("parse_cache_hit")
+    return cached
+
+
+def _touch_resident(path) -> None:
+    """Mark path's body as just used and evict the least recently used ones."""
+    with _resident_lock:
+        if path is not None:
+            _RESIDENT[path] = None
+            _RESIDENT.move_to_end(path)
+        while len(_RESIDENT) > RESIDENT_LIMIT:
+            old, _ = _RESIDENT.popitem(last=False)
+            cached = _PARSE_CACHE.get(old)
+            if cached is not None:
+                cached["data"] = None
+                cached.pop("views", None)
+                count("body_evicted")
+
+
+class LazyEntry(dict):
+    """
+    Spectrum entry whose body is parsed on first access.
+
+    Header fields (name, camera, file_index, info, path) are set up front;
+    ``"data"`` and ``"absent_modalities"`` are read through the parse cache,
+    where at most RESIDENT_LIMIT lazily parsed bodies are kept, so memory
+    is bounded by what is actually viewed. ``"data"`` is cropped to the
+    entry's ``"roi"``, if any. Assigning ``"data"`` (e.g. despiking,
+    normalized copies) stores it like in a regular entry.
+    """
+    _LAZY_KEYS = ("data", "absent_modalities")
+
+    def __init__(self, *args, float32: bool = False, **kw):
+        super().__init__(*args, **kw)
+        self.float32 = float32
+
+    def __missing__(self, key):
+        if key not in self._LAZY_KEYS:
+            raise KeyError(key)
+        path = dict.__getitem__(self, "path")
+        cached = _PARSE_CACHE.get(path)
+        if key == "absent_modalities" and cached is not None and cached["absent"] is not None:
+            return list(cached["absent"])
+        if cached is None or cached["data"] is None or cached["float32"] != self.float32:
+            count("lazy_body_load")
+            cached = _parsed(path, self.float32)
+        _touch_resident(path)
+        if key == "data":
+            return _cropped(cached, dict.get(self, "roi"))
+        return list(cached["absent"])
+
+    def __contains__(self, key):
+        return key in self._LAZY_KEYS or dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def copy(self):
+        return LazyEntry(self, float32=self.float32)
+
+    def __deepcopy__(self, memo):
+        # The body resolves to the shared parse-cache frame (or its cropped
+        # view): a deep copy owns its data, so modifying it in place (e.g.
+        # BaselineManager.subtract) leaves the file's cached spectrum alone.
+        dup = LazyEntry(float32=self.float32)
+        memo[id(self)] = dup
+        for key, value in dict.items(self):
+            dict.__setitem__(dup, key, copy.deepcopy(value, memo))
+        for key in self._LAZY_KEYS:
+            if not dict.__contains__(dup, key):
+                dict.__setitem__(dup, key, copy.deepcopy(self[key], memo))
+        return dup
+
+    @property
+    def parsed(self) -> bool:
+        """Whether the body was read at least once (channels are known)."""
+        if dict.__contains__(self, "data"):
+            return True
+        cached = _PARSE_CACHE.get(dict.__getitem__(self, "path"))
+        return cached is not None and cached["absent"] is not None
+
+
+def body_known(entry) -> bool:
+    """False for a lazy entry whose body was never parsed."""
+    return not isinstance(entry, LazyEntry) or entry.parsed
+
+
+def body_resident(entry) -> bool:
+    """Whether entry["data"] can be read without parsing a file."""
+    if not isinstance(entry, LazyEntry):
+        return "data" in entry
+    if dict.__contains__(entry, "data"):
+        return True
+    cached = _PARSE_CACHE.get(dict.__getitem__(entry, "path"))
+    return cached is not None and cached["data"] is not None and cached["float32"] == entry.float32
+
+
+def load_data_file(path, float32: bool = False, lazy: bool = False, rois=None):
+    """
+    Parse one ``<name>_<A|B>-<index>_out.txt`` file into a spectrum entry.
+    Returns None if the filename does not follow that pattern. Unchanged
+    files are served from the parse cache. With ``lazy=True`` only the
+    header is read (none if scan_directory() already did) and a LazyEntry
+    is returned.
+
+    rois maps experiment names to (lo, hi) wavenumber windows: the entry
+    of such an experiment gets ``"roi"`` and its data is cropped to it
+    (a view; the full spectrum stays in the parse cache, see set_roi).
+    """
+    parsed = parse_filename(os.path.basename(path))
+    if parsed is None:
+        return None
+    name, cam, file_index = parsed
+    roi = roi_key((rois or {}).get(name))
+
+    if lazy:
+        stamp = _file_stamp(path)
+        cached = _PARSE_CACHE.get(path)
+        if cached is None or cached["stamp"] != stamp:
+            info = _read_header(path)
+            cached = {"stamp": stamp, "float32": None, "info": info,
+                      "data": None, "absent": None, "despiked": None}
+            _PARSE_CACHE[path] = cached
+        entry = LazyEntry(name=name, camera=cam, file_index=file_index,
+                          info=dict(cached["info"]), path=path, float32=float32)
+        if roi is not None:
+            entry["roi"] = roi
+        return entry
+
+    cached = _parsed(path, float32)
+    entry = {
+        "name": name,
+        "camera": cam,
+        "file_index": file_index,
+        "info": dict(cached["info"]),
+        "data": _cropped(cached, roi),
+        "path": path,
+        "absent_modalities": list(cached["absent"]),
+    }
+    if roi is not None:
+        entry["roi"] = roi
+    return entry
+
+
+def full_data(entry) -> pd.DataFrame:
+    """The spectrum of a file entry over the whole recorded range, whatever its ROI."""
+    if entry.get("roi") is None:
+        return entry["data"]
+    path = entry["path"]
+    cached = _PARSE_CACHE.get(path)
+    if entry.get("despiked") is not None and cached is not None and cached["despiked"]:
+        return cached["despiked"][1]
+    float32 = getattr(entry, "float32", None)
+    if float32 is None:
+        float32 = bool(cached is not None and cached["float32"])
+    return _parsed(path, float32)["data"]
+
+
+def set_roi(entry, roi) -> bool:
+    """
+    Crop a file entry to roi = (lo, hi), or back to the full range (None).
+    The data comes from the full spectrum in the parse cache (re-read if
+    it was evicted, which may raise OSError), so an ROI can be widened
+    again; changes made to the cropped data are not carried over. Derived
+    entries (sums etc.) have no full spectrum: they are left as they are
+    and False is returned.
+    """
+    if not isinstance(entry["file_index"], int) or not entry.get("path"):
+        return False
+    roi = roi_key(roi)
+    owns_data = not isinstance(entry, LazyEntry) or dict.__contains__(entry, "data")
+    full = full_data(entry) if owns_data else None
+    if roi is None:
+        entry.pop("roi", None)
+    else:
+        entry["roi"] = roi
+    if owns_data:
+        entry["data"] = crop(full, roi)
+    return True
+
+
+@timed("despike_series")
+def despike_series(entries) -> list:
+    """
+    Despiking stage, computed but not applied: remove cosmic-ray spikes
+    from each experiment/camera series of cumulative cycles in entries
+    (see despike_cumulative). Full spectra are despiked, so the frames
+    serve any ROI. Returns (path, fingerprint, frame, corrected points)
+    per file, the fingerprint being the stamps of the whole series.
+
+    Neither the entries nor the parse cache are changed (bodies may be
+    parsed), so this can run on a loader thread while the entries are in
+    use; apply_despiked() installs the result. A series whose frames are
+    cached under the same fingerprint is not despiked again.
+    """
+    groups = {}
+    for e in entries:
+        if isinstance(e["file_index"], int) and e.get("path") in _PARSE_CACHE:
+            groups.setdefault((e["name"], e["camera"]), []).append(e)
+
+    results = []
+    for members in groups.values():
+        members.sort(key=lambda e: e["file_index"])
+        caches = [_PARSE_CACHE[e["path"]] for e in members]
+        fingerprint = tuple((e["path"], c["stamp"]) for e, c in zip(members, caches))
+        done = [c["despiked"] for c in caches]
+        if all(d and d[0] == fingerprint for d in done):
+            results.extend((e["path"], fingerprint, d[1], d[2]) for e, d in zip(members, done))
+            continue
+        frames = [full_data(e) for e in members]  # parses lazy bodies
+        if len({len(df) for df in frames}) != 1:
+            continue  # cycles on different grids cannot be stacked
+        cols = [c for c in CHANNELS if any(c in df.columns for df in frames)]
+        stack = np.stack([np.column_stack([channel(df, c).astype(float) for c in cols])
+                          for df in frames])
+        fixed, mask = despike_cumulative(stack)
+        for k, (e, df) in enumerate(zip(members, frames)):
+            out = df.copy()
+            for j, c in enumerate(cols):
+                if c in out.columns:
+                    out[c] = fixed[k, :, j].astype(out[c].dtype)
+            results.append((e["path"], fingerprint, out, int(mask[k].sum())))
+    return results
+
+
+def apply_despiked(entries, results) -> int:
+    """
+    Install despike_series() results: the frames are cached next to the
+    parsed files (unless a file changed meanwhile), and every file entry
+    in entries with a result, matched by path, gets its despiked data
+    (cropped to its ROI) and ``"despiked"`` = number of corrected points.
+    Returns the number of entries updated.
+    """
+    by_path = {}
+    for path, fingerprint, df, n_fixed in results:
+        by_path[path] = (df, n_fixed)
+        cache = _PARSE_CACHE.get(path)
+        if cache is not None and (path, cache["stamp"]) in fingerprint:
+            cache["despiked"] = (fingerprint, df, n_fixed)
+    updated = 0
+    for e in entries:
+        hit = by_path.get(e.get("path")) if isinstance(e["file_index"], int) else None
+        if hit is None:
+            continue
+        df, n_fixed = hit
+        e["data"] = crop(df, e.get("roi"))
+        e["despiked"] = n_fixed
+        updated += 1
+    return updated
+
+
+def despike_entries(entries) -> None:
+    """Despike entries in place: despike_series() then apply_despiked()."""
+    entries = list(entries)
+    apply_despiked(entries, despike_series(entries))
+
+
+@timed("load_data_files")
+def load_data_files(directory, float32: bool = False, despike: bool = False,
+                    lazy: bool = False, rois=None):
+    """
+    Parse every ``*_out.txt`` file in directory.
+
+    All-zero modalities are not stored: their names are listed under
+    ``"absent_modalities"`` and ``channel()`` reads them back as zeros.
+    With ``float32=True`` intensity channels are stored in single precision;
+    with ``despike=True`` cosmic-ray spikes are removed (despike_entries).
+    With ``lazy=True`` only headers are read and LazyEntry objects returned.
+    rois crops experiments to wavenumber windows (see load_data_file).
+    """
+    if lazy:
+        files = [item["path"] for item in scan_directory(directory)]
+    else:
+        files = glob.glob(os.path.join(directory, "*_out.txt"))
     data_entries = []
 
     for path in files:
-        filename = os.path.basename(path)
-        match = re.match(r"(.+)_([AB])-(\d+)_out\.txt", filename)
-        if not match:
-            continue
-        name, cam, file_index = match.groups()
-
-        with open(path, 'r') as f:
-            header = f.readline()
-            info = parse_header(header)
-            df = pd.read_csv(f, sep=r'\s+', names=[
-                "Wavenumber", "SCP Raman", "SCP ROA",
-                "DCPI Raman", "DCPI ROA",
-                "DCPII Raman", "DCPII ROA",
-                "SCPc Raman", "SCPc ROA"
-            ])
-            df = df.sort_values("Wavenumber", ascending=True).reset_index(drop=True)           
-            data_entries.append({
-                "name": name,
-                "camera": cam,
-                "file_index": int(file_index),
-                "info": info,
-                "data": df,
-                "path": path
-            })
+        entry = load_data_file(path, float32=float32, lazy=lazy, rois=rois)
+        if entry is not None:
+            data_entries.append(entry)
 
+    if despike:
+        despike_entries(data_entries)
     return data_entries
@@ -0,0 +1,137 @@
+# instrumentation.py
+"""
+Lightweight timing of hot paths.
+
+    with span("update_plot.draw"):
+        ...
+
+    @timed("load_data_files")
+    def load_data_files(...): ...
+
+Every span updates per-name counters (calls, total, max, last). While
+recording is on, spans are also kept as trace events that export_trace()
+writes in the Chrome trace-event format (open in chrome://tracing or
+https://ui.perfetto.dev). Listeners are called after each span, which is
+how the GUI timing overlay is fed.
+"""
+from __future__ import annotations
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+
+@dataclass
+class SpanStats:
+    calls: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    last_s: float = 0.0
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.calls if self.calls else 0.0
+
+
+_lock = threading.Lock()
+_stats: Dict[str, SpanStats] = {}
+_events: deque = deque(maxlen=200_000)
+_listeners: List[Callable[[str, float], None]] = []
+_recording = bool(os.environ.get("ROAPY_TRACE"))
+_t0 = time.perf_counter()
+
+
+@contextmanager
+def span(name: str, **args):
+    """Time the enclosed block under name; extra keyword args go into the trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _record(name, start, end, args)
+
+
+def timed(name: str | None = None):
+    """Decorator form of span(); defaults to the function's qualified name."""
+    def deco(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            with span(label):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+
+def _record(name, start, end, args):
+    dur = end - start
+    with _lock:
+        st = _stats.setdefault(name, SpanStats())
+        st.calls += 1
+        st.total_s += dur
+        st.last_s = dur
+        st.max_s = max(st.max_s, dur)
+        if _recording:
+            _events.append({
+                "name": name, "ph": "X", "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "ts": (start - _t0) * 1e6, "dur": dur * 1e6,
+                "args": {k: str(v) for k, v in args.items()},
+            })
+        listeners = list(_listeners)
+    for fn in listeners:
+        fn(name, dur)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Bump a plain counter (no timing), e.g. cache hits."""
+    with _lock:
+        _stats.setdefault(name, SpanStats()).calls += n
+
+
+# ---------- Queries / control ----------
+def stats() -> Dict[str, SpanStats]:
+    with _lock:
+        return {k: SpanStats(**vars(v)) for k, v in _stats.items()}
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+        _events.clear()
+
+
+def set_recording(on: bool) -> None:
+    global _recording
+    _recording = on
+
+
+def is_recording() -> bool:
+    return _recording
+
+
+def add_listener(fn: Callable[[str, float], None]) -> None:
+    _listeners.append(fn)
+
+
+def remove_listener(fn: Callable[[str, float], None]) -> None:
+    if fn in _listeners:
+        _listeners.remove(fn)
+
+
+def export_trace(path: str) -> int:
+    """Write recorded spans as a Chrome trace JSON file; returns #events."""
+    with _lock:
+        events = list(_events)
+        summary = {k: vars(v) for k, v in _stats.items()}
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                   "otherData": {"summary": summary}}, f)
+    return len(events)
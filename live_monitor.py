@@ -0,0 +1,99 @@
+# live_monitor.py
+import os
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+from file_loader import load_data_file
+
+
+class LiveMonitor(QObject):
+    """
+    Tails working directories for spectrum files written during acquisition.
+
+    Directory change notifications trigger a scan straight away; a slow
+    fallback poll covers file systems (network shares) that do not deliver
+    them. A new file is loaded once its size is unchanged between two scans
+    spaced ``settle_ms`` apart, so a finished cycle reaches the UI within
+    roughly ``settle_ms`` of being written (``fallback_ms`` without
+    notifications).
+    """
+    entries_loaded = pyqtSignal(list)
+
+    def __init__(self, load_fn=load_data_file, settle_ms: int = 200,
+                 fallback_ms: int = 2000, parent=None):
+        super().__init__(parent)
+        self._load_fn = load_fn
+        self._dirs: list[str] = []
+        self._known: set[str] = set()
+        self._pending: dict[str, int] = {}  # path -> size seen on last scan
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(lambda _path: self.scan())
+
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(settle_ms)
+        self._settle_timer.timeout.connect(self.scan)
+
+        self._fallback_timer = QTimer(self)
+        self._fallback_timer.setInterval(fallback_ms)
+        self._fallback_timer.timeout.connect(self.scan)
+
+    # ---------- Public API ----------
+    def start(self, directories, known_paths) -> None:
+        """Start tailing directories; files in known_paths are never reported."""
+        self.stop()
+        self._dirs = list(directories)
+        self._known = set(known_paths)
+        if self._dirs:
+            self._watcher.addPaths(self._dirs)
+        self._fallback_timer.start()
+        self.scan()
+
+    def stop(self) -> None:
+        if self._watcher.directories():
+            self._watcher.removePaths(self._watcher.directories())
+        self._settle_timer.stop()
+        self._fallback_timer.stop()
+        self._pending.clear()
+
+    def is_running(self) -> bool:
+        return self._fallback_timer.isActive()
+
+    def mark_known(self, paths) -> None:
+        """Record files loaded elsewhere (e.g. by Refresh) so they are skipped."""
+        self._known.update(paths)
+
+    def scan(self) -> None:
+        ready = []
+        for directory in self._dirs:
+            try:
+                listing = list(os.scandir(directory))
+            except OSError:
+                continue
+            for de in listing:
+                path = de.path
+                if not de.name.endswith("_out.txt") or path in self._known:
+                    continue
+                try:
+                    size = de.stat().st_size
+                except OSError:
+                    continue
+                if size > 0 and self._pending.get(path) == size:
+                    ready.append(path)
+                else:
+                    self._pending[path] = size
+
+        entries = []
+        for path in sorted(ready):
+            try:
+                entry = self._load_fn(path)
+            except Exception:
+                continue  # still being written; retry on the next scan
+            self._pending.pop(path, None)
+            self._known.add(path)
+            if entry is not None:
+                entries.append(entry)
+
+        if self._pending:
+            self._settle_timer.start()
+        if entries:
+            self.entries_loaded.emit(entries)
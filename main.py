@@ -1,9 +1,11 @@
 # main.py
+import multiprocessing
 import sys
 from PyQt6.QtWidgets import QApplication
 from window import MainWindow
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # worker processes of frozen builds (als_sweep)
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
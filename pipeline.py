@@ -0,0 +1,253 @@
+# pipeline.py
+"""
+Declarative processing pipeline with memoized stages.
+
+    result = PIPELINE.run(name, entries, recipe)   # load → despike → sum →
+    result.outputs                                 # normalize → baseline → merge → export
+
+The state between stages is one Node per camera (after merging: "AB").
+Every node carries a fingerprint derived from the fingerprints of its
+inputs and the parameters the stage reads (file stamps at the load stage),
+and stage results are memoized under it. Per-camera stages are memoized per
+node, so changing a late parameter recomputes only that stage and the ones
+after it, and only for the spectra whose inputs changed.
+
+Parameters come from any object with the attributes the stages name
+(batch_jobs.Recipe). Normalization runs on the summed spectrum, as in the
+main window.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Tuple
+from baseline_manager import BaselineManager
+from cycle_stats import CycleAccumulator, group_cycles, find_outlier_cycles, summed_info
+from data_processor import baseline_als, merge_a_b, normalize_by_time
+from exporter import export_combined, export_separately
+from file_loader import crop, despike_series
+from instrumentation import span, count
+
+
+@dataclass(frozen=True)
+class Node:
+    value: Any                 # list of cycle entries before "sum", a DataFrame after
+    fingerprint: str
+    info: dict | None = None
+    label: str | None = None   # used in output file names
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: Callable               # per_node: fn(node, params) -> Node; else fn(state, params, name) -> state
+    params: Tuple[str, ...]    # parameter attributes the result depends on
+    per_node: bool = False
+    sink: bool = False         # fn returns written paths; the state passes on unchanged
+    enabled: Callable[[Any], bool] = lambda params: True
+
+
+@dataclass
+class PipelineResult:
+    state: Dict[str, Node]
+    outputs: List[str] = field(default_factory=list)
+    computed: List[str] = field(default_factory=list)  # stages not served from the memo
+
+
+def fingerprint(*parts) -> str:
+    return hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+
+
+class StageCache:
+    """Bounded LRU of stage results keyed by (stage, input fingerprint, parameters)."""
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        return None
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class Pipeline:
+    """Ordered stages plus an export sink, sharing one StageCache."""
+    def __init__(self, stages: List[Stage], cache: StageCache | None = None):
+        self.stages = stages
+        self.cache = cache or StageCache()
+
+    def active_stages(self, params) -> List[str]:
+        return ["load"] + [s.name for s in self.stages if s.enabled(params)]
+
+    def run(self, name: str, entries, params,
+            progress: Callable[[int, int, str], None] | None = None) -> PipelineResult:
+        """Run all enabled stages over one experiment's file entries."""
+        active = self.active_stages(params)
+        report = (lambda stage: progress(active.index(stage), len(active), stage)) if progress \
+            else (lambda stage: None)
+
+        report("load")
+        state = load_series(entries)
+        if not state:
+            raise ValueError(f"no measurement cycles for {name}")
+        result = PipelineResult(state)
+        for stage in self.stages:
+            if not stage.enabled(params):
+                continue  # pass-through: fingerprints unchanged
+            report(stage.name)
+            pkey = tuple((p, repr(getattr(params, p))) for p in stage.params)
+            with span(f"pipeline.{stage.name}"):
+                if stage.per_node:
+                    state = {cam: self._memo(stage, (node.fingerprint,), pkey, result,
+                                             lambda node=node: stage.fn(node, params))
+                             for cam, node in state.items()}
+                else:
+                    fps = tuple(sorted((cam, n.fingerprint) for cam, n in state.items()))
+                    out = self._memo(stage, (name,) + fps, pkey, result,
+                                     lambda state=state: stage.fn(state, params, name))
+                    if stage.sink:
+                        result.outputs += out
+                    else:
+                        state = out
+            result.state = state
+        return result
+
+    def _memo(self, stage, inputs, pkey, result, compute):
+        key = (stage.name, inputs, pkey)
+        out = self.cache.get(key)
+        if out is not None and stage.sink and not all(os.path.exists(p) for p in out):
+            out = None  # files were removed since: write them again
+        if out is None:
+            out = compute()
+            self.cache.put(key, out)
+            if stage.name not in result.computed:
+                result.computed.append(stage.name)
+        else:
+            count(f"pipeline.{stage.name}.hit")
+        return out
+
+
+# ---------- Source ----------
+def load_series(entries) -> Dict[str, Node]:
+    """Per-camera cycle series of one experiment, fingerprinted by file stamps."""
+    series: Dict[str, list] = {}
+    for e in entries:
+        if isinstance(e['file_index'], int):
+            series.setdefault(e['camera'], []).append(e)
+    state = {}
+    for cam, members in sorted(series.items()):
+        members.sort(key=lambda e: e['file_index'])
+        stamps = []
+        for e in members:
+            path = e.get('path')
+            try:
+                st = os.stat(path)
+                stamp = (st.st_mtime_ns, st.st_size)
+            except (OSError, TypeError):
+                stamp = id(e)  # not backed by a file: never shared
+            stamps.append((path, e['file_index'], stamp, e.get('despiked'), e.get('roi')))
+        state[cam] = Node(members, fingerprint("load", cam, tuple(stamps)))
+    return state
+
+
+# ---------- Stages ----------
+def _despike(node: Node, params) -> Node:
+    # runs on JobQueue threads: install the frames on the copies only, not in the parse cache
+    copies = [e.copy() for e in node.value]
+    frames = {path: (df, n_fixed) for path, _, df, n_fixed in despike_series(copies)}
+    for e in copies:
+        if e.get("path") in frames:
+            df, n_fixed = frames[e["path"]]
+            e["data"] = crop(df, e.get("roi"))
+            e["despiked"] = n_fixed
+    return replace(node, value=copies, fingerprint=fingerprint("despike", node.fingerprint))
+
+
+def _sum(state: Dict[str, Node], params, name) -> Dict[str, Node]:
+    cycles, order, prev = group_cycles(e for node in state.values() for e in node.value)
+    fp = fingerprint("sum", tuple(sorted((c, n.fingerprint) for c, n in state.items())),
+                     params.sum_cycles, params.reject_outliers)
+    if params.sum_cycles:
+        acc = CycleAccumulator(cycles, prev)
+        selected = order
+        if params.reject_outliers:
+            flagged = find_outlier_cycles(acc, order)
+            selected = [c for c in order if c not in flagged] or order
+        for c in selected:
+            acc.add(c)
+        first = cycles[order[0]]
+        info = summed_info((first.get('A') or first.get('B'))['info'], len(selected))
+        frames = {cam: acc.frame(cam, "sum") for cam in state}
+        return {cam: Node(df, fingerprint(fp, cam), info, "sum")
+                for cam, df in frames.items() if df is not None}
+    last = cycles[order[-1]]
+    return {cam: Node(e['data'], fingerprint(fp, cam), dict(e['info']), str(order[-1]))
+            for cam, e in sorted(last.items())}
+
+
+def _normalize(node: Node, params) -> Node:
+    return replace(node, value=normalize_by_time(node.value, node.info),
+                   fingerprint=fingerprint("normalize", node.fingerprint))
+
+
+def _baseline(node: Node, params) -> Node:
+    work = {'camera': 'x', 'data': node.value.copy()}
+    mgr = BaselineManager(lambda e: e['camera'], baseline_als)
+    mgr.create([work], {m: True for m in params.modalities}, params.baseline)
+    mgr.subtract([work])  # in place on the copy
+    return replace(node, value=work['data'],
+                   fingerprint=fingerprint("baseline", node.fingerprint,
+                                           repr(params.baseline), tuple(params.modalities)))
+
+
+def _merge(state: Dict[str, Node], params, name) -> Dict[str, Node]:
+    if 'A' not in state or 'B' not in state:
+        return state
+    a, b = state['A'], state['B']
+    return {'AB': Node(merge_a_b(a.value, b.value),
+                       fingerprint("merge", a.fingerprint, b.fingerprint), a.info, a.label)}
+
+
+def _export(state: Dict[str, Node], params, name) -> List[str]:
+    os.makedirs(params.output_dir, exist_ok=True)
+    base = os.path.join(params.output_dir, name)
+    outputs = []
+    for cam, node in state.items():
+        if params.export_format == "separate":
+            export_separately(base, [{'camera': cam, 'file_index': node.label, 'data': node.value}],
+                              params.modalities)
+            outputs += [f"{base}_{cam}_{node.label}_{mod}_{kind}.txt"
+                        for mod in params.modalities for kind in ("Raman", "ROA")]
+        else:
+            path = f"{base}_{cam}_{node.label}.txt"
+            export_combined(path, node.value)
+            outputs.append(path)
+    return outputs
+
+
+PIPELINE = Pipeline([
+    Stage("despike", _despike, ("despike",), per_node=True, enabled=lambda p: p.despike),
+    Stage("sum", _sum, ("sum_cycles", "reject_outliers")),
+    Stage("normalize", _normalize, (), per_node=True, enabled=lambda p: p.normalize),
+    Stage("baseline", _baseline, ("baseline", "modalities"), per_node=True,
+          enabled=lambda p: p.baseline is not None),
+    Stage("merge", _merge, (), enabled=lambda p: p.merge),
+    Stage("export", _export, ("export_format", "output_dir", "modalities"), sink=True,
+          enabled=lambda p: bool(p.output_dir)),
+])
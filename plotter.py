@@ -5,6 +5,9 @@ from matplotlib.backends.backend_qtagg import (
 )
 from matplotlib.figure import Figure
 from matplotlib.lines import Line2D
+from file_loader import MODALITIES, channel
+from instrumentation import span, timed
+from pyramid import pyramid_for, visible_range
 
 class SlimToolbar(NavigationToolbar2QT):
     # filter the toolitems to just the ones we want
@@ -31,44 +34,55 @@ class SpectraPlotter:
         # flag to ensure initial view is pushed once
         self._initial_view_pushed = False
 
+        # (camera, modality) -> (raman line, roa line) for the last full plot,
+        # so live updates can move data into existing artists
+        self._trace_keys = []
+        self._trace_lines = []
+        # (line, frame, column, axis) of every spectrum line: redrawn from the
+        # frame's min/max pyramid at the resolution of the visible range
+        self._sources = []
+        self._sources_xlim = None
+
         # connect for pan and wheel zoom
         self.canvas.mpl_connect("button_press_event", self._on_button_press)
         self.canvas.mpl_connect("motion_notify_event", self._on_motion)
         self.canvas.mpl_connect("button_release_event", self._on_button_release)
         self.canvas.mpl_connect("scroll_event", self._on_scroll)
+        self.canvas.mpl_connect("resize_event", lambda event: self._refresh_resolution(force=True))
 
+    @timed("update_plot")
     def update_plot(self, spectra_entries, modalities):
         # clear both axes
         self.ax_raman.clear()
         self.ax_roa.clear()
-        modality_keys = {
-            "SCP":   ("SCP Raman",  "SCP ROA"),
-            "DCPI":  ("DCPI Raman", "DCPI ROA"),
-            "DCPII": ("DCPII Raman","DCPII ROA"),
-            "SCPc":  ("SCPc Raman", "SCPc ROA")
-        }
+        modality_keys = MODALITIES
 
-        def _truncate(value, max_len=10):
-            s = str(value)
-            return s if len(s) <= max_len else s[:max_len] + "..."
+        self._trace_keys = []
+        self._trace_lines = []
+        self._sources = []
+        self._sources_xlim = None
+        # clear() replaced the axes' callback registries
+        for ax in (self.ax_raman, self.ax_roa):
+            ax.callbacks.connect("xlim_changed", lambda ax: self._refresh_resolution())
 
         # plot each trace into the appropriate axis
         for entry in spectra_entries:
             df = entry["data"]
-            cam = f"(Cam. {entry['camera']})"
-            truncated_index = _truncate(entry["file_index"], 20)
-            name = f"Cyc. {truncated_index}"
             for mod, (raman_col, roa_col) in modality_keys.items():
                 if modalities.get(mod):
                     # Raman on top
-                    self.ax_raman.plot(
-                        df["Wavenumber"], df[raman_col],
-                        label=f"{name} {cam} {mod}"
+                    (l_raman,) = self.ax_raman.plot(
+                        *self._points(df, raman_col, self.ax_raman),
+                        label=self._trace_label(entry, mod)
                     )
                     # ROA on bottom
-                    self.ax_roa.plot(
-                        df["Wavenumber"], df[roa_col],
+                    (l_roa,) = self.ax_roa.plot(
+                        *self._points(df, roa_col, self.ax_roa),
                     )
+                    self._trace_keys.append((entry["camera"], mod))
+                    self._trace_lines.append((l_raman, l_roa))
+                    self._sources += [(l_raman, df, raman_col, self.ax_raman),
+                                      (l_roa, df, roa_col, self.ax_roa)]
 
 
         # annotate axes
@@ -80,6 +94,87 @@ class SpectraPlotter:
         self.ax_raman.grid(True, linestyle='--', alpha=0.3)
         self.ax_roa.grid(True,   linestyle='--', alpha=0.3)
 
+        self._refresh_legend()
+
+        # tighten up spacing so labels don’t overlap
+        with span("update_plot.tight_layout"):
+            self.figure.tight_layout()
+        with span("update_plot.draw"):
+            self.canvas.draw()
+
+        # push the initial view into the toolbar's stack once so "home" works
+        if not self._initial_view_pushed:
+            self.toolbar.push_current()
+            self._initial_view_pushed = True
+
+    @timed("update_lines")
+    def update_lines(self, spectra_entries, modalities):
+        """
+        Move new data into the lines already on screen when the selection has
+        the same shape (same cameras and modalities) as the last plot, e.g. when
+        live mode advances to the next cycle. Falls back to a full replot.
+        """
+        keys = [(e["camera"], mod) for e in spectra_entries
+                for mod in MODALITIES if modalities.get(mod)]
+        if not keys or keys != self._trace_keys:
+            self.update_plot(spectra_entries, modalities)
+            return
+
+        lines = iter(self._trace_lines)
+        self._sources = []
+        self._sources_xlim = None
+        for entry in spectra_entries:
+            df = entry["data"]
+            for mod, (raman_col, roa_col) in MODALITIES.items():
+                if not modalities.get(mod):
+                    continue
+                l_raman, l_roa = next(lines)
+                l_raman.set_data(*self._points(df, raman_col, self.ax_raman))
+                l_raman.set_label(self._trace_label(entry, mod))
+                l_roa.set_data(*self._points(df, roa_col, self.ax_roa))
+                self._sources += [(l_raman, df, raman_col, self.ax_raman),
+                                  (l_roa, df, roa_col, self.ax_roa)]
+
+        for ax in (self.ax_raman, self.ax_roa):
+            ax.relim()
+            ax.autoscale_view()
+        self._refresh_resolution(force=True)  # a zoomed view stays zoomed
+        self._refresh_legend()
+        self.canvas.draw_idle()
+
+    @staticmethod
+    def _points(df, col, ax, xlim=None):
+        """Points of df[col] to draw on ax over xlim: raw, or min/max pairs of a pyramid level."""
+        x0, x1 = xlim if xlim is not None else (None, None)
+        if col in df.columns:
+            pixels = int(ax.get_window_extent().width) or 1000
+            points = pyramid_for(df).view(col, x0, x1, pixels)
+            if points is not None:
+                return points
+        x = df["Wavenumber"].to_numpy()
+        i0, i1 = visible_range(x, x0, x1)
+        return x[i0:i1], channel(df, col)[i0:i1]
+
+    def _refresh_resolution(self, force=False):
+        """Redraw the spectrum lines at the level of detail of the current view."""
+        xlim = tuple(self.ax_raman.get_xlim())
+        if not self._sources or (xlim == self._sources_xlim and not force):
+            return
+        self._sources_xlim = xlim
+        for line, df, col, ax in self._sources:
+            line.set_data(*self._points(df, col, ax, xlim))
+
+    @staticmethod
+    def _trace_label(entry, mod):
+        def _truncate(value, max_len=10):
+            s = str(value)
+            return s if len(s) <= max_len else s[:max_len] + "..."
+
+        cam = f"(Cam. {entry['camera']})"
+        truncated_index = _truncate(entry["file_index"], 20)
+        return f"Cyc. {truncated_index} {cam} {mod}"
+
+    def _refresh_legend(self):
         # legends (only if there are lines)
         if self.ax_raman.lines:
             # remove any existing legend
@@ -104,15 +199,6 @@ class SpectraPlotter:
                 # normal full legend
                 self.ax_raman.legend(loc="upper right", fontsize="small", frameon=True)
 
-        # tighten up spacing so labels don’t overlap
-        self.figure.tight_layout()
-        self.canvas.draw()
-
-        # push the initial view into the toolbar's stack once so "home" works
-        if not self._initial_view_pushed:
-            self.toolbar.push_current()
-            self._initial_view_pushed = True
-
     # ---- event handlers for smooth pan and wheel Y-zoom ----
     def _on_button_press(self, event):
         if event.button == 1 and event.inaxes in (self.ax_raman, self.ax_roa):
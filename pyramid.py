@@ -0,0 +1,123 @@
+# pyramid.py
+"""
+Min/max pyramids of spectra for drawing at screen resolution.
+
+Level k of a channel keeps the minimum and maximum of every 2**k
+consecutive points. Drawn as min/max pairs, it gives the same picture as
+the full-resolution line wherever a bin is narrower than a pixel.
+Pyramid.view() picks the coarsest level that still has about one bin per
+pixel over the visible range. Overviews of long spectra and tree
+thumbnails then draw a few hundred points instead of all of them.
+
+Levels start at bins of 2**MIN_LEVEL points and are stored as float32:
+about a quarter of the size of the float64 spectrum. Pyramids are cached
+per DataFrame object and dropped with it. Like the parse cache, this
+assumes frames are not modified in place (see file_loader);
+invalidate() is for the exceptions.
+"""
+from __future__ import annotations
+import threading
+import weakref
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+from instrumentation import count
+
+MIN_LEVEL = 3   # finer views draw the raw points
+
+
+def _pairs(a: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Even and odd columns; an odd last column is paired with itself."""
+    if a.shape[-1] % 2:
+        a = np.concatenate([a, a[..., -1:]], axis=-1)
+    return a[..., 0::2], a[..., 1::2]
+
+
+def visible_range(x: np.ndarray, x0: float | None, x1: float | None) -> Tuple[int, int]:
+    """Index range of ascending x within [x0, x1], one point of margin on each side."""
+    i0 = 0 if x0 is None else max(0, int(np.searchsorted(x, x0)) - 1)
+    i1 = len(x) if x1 is None else min(len(x), int(np.searchsorted(x, x1, side="right")) + 1)
+    return i0, i1
+
+
+class Pyramid:
+    """Min/max levels of every channel of one spectrum frame (x ascending)."""
+    def __init__(self, df: pd.DataFrame):
+        self.x = df["Wavenumber"].to_numpy(dtype=float)
+        self.columns = [c for c in df.columns if c != "Wavenumber"]
+        Y = df[self.columns].to_numpy(dtype=np.float32).T
+        # levels[k]: (x of the first point, x of the last point, mins, maxs) per bin of 2**k points
+        self.levels: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+        lo_x, hi_x, mins, maxs = self.x, self.x, Y, Y
+        k = 0
+        while lo_x.size > 1:
+            k += 1
+            lo_x, hi_x = _pairs(lo_x)[0], _pairs(hi_x)[1]
+            mins, maxs = np.minimum(*_pairs(mins)), np.maximum(*_pairs(maxs))
+            if k >= MIN_LEVEL:
+                self.levels[k] = (lo_x, hi_x, mins, maxs)
+        self.max_level = k
+
+    def level_for(self, n_points: int, pixels: int) -> int:
+        """Coarsest level with at least `pixels` bins over n_points points (0: raw)."""
+        k = int(np.log2(max(1.0, n_points / max(pixels, 1))))
+        k = min(k, self.max_level)
+        return k if k >= MIN_LEVEL else 0
+
+    def view(self, col: str, x0: float | None = None, x1: float | None = None,
+             pixels: int = 1000) -> Tuple[np.ndarray, np.ndarray] | None:
+        """
+        Min/max pairs to draw channel col over [x0, x1] on an axis `pixels`
+        wide (plus a bin of margin on each side, so panning shows no gaps),
+        or None if the raw points are few enough to draw as they are.
+        """
+        i0, i1 = visible_range(self.x, x0, x1)
+        k = self.level_for(i1 - i0, pixels)
+        if not k:
+            return None
+        lo_x, hi_x, mins, maxs = self.levels[k]
+        row = self.columns.index(col)
+        b0, b1 = max(0, (i0 >> k) - 1), min(len(lo_x), (i1 >> k) + 2)
+        xs = np.column_stack([lo_x[b0:b1], hi_x[b0:b1]]).ravel()
+        ys = np.column_stack([mins[row, b0:b1], maxs[row, b0:b1]]).ravel()
+        return xs, ys
+
+    def envelope(self, col: str, bins: int) -> Tuple[np.ndarray, np.ndarray] | None:
+        """Per-bin (min, max) of col at the finest level with at most `bins` bins."""
+        for k in sorted(self.levels):
+            _, _, mins, maxs = self.levels[k]
+            if mins.shape[1] <= bins:
+                row = self.columns.index(col)
+                return mins[row], maxs[row]
+        return None
+
+
+# ---------- Cache ----------
+_PYRAMIDS: Dict[int, Pyramid] = {}   # id(frame) -> its pyramid, while the frame lives
+_lock = threading.Lock()
+
+
+def pyramid_for(df: pd.DataFrame) -> Pyramid:
+    """The pyramid of df, built on first use."""
+    key = id(df)
+    with _lock:
+        pyr = _PYRAMIDS.get(key)
+    if pyr is not None:
+        count("pyramid_hit")
+        return pyr
+    pyr = Pyramid(df)
+    with _lock:
+        if key not in _PYRAMIDS:
+            _PYRAMIDS[key] = pyr
+            weakref.finalize(df, _forget, key)
+    return pyr
+
+
+def invalidate(df: pd.DataFrame) -> None:
+    """Drop the pyramid of a frame that was modified in place."""
+    _forget(id(df))
+
+
+def _forget(key: int) -> None:
+    with _lock:
+        _PYRAMIDS.pop(key, None)
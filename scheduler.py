@@ -0,0 +1,38 @@
+# scheduler.py
+from PyQt6.QtCore import QObject, QTimer
+
+
+class Debouncer(QObject):
+    """
+    Coalesce bursts of UI events into a single call.
+
+    schedule() (re)starts a single-shot timer; when it fires, callback runs
+    once no matter how many events arrived in between. flush() runs a
+    pending call immediately and cancel() drops it, e.g. when the work was
+    just done synchronously anyway.
+    """
+    def __init__(self, callback, delay_ms: int = 40, parent=None):
+        super().__init__(parent)
+        self._callback = callback
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._fire)
+
+    def schedule(self, *_args) -> None:
+        # *_args: lets it be connected directly to signals carrying values
+        self._timer.start()
+
+    def pending(self) -> bool:
+        return self._timer.isActive()
+
+    def cancel(self) -> None:
+        self._timer.stop()
+
+    def flush(self) -> None:
+        if self._timer.isActive():
+            self._timer.stop()
+            self._fire()
+
+    def _fire(self) -> None:
+        self._callback()
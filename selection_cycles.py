@@ -1,12 +1,22 @@
 # selection_cycles.py
+import numpy as np
 from PyQt6.QtWidgets import (
-    QWidget, QSplitter, QListWidget, QListWidgetItem,
-    QPushButton, QVBoxLayout, QHBoxLayout, QMessageBox
+    QWidget, QSplitter, QListWidget, QListWidgetItem, QLabel, QComboBox, QStackedWidget,
+    QPushButton, QVBoxLayout, QHBoxLayout, QMessageBox, QCheckBox
 )
 from PyQt6.QtCore import Qt
+from matplotlib import colormaps, rcParams
 from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-import pandas as pd
+from cycle_stats import CycleAccumulator, group_cycles, find_outlier_cycles, summed_info
+from instrumentation import timed
+
+VIEWS = ("Overlay", "Heatmap", "Waterfall")
+LINE_COLORS = rcParams['axes.prop_cycle'].by_key()['color']
+OVERLAY_LINEWIDTH = 0.8   # thin lines keep overlays of many Δs readable and draw faster
+MAX_ROW_TICKS = 12
 
 class SelectionOfCyclesWindow(QWidget):
     def __init__(self, main_window, exp_name):
@@ -18,20 +28,13 @@ class SelectionOfCyclesWindow(QWidget):
 
         # Filter entries for current experiment
         entries = [e for e in main_window.data_entries if e['name'] == exp_name]
-        # Group entries by cycle index
-        self.cycles = {}  # cycle_index -> {'A': entryA, 'B': entryB}
-        for e in entries:
-            idx = e['file_index']
-            cam = e['camera']
-            self.cycles.setdefault(idx, {})[cam] = e
-        self.sorted_cycles = sorted(self.cycles.keys(), key=lambda x: (isinstance(x, str), x))
-        real_cycle_keys = [k for k in self.cycles.keys() if isinstance(k, int)]
-        self.sorted_cycles = sorted(real_cycle_keys)
-        # Map each cycle to its previous cycle (for Δ calculation)
-        self.prev_cycle = {
-            cycle: (self.sorted_cycles[i-1] if i > 0 else None)
-            for i, cycle in enumerate(self.sorted_cycles)
-        }
+        # cycle_index -> {'A': entryA, 'B': entryB}, ordering and Δ predecessors
+        self.cycles, self.sorted_cycles, self.prev_cycle = group_cycles(entries)
+        # Running Δ statistics of the checked cycles, per camera
+        self.accumulator = CycleAccumulator(self.cycles, self.prev_cycle)
+        # (cycle, camera) -> (Δ array the lines show, their Line2Ds); hidden, not removed, on uncheck
+        self._lines = {}
+        self._colors = {}   # (cycle, camera) -> colour of all its lines, kept across re-creation
 
         # Build UI: splitter with controls (left) and plot (right)
         splitter = QSplitter(Qt.Orientation.Horizontal, self)
@@ -62,19 +65,68 @@ class SelectionOfCyclesWindow(QWidget):
         self.btn_clear.clicked.connect(self.clear_selection)
         self.btn_help.clicked.connect(self.show_help)
 
+        outlier_row = QHBoxLayout()
+        self.btn_reject = QPushButton("Reject outliers")
+        self.btn_reject.setToolTip("Uncheck cycles whose Δ has cosmic-ray spikes or deviates from the others.")
+        self.chk_auto_reject = QCheckBox("Auto-reject before summation")
+        outlier_row.addWidget(self.btn_reject)
+        outlier_row.addWidget(self.chk_auto_reject)
+        left_layout.addLayout(outlier_row)
+        self.btn_reject.clicked.connect(self.on_reject_outliers)
+
+        self.chk_weighted = QCheckBox("Noise-weighted summation")
+        self.chk_weighted.setToolTip(
+            "Weight each cycle by 1/σ² of its ROA noise and export the per-point\n"
+            "uncertainty of the result as extra columns.")
+        left_layout.addWidget(self.chk_weighted)
+
         splitter.addWidget(left)
 
-        # ── Right panel: Matplotlib canvas ──
+        # ── Right panel: view controls + Matplotlib canvases ──
         right = QWidget()
         right_layout = QVBoxLayout(right)
-        self.figure = Figure()
+        view_row = QHBoxLayout()
+        self.view_combo = QComboBox()
+        self.view_combo.addItems(VIEWS)
+        self.view_combo.setToolTip("Overlay: Δ of the checked cycles.\n"
+                                   "Heatmap / Waterfall: Δ of all cycles for one camera and channel;\n"
+                                   "click a row to check or uncheck that cycle.")
+        self.cam_combo = QComboBox()
+        self.cam_combo.addItems([cam for cam in ('A', 'B')
+                                 if any(cam in cams for cams in self.cycles.values())])
+        self.channel_combo = QComboBox()
+        view_row.addWidget(QLabel("View"))
+        view_row.addWidget(self.view_combo)
+        view_row.addWidget(QLabel("Camera"))
+        view_row.addWidget(self.cam_combo)
+        view_row.addWidget(QLabel("Channel"))
+        view_row.addWidget(self.channel_combo, 1)
+        right_layout.addLayout(view_row)
+        self._fill_channels()
+        self.view_combo.currentIndexChanged.connect(self.on_view_changed)
+        self.cam_combo.currentIndexChanged.connect(self._on_camera_changed)
+        self.channel_combo.currentIndexChanged.connect(self._on_image_changed)
+
+        self.views = QStackedWidget()
+        self.figure = Figure(layout="tight")
         self.canvas = FigureCanvas(self.figure)
         self.ax_raman = self.figure.add_subplot(211)
         self.ax_roa = self.figure.add_subplot(212, sharex=self.ax_raman)
         self.ax_raman.set_ylabel("Raman Intensity")
         self.ax_roa.set_xlabel("Wavenumber")
         self.ax_roa.set_ylabel("ROA Intensity")
-        right_layout.addWidget(self.canvas)
+        self.views.addWidget(self.canvas)
+
+        # One image (heatmap) or one line collection (waterfall) of all cycles
+        self.image_figure = Figure()
+        self.image_canvas = FigureCanvas(self.image_figure)
+        self.ax_image = None
+        self._image_rows = []       # cycle of each image row
+        self._row_step = 1.0        # y distance between rows
+        self._image_stale = True
+        self.image_canvas.mpl_connect('button_press_event', self.on_image_click)
+        self.views.addWidget(self.image_canvas)
+        right_layout.addWidget(self.views)
         splitter.addWidget(right)
         splitter.setSizes([int(0.3 * self.width()), int(0.7 * self.width())])
 
@@ -89,65 +141,272 @@ class SelectionOfCyclesWindow(QWidget):
         self.setLayout(main_layout)
 
     def select_all(self):
-        for i in range(self.list_widget.count()):
-            self.list_widget.item(i).setCheckState(Qt.CheckState.Checked)
+        self.set_checked(None, True)
 
     def clear_selection(self):
-        for i in range(self.list_widget.count()):
-            self.list_widget.item(i).setCheckState(Qt.CheckState.Unchecked)
+        self.set_checked(None, False)
+
+    @timed("SelectionOfCyclesWindow.set_checked")
+    def set_checked(self, cycles, checked: bool):
+        """
+        Check or uncheck `cycles` (None: all) in one go: the list's signals
+        are blocked while the items change, then the statistics and lines
+        are updated and the canvas redrawn once.
+        """
+        state = Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked
+        changed = []
+        self.list_widget.blockSignals(True)
+        try:
+            for i in range(self.list_widget.count()):
+                item = self.list_widget.item(i)
+                cycle = item.data(Qt.ItemDataRole.UserRole)
+                if (cycles is None or cycle in cycles) and item.checkState() != state:
+                    item.setCheckState(state)
+                    changed.append(cycle)
+        finally:
+            self.list_widget.blockSignals(False)
+        if changed:
+            self._apply_toggles(changed, checked)
+
+    def reject_outliers(self, cycles=None):
+        """Uncheck outlier cycles among `cycles` (default: all); returns {cycle: reason}."""
+        cycles = self.sorted_cycles if cycles is None else cycles
+        flagged = find_outlier_cycles(self.accumulator, cycles)
+        self.set_checked(set(flagged), False)
+        return flagged
+
+    def on_reject_outliers(self):
+        flagged = self.reject_outliers()
+        if not flagged:
+            QMessageBox.information(self, "Reject outliers", "No outlier cycles found.")
+            return
+        lines = "\n".join(f"Cycle {c}: {why}" for c, why in sorted(flagged.items()))
+        QMessageBox.information(self, "Reject outliers",
+                                f"Unchecked {len(flagged)} cycle(s):\n{lines}")
 
     def show_help(self):
         QMessageBox.information(
             self, "Help",
             "Check one or more cycles\n"
             "▶ cycles overlay their Δ signals as soon as they're toggled\n"
-            "▶ click 'Summate selected cycles' to combine into a new spectrum"
+            "▶ 'Reject outliers' unchecks cycles with spikes or deviating Δ\n"
+            "▶ 'Heatmap' and 'Waterfall' show the Δ of all cycles at once;\n"
+            "   click a row to check or uncheck that cycle\n"
+            "▶ click 'Summate selected cycles' to combine into a new spectrum;\n"
+            "   'Noise-weighted summation' weights cycles by their ROA noise"
         )
 
+    def add_cycle_entries(self, entries):
+        """
+        Take in cycles acquired while the window is open (live mode) and
+        overlay their Δ straight away.
+        """
+        touched = []
+        for e in entries:
+            idx = e['file_index']
+            if e['name'] != self.exp_name or not isinstance(idx, int):
+                continue
+            self.cycles.setdefault(idx, {})[e['camera']] = e
+            if idx not in touched:
+                touched.append(idx)
+        if not touched:
+            return
+
+        self.sorted_cycles = sorted(k for k in self.cycles.keys() if isinstance(k, int))
+        self.prev_cycle = {
+            cycle: (self.sorted_cycles[i-1] if i > 0 else None)
+            for i, cycle in enumerate(self.sorted_cycles)
+        }
+        self.accumulator.update_cycles(self.prev_cycle)
+        items = {self.list_widget.item(i).data(Qt.ItemDataRole.UserRole): self.list_widget.item(i)
+                 for i in range(self.list_widget.count())}
+        self._image_stale = True
+        if self.views.currentIndex():
+            self.draw_cycle_image()
+        for cycle in sorted(touched):
+            if cycle not in items:
+                item = QListWidgetItem(f"Cycle {cycle}")
+                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+                item.setCheckState(Qt.CheckState.Unchecked)
+                item.setData(Qt.ItemDataRole.UserRole, cycle)
+                self.list_widget.insertItem(self.sorted_cycles.index(cycle), item)
+        # cycles already shown may have a new Δ (new camera or predecessor)
+        for cycle in self.accumulator.selected:
+            self._show_cycle(cycle, True)
+        self.set_checked(set(touched), True)
+        self._redraw()
+
+    # ---------- Heatmap / waterfall ----------
+    def _fill_channels(self):
+        cam = self.cam_combo.currentText()
+        current = self.channel_combo.currentText() or "SCP ROA"
+        cols = self.accumulator.columns(cam) if cam else []
+        self.channel_combo.blockSignals(True)
+        self.channel_combo.clear()
+        self.channel_combo.addItems(cols)
+        if current in cols:
+            self.channel_combo.setCurrentText(current)
+        self.channel_combo.blockSignals(False)
+
+    def _on_camera_changed(self):
+        self._fill_channels()
+        self._on_image_changed()
+
+    def _on_image_changed(self):
+        self._image_stale = True
+        if self.views.currentIndex():
+            self.draw_cycle_image()
+
+    def on_view_changed(self, index):
+        self.views.setCurrentIndex(1 if index else 0)
+        if index:
+            self._image_stale = True
+            self.draw_cycle_image()
+
+    @timed("SelectionOfCyclesWindow.draw_cycle_image")
+    def draw_cycle_image(self):
+        """
+        Δ of every cycle for the chosen camera and channel: one row per
+        cycle, drawn as a single image (heatmap) or a single line
+        collection offset per row (waterfall).
+        """
+        if not self._image_stale:
+            return
+        self._image_stale = False
+        self.image_figure.clear()
+        ax = self.ax_image = self.image_figure.add_subplot(111)
+        cam, col = self.cam_combo.currentText(), self.channel_combo.currentText()
+        cols = self.accumulator.columns(cam) if cam else []
+        keys, d = self.accumulator.stacked(cam, self.sorted_cycles) if col in cols else ([], None)
+        self._image_rows = keys
+        if not keys:
+            self.image_canvas.draw()
+            return
+        z = d[:, :, cols.index(col)]
+        x = self.cycles[keys[0]][cam]['data']['Wavenumber'].to_numpy()
+        n = len(keys)
+
+        if self.view_combo.currentText() == "Heatmap":
+            if 'ROA' in col:  # signed: diverging colours centred on zero
+                hi = float(np.percentile(np.abs(z), 99)) or 1.0
+                cmap, lo = 'RdBu_r', -hi
+            else:
+                lo, hi = (float(v) for v in np.percentile(z, [1, 99]))
+                cmap = 'viridis'
+            im = ax.imshow(z, aspect='auto', origin='lower', interpolation='nearest',
+                           extent=(x[0], x[-1], -0.5, n - 0.5), cmap=cmap, vmin=lo, vmax=hi)
+            self.image_figure.colorbar(im, ax=ax, label=f"Δ {col}")
+            self._row_step = 1.0
+        else:
+            # rows half the 1–99 % range of all Δs apart, so spikes don't flatten them
+            lo, hi = np.percentile(z, [1, 99])
+            self._row_step = float(hi - lo) / 2 or 1.0
+            offsets = self._row_step * np.arange(n)
+            segments = np.empty((n, len(x), 2))
+            segments[:, :, 0] = x
+            segments[:, :, 1] = z + offsets[:, None]
+            colors = colormaps['viridis'](np.linspace(0, 1, n))
+            ax.add_collection(LineCollection(segments, linewidths=0.6, colors=colors))
+            ax.set_xlim(x.min(), x.max())
+            ax.set_ylim(-self._row_step, offsets[-1] + 2 * self._row_step)
+
+        rows = np.arange(0, n, max(1, -(-n // MAX_ROW_TICKS)))
+        ax.set_yticks(rows * self._row_step)
+        ax.set_yticklabels([str(keys[r]) for r in rows])
+        ax.set_ylabel("Cycle")
+        ax.set_xlabel("Wavenumber")
+        ax.set_title(f"Δ {col} (Cam {cam}), {n} cycles")
+        self.image_figure.tight_layout()
+        self.image_canvas.draw()
+
+    def on_image_click(self, event):
+        """Check or uncheck the cycle of the clicked row."""
+        if event.inaxes is not self.ax_image or event.ydata is None or not self._image_rows:
+            return
+        row = int(round(event.ydata / self._row_step))
+        if not 0 <= row < len(self._image_rows):
+            return
+        cycle = self._image_rows[row]
+        for i in range(self.list_widget.count()):
+            item = self.list_widget.item(i)
+            if item.data(Qt.ItemDataRole.UserRole) == cycle:
+                checked = item.checkState() == Qt.CheckState.Checked
+                item.setCheckState(Qt.CheckState.Unchecked if checked else Qt.CheckState.Checked)
+                self.list_widget.setCurrentItem(item)
+                self.list_widget.scrollToItem(item)
+                break
+
+    # ---------- Overlay ----------
+    @timed("SelectionOfCyclesWindow.on_toggle_cycle")
     def on_toggle_cycle(self, item: QListWidgetItem):
         cycle = item.data(Qt.ItemDataRole.UserRole)
-        prev = self.prev_cycle[cycle]
+        self._apply_toggles([cycle], item.checkState() == Qt.CheckState.Checked)
+
+    def _apply_toggles(self, cycles, checked: bool):
+        for cycle in cycles:
+            if checked:
+                self.accumulator.add(cycle)
+            else:
+                self.accumulator.remove(cycle)
+            self._show_cycle(cycle, checked)
+        self._redraw()
 
-        # Plot or remove Δ traces for both cameras
+    def _show_cycle(self, cycle, visible: bool):
         for cam in ('A', 'B'):
-            entry = self.cycles[cycle].get(cam)
-            if not entry:
+            if cam not in self.cycles.get(cycle, {}):
                 continue
-            df_curr = entry['data']
-            # Determine previous spectrum
-            if prev is None or cam not in self.cycles.get(prev, {}):
-                df_prev = df_curr.copy()
-                for c in df_prev.columns:
-                    if c != 'Wavenumber':
-                        df_prev[c] = 0
+            if visible:
+                artists = self._cycle_artists(cycle, cam)
             else:
-                df_prev = self.cycles[prev][cam]['data']
-            # Compute Δ
-            df_delta = df_curr.copy()
-            for c in df_curr.columns:
-                if c != 'Wavenumber':
-                    df_delta[c] = df_curr[c] - df_prev[c]
-
-            label_prefix = f"Δ Cycle {cycle} (Cam {cam})"
-            # Add or remove lines
-            if item.checkState() == Qt.CheckState.Checked:
-                # Raman:
-                for c in df_delta.columns:
-                    if 'Raman' in c:
-                        self.ax_raman.plot(df_delta['Wavenumber'], df_delta[c], label=f"{label_prefix} {c}")
-                # ROA:
-                for c in df_delta.columns:
-                    if 'ROA' in c:
-                        self.ax_roa.plot(df_delta['Wavenumber'], df_delta[c], label=f"{label_prefix} {c}")
-            else:
-                # Remove matching lines
-                for ax in (self.ax_raman, self.ax_roa):
-                    lines_to_remove = [ln for ln in ax.lines if f"Δ Cycle {cycle} (Cam" in ln.get_label()]
-                    for ln in lines_to_remove:
-                        ln.remove()
-        # Refresh legend & canvas
-        self.figure.tight_layout()
-        self.canvas.draw()
+                artists = self._lines.get((cycle, cam), (None, []))[1]
+            for art, _ in artists:
+                art.set_visible(visible)
+
+    def _cycle_artists(self, cycle, cam):
+        """
+        Lines of one cycle's Δ for one camera with their data extents,
+        created on first use. They bypass Axes.plot's per-line autoscaling;
+        _redraw() fits the axes once from the cached extents.
+        """
+        delta = self.accumulator.delta(cycle, cam)
+        cached = self._lines.get((cycle, cam))
+        if cached is not None and cached[0] is delta:
+            return cached[1]
+        if cached is not None:  # the Δ was recomputed (live mode)
+            for art, _ in cached[1]:
+                art.remove()
+        x = self.cycles[cycle][cam]['data']['Wavenumber'].to_numpy()
+        x_lo, x_hi = float(x.min()), float(x.max())
+        color = self._colors.setdefault((cycle, cam), LINE_COLORS[len(self._colors) % len(LINE_COLORS)])
+        artists = []
+        for j, c in enumerate(self.accumulator.columns(cam)):
+            ax = self.ax_roa if 'ROA' in c else self.ax_raman if 'Raman' in c else None
+            y = delta[:, j]
+            if ax is None or not y.any():  # modality absent in this cycle
+                continue
+            line = Line2D(x, y, color=color,
+                          linewidth=OVERLAY_LINEWIDTH, label=f"Δ Cycle {cycle} (Cam {cam}) {c}")
+            ax.add_artist(line)
+            artists.append((line, (x_lo, x_hi, float(y.min()), float(y.max()))))
+        self._lines[(cycle, cam)] = (delta, artists)
+        return artists
+
+    def _redraw(self):
+        """Fit both axes to the visible Δs and schedule one repaint."""
+        limits = {self.ax_raman: [], self.ax_roa: []}
+        for _, artists in self._lines.values():
+            for art, ext in artists:
+                if art.get_visible():
+                    limits[art.axes].append(ext)
+        for ax, exts in limits.items():
+            if not exts:
+                continue
+            x0, x1, y0, y1 = np.array(exts).T
+            x0, x1, y0, y1 = x0.min(), x1.max(), y0.min(), y1.max()
+            pad = 0.05 * (y1 - y0) or 1.0
+            ax.set_xlim(x0, x1)
+            ax.set_ylim(y0 - pad, y1 + pad)
+        self.canvas.draw_idle()
 
     def summate_selected(self):
         # Collect selected cycles
@@ -156,6 +415,9 @@ class SelectionOfCyclesWindow(QWidget):
             for i in range(self.list_widget.count())
             if self.list_widget.item(i).checkState() == Qt.CheckState.Checked
         ]
+        if selected and self.chk_auto_reject.isChecked():
+            flagged = self.reject_outliers(selected)
+            selected = [c for c in selected if c not in flagged]
         if not selected:
             QMessageBox.warning(self, "No selection", "Please select at least one cycle.")
             return
@@ -164,78 +426,46 @@ class SelectionOfCyclesWindow(QWidget):
         first_cycle = self.sorted_cycles[0]
         first_entry = self.cycles[first_cycle].get('A') or self.cycles[first_cycle].get('B')
         first_info = first_entry['info']
-        # Compute new metadata
         n_sel = len(selected)
-        cycles_per_file = first_info.get('num_cycles', 1)
-        gain = first_info.get('gain', None)
-        power = first_info.get('power', None)
-        total_time_per_file = 0
-        tt = first_info.get('total_time', 0)
-        if isinstance(tt, (list, tuple)):
-            total_time_per_file = sum(tt)
+
+
+        if self.chk_weighted.isChecked():
+            # inverse-variance weighted, with the per-point uncertainty
+            weighted = self.accumulator.weighted(('A', 'B'), selected)
+            sums = [(cam, *weighted[cam]) for cam in ('A', 'B') if cam in weighted]
         else:
-            total_time_per_file = float(tt) if tt is not None else 0
-
-
-        # Prepare metadata and Δ data lists
-        gains, powers, times = [], [], []
-        deltas_A, deltas_B = [], []
-        for cycle in selected:
-            for cam, container in (('A', deltas_A), ('B', deltas_B)):
-                entry = self.cycles[cycle].get(cam)
-                if not entry:
-                    continue
-                info = entry['info']
-                if cam == 'A':
-                    gains.append(info['gain'])
-                    powers.append(info['power'])
-                    t = info['total_time']
-                    times.append(sum(t) if isinstance(t, (list, tuple)) else t)
-                # Δ computation same as on_toggle
-                prev = self.prev_cycle[cycle]
-                df_curr = entry['data']
-                if prev is None or cam not in self.cycles.get(prev, {}):
-                    df_prev = df_curr.copy()
-                    for c in df_prev.columns:
-                        if c != 'Wavenumber': df_prev[c] = 0
-                else:
-                    df_prev = self.cycles[prev][cam]['data']
-                df_delta = df_curr.copy()
-                for c in df_curr.columns:
-                    if c != 'Wavenumber': df_delta[c] = df_curr[c] - df_prev[c]
-                container.append(df_delta)
-
-        # Sum pointwise
-        def sum_dfs(dfs):
-            df_sum = dfs[0].copy()
-            for df in dfs[1:]:
-                for c in df.columns:
-                    if c != 'Wavenumber':
-                        df_sum[c] += df[c]
-            return df_sum
-
-        sum_A = sum_dfs(deltas_A)
-        sum_B = sum_dfs(deltas_B)
+            # Sums of the selected Δs come straight from the running accumulators
+            for cycle in selected:
+                self.accumulator.add(cycle)
+            sums = [(cam, self.accumulator.frame(cam, "sum"), None, None) for cam in ('A', 'B')]
 
         # Build new spectrum entries
         name = self.exp_name
-        meta = {
-            'num_cycles': cycles_per_file * n_sel,
-            'gain': gain,
-            'power': power,
-            'total_time': [total_time_per_file * n_sel],
-        }
+        meta = summed_info(first_info, n_sel)
         new_entries = []
         cycles_str = ",".join(str(c) for c in selected)
-        for cam, df in (('A', sum_A), ('B', sum_B)):
-            new_entries.append({
+        for cam, df, sigma, weights in sums:
+            if df is None:
+                continue
+            entry = {
                 'name': name,
                 'camera': cam,
-                'file_index': f"sum_{cycles_str}",
+                'file_index': f"{'wsum' if weights else 'sum'}_{cycles_str}",
                 'info': meta,
                 'data': df,
                 'path': None,
-            })
+                # how the spectrum was made, kept in session snapshots
+                'provenance': {
+                    'op': 'weighted_sum' if weights else 'sum',
+                    'cycles': list(selected),
+                    'sources': [self.cycles[c][cam].get('path') for c in selected
+                                if cam in self.cycles[c]],
+                },
+            }
+            if weights:
+                entry['uncertainty'] = sigma   # per-point standard error, same columns as data
+                entry['provenance']['weights'] = [weights.get(c) for c in selected]
+            new_entries.append(entry)
 
         # Insert into main window and close
         self.main_window.add_spectrum_entries(new_entries)
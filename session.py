@@ -0,0 +1,185 @@
+# session.py
+"""
+Session snapshots.
+
+save_session() writes the loaded spectra, the BaselineManager cache and
+the view state into one uncompressed .npz file: a JSON header plus one
+flat array per channel and dtype, into which the spectra are
+concatenated. Restoring is then a few sequential reads and slicing, not
+parsing every file again.
+
+- Lazily loaded file cycles whose body was never replaced are stored
+  as header records and come back lazy.
+- Other file cycles keep their data (e.g. despiked) and are re-read
+  only if the file changed since the snapshot. Cropped cycles keep
+  their ``roi``.
+- Derived spectra (sums, baseline-corrected copies) always keep their
+  data, lazy or not, and are never re-read from a file. They carry their
+  ``provenance`` record, and noise-weighted sums their ``uncertainty``.
+"""
+from __future__ import annotations
+import dataclasses
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from baseline_manager import BaselineParams
+from file_loader import LazyEntry, load_data_file, roi_key
+from instrumentation import timed, count
+
+SESSION_VERSION = 1
+SESSION_FILTER = "ROApy sessions (*.npz)"
+_META_KEY = "__meta__"
+
+# entry keys saved as is (besides data); everything else is dropped
+_ENTRY_KEYS = ("name", "camera", "file_index", "info", "path", "despiked",
+               "absent_modalities", "__norm__", "__kind__", "range", "provenance", "roi")
+
+
+@dataclass
+class Session:
+    entries: List[dict]
+    baselines: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict)
+    baseline_params: Dict[str, BaselineParams] = field(default_factory=dict)
+    state: dict = field(default_factory=dict)   # window state, see MainWindow.session_state
+    reloaded: int = 0    # file cycles re-read because the file changed
+    missing: int = 0     # lazy file cycles dropped because the file is gone
+
+
+class _Packer:
+    """Concatenates arrays per (name, dtype) and hands out (key, offset, length) refs."""
+    def __init__(self):
+        self.parts: Dict[str, list] = {}
+        self.sizes: Dict[str, int] = {}
+
+    def add(self, name: str, values) -> list:
+        arr = np.ascontiguousarray(values)
+        key = f"{name}|{arr.dtype.str}"
+        offset = self.sizes.get(key, 0)
+        self.parts.setdefault(key, []).append(arr)
+        self.sizes[key] = offset + len(arr)
+        return [key, offset, len(arr)]
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {key: np.concatenate(parts) for key, parts in self.parts.items()}
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _derived(e) -> bool:
+    """Sums, baseline-corrected copies etc.: their data is not what the file holds."""
+    return not isinstance(e.get("file_index"), int) or e.get("provenance") is not None
+
+
+def _owns_data(e) -> bool:
+    return _derived(e) or not isinstance(e, LazyEntry) or dict.__contains__(e, "data")
+
+
+def _single_precision(e) -> bool:
+    """Whether the entry was loaded with float32 storage; eager entries tell by their dtype."""
+    if isinstance(e, LazyEntry) and not dict.__contains__(e, "data"):
+        return e.float32
+    return any(dtype == np.float32 for col, dtype in e["data"].dtypes.items() if col != "Wavenumber")
+
+
+@timed("save_session")
+def save_session(path: str, entries: List[dict], baselines: Dict[str, Dict[str, np.ndarray]],
+                 baseline_params: Dict[str, BaselineParams], state: dict) -> None:
+    """Write a snapshot; the file is replaced atomically."""
+    packer = _Packer()
+    records = []
+    for e in entries:
+        rec = {k: e[k] for k in _ENTRY_KEYS if dict.__contains__(e, k)}
+        rec["float32"] = _single_precision(e)
+        if _owns_data(e):
+            df = e["data"]
+            rec["columns"] = [[col] + packer.add(col, df[col].to_numpy()) for col in df.columns]
+            if not _derived(e):   # derived data is never replaced by the file's
+                rec["stamp"] = _stamp(e.get("path"))
+        sigma = e.get("uncertainty") if not isinstance(e, LazyEntry) else None
+        if sigma is not None:
+            rec["uncertainty"] = [[col] + packer.add(f"uncertainty:{col}", sigma[col].to_numpy())
+                                  for col in sigma.columns]
+        records.append(rec)
+    baseline_records = [
+        {"uid": uid,
+         "params": dataclasses.asdict(baseline_params[uid]) if uid in baseline_params else None,
+         "columns": [[col] + packer.add(f"baseline:{col}", z) for col, z in bas.items()]}
+        for uid, bas in baselines.items()
+    ]
+    meta = {"version": SESSION_VERSION, "entries": records,
+            "baselines": baseline_records, "state": state}
+    arrays = packer.arrays()
+    arrays[_META_KEY] = np.frombuffer(json.dumps(meta, default=_json_default).encode(), dtype=np.uint8)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+@timed("load_session")
+def load_session(path: str) -> Session:
+    """Read a snapshot written by save_session(); raises ValueError if it is not one."""
+    with np.load(path, allow_pickle=False) as npz:
+        if _META_KEY not in npz.files:
+            raise ValueError(f"{os.path.basename(path)} is not a ROApy session")
+        meta = json.loads(npz[_META_KEY].tobytes())
+        if meta.get("version", 0) > SESSION_VERSION:
+            raise ValueError(f"session version {meta['version']} is newer than this program")
+        arrays = {key: npz[key] for key in npz.files if key != _META_KEY}
+
+    def column(ref):
+        key, offset, n = ref
+        return arrays[key][offset:offset + n]
+
+    session = Session(entries=[], state=meta.get("state", {}))
+    for rec in meta["entries"]:
+        columns = rec.pop("columns", None)
+        stamp = rec.pop("stamp", None)
+        float32 = rec.pop("float32", False)
+        sigma = rec.pop("uncertainty", None)
+        file_path = rec.get("path")
+        if "roi" in rec:
+            rec["roi"] = roi_key(rec["roi"])
+        if columns is None:  # lazy file cycle: header only
+            if not file_path or not os.path.exists(file_path):
+                session.missing += 1
+                continue
+            session.entries.append(LazyEntry(rec, float32=float32))
+            continue
+        current = _stamp(file_path) if stamp is not None else None
+        if current is not None and current != stamp:
+            fresh = load_data_file(file_path, float32=float32,
+                                   rois={rec["name"]: rec["roi"]} if "roi" in rec else None)
+            if fresh is not None:
+                session.reloaded += 1
+                session.entries.append(fresh)
+                continue
+        rec["data"] = pd.DataFrame({col: column(ref) for col, *ref in columns})
+        if sigma is not None:
+            rec["uncertainty"] = pd.DataFrame({col: column(ref) for col, *ref in sigma})
+        session.entries.append(rec)
+
+    for rec in meta.get("baselines", []):
+        session.baselines[rec["uid"]] = {col: column(ref) for col, *ref in rec["columns"]}
+        if rec.get("params"):
+            session.baseline_params[rec["uid"]] = BaselineParams(**rec["params"])
+    count("session_entries", len(session.entries))
+    return session
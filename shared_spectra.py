@@ -0,0 +1,194 @@
+# shared_spectra.py
+"""
+Spectra in shared memory, for handing them to other processes.
+
+A SpectrumStore packs spectrum frames into one shared memory block, each
+as a (columns, points) float64 array, so every channel is contiguous.
+Its SpectrumDescriptors are small picklable records: block name, byte
+offset, points and column names. Any process can map a spectrum from
+one and read or write it in place; the frame itself is never pickled.
+
+    with SpectrumStore.from_frames([e['data'] for e in entries]) as store:
+        pool.submit(work, store.descriptors[0])   # worker: open_frame(desc)
+
+The process that made the store closes it, which also unlinks the block.
+Other processes map each block once and keep it mapped until detach()
+(one block, e.g. after a job) or detach_all() unmaps it. Single arrays use SharedArray, share(), attach() and
+adopt().
+
+Spawned workers share their parent's resource tracker, so a block is
+tracked once however many processes map it and unlinked exactly once,
+by its owner.
+"""
+from __future__ import annotations
+import threading
+import weakref
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+_ALIGN = 64   # byte alignment of each spectrum in a store
+
+
+# ---------- Single arrays ----------
+@dataclass(frozen=True)
+class SharedArray:
+    """Picklable handle of an array in a shared memory block."""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def share(arr: np.ndarray) -> Tuple[SharedMemory, SharedArray]:
+    """Copy arr into a new block; the caller closes and unlinks it when done."""
+    arr = np.ascontiguousarray(arr)
+    shm = SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, SharedArray(shm.name, arr.shape, arr.dtype.str)
+
+
+def attach(desc: SharedArray) -> Tuple[SharedMemory, np.ndarray]:
+    """Map a block as an array; close the block once the array is no longer used."""
+    shm = SharedMemory(name=desc.name)
+    return shm, np.ndarray(desc.shape, np.dtype(desc.dtype), buffer=shm.buf)
+
+
+def adopt(desc: SharedArray) -> np.ndarray:
+    """
+    Take over a block made by another process: returns a read-only view of
+    it that closes and unlinks the block when the array is garbage collected.
+    """
+    shm = SharedMemory(name=desc.name)
+    arr = np.ndarray(desc.shape, np.dtype(desc.dtype), buffer=shm.buf)
+    arr.flags.writeable = False
+    weakref.finalize(arr, release, shm)
+    return arr
+
+
+def release(shm: SharedMemory) -> None:
+    """Unmap (if nothing still views it) and unlink a block this process owns."""
+    try:
+        shm.close()
+    except BufferError:   # still viewed: unmapped when the views are collected
+        pass
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+# ---------- Spectra ----------
+@dataclass(frozen=True)
+class SpectrumDescriptor:
+    """Where one spectrum lives in a SpectrumStore block."""
+    block: str
+    offset: int               # bytes from the start of the block
+    n_points: int
+    columns: Tuple[str, ...]
+
+    @property
+    def nbytes(self) -> int:
+        return 8 * self.n_points * len(self.columns)
+
+
+def _view(buf, desc: SpectrumDescriptor) -> np.ndarray:
+    return np.ndarray((len(desc.columns), desc.n_points), np.float64,
+                      buffer=buf, offset=desc.offset)
+
+
+def _as_frame(arr: np.ndarray, columns) -> pd.DataFrame:
+    return pd.DataFrame(arr.T, columns=list(columns), copy=False)
+
+
+class SpectrumStore:
+    """One shared memory block holding several spectra; see the module docstring."""
+    def __init__(self, layouts: Sequence[Tuple[int, Sequence[str]]]):
+        """Allocate zeroed space for spectra of (points, column names)."""
+        self.descriptors: List[SpectrumDescriptor] = []
+        offset = 0
+        for n_points, columns in layouts:
+            self.descriptors.append(SpectrumDescriptor("", offset, int(n_points), tuple(columns)))
+            offset += -(-self.descriptors[-1].nbytes // _ALIGN) * _ALIGN
+        self._shm = SharedMemory(create=True, size=max(offset, 1))
+        self.descriptors = [SpectrumDescriptor(self._shm.name, d.offset, d.n_points, d.columns)
+                            for d in self.descriptors]
+
+    @classmethod
+    def from_frames(cls, frames: Sequence[pd.DataFrame]) -> "SpectrumStore":
+        """A store holding a copy of each frame (absent channels are not stored)."""
+        store = cls([(len(df), list(df.columns)) for df in frames])
+        for desc, df in zip(store.descriptors, frames):
+            store.array(desc)[...] = df.to_numpy(dtype=np.float64).T
+        return store
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def array(self, desc: SpectrumDescriptor) -> np.ndarray:
+        """Writable (columns, points) view of a spectrum of this store."""
+        return _view(self._shm.buf, desc)
+
+    def frame(self, desc: SpectrumDescriptor) -> pd.DataFrame:
+        """A spectrum of this store as a DataFrame over the shared memory."""
+        return _as_frame(self.array(desc), desc.columns)
+
+    def close(self) -> None:
+        """Unlink the block; it is unmapped here once no view of it is left."""
+        release(self._shm)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------- Other processes ----------
+_ATTACHED: Dict[str, SharedMemory] = {}   # block name -> mapping, per process
+_lock = threading.Lock()
+
+
+def _block(name: str) -> SharedMemory:
+    with _lock:
+        shm = _ATTACHED.get(name)
+        if shm is None:
+            shm = _ATTACHED[name] = SharedMemory(name=name)
+        return shm
+
+
+def open_array(desc: SpectrumDescriptor) -> np.ndarray:
+    """Writable (columns, points) view of a spectrum in another process's store."""
+    return _view(_block(desc.block).buf, desc)
+
+
+def open_frame(desc: SpectrumDescriptor) -> pd.DataFrame:
+    """A spectrum in another process's store as a DataFrame over the shared memory."""
+    return _as_frame(open_array(desc), desc.columns)
+
+
+def detach(name: str) -> bool:
+    """Unmap one block mapped by open_array()/open_frame(); False if it is still viewed."""
+    with _lock:
+        shm = _ATTACHED.get(name)
+        if shm is None:
+            return True
+        try:
+            shm.close()
+        except BufferError:
+            return False
+        del _ATTACHED[name]
+        return True
+
+
+def detach_all() -> None:
+    """Unmap every block mapped by open_array()/open_frame() that nothing still views."""
+    with _lock:
+        for name, shm in list(_ATTACHED.items()):
+            try:
+                shm.close()
+            except BufferError:
+                continue
+            del _ATTACHED[name]
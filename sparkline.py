@@ -0,0 +1,47 @@
+# sparkline.py
+from PyQt6.QtCore import Qt, QLineF
+from PyQt6.QtGui import QIcon, QPixmap, QPainter, QPen, QColor
+from file_loader import body_resident
+from pyramid import pyramid_for
+
+THUMB_WIDTH = 64
+THUMB_HEIGHT = 16
+
+
+def sparkline_icon(entries, col="SCP Raman", width=THUMB_WIDTH, height=THUMB_HEIGHT):
+    """
+    Thumbnail of channel col of the entries side by side (cameras A, B),
+    drawn as a per-pixel min/max envelope from their pyramids. None if a
+    body is not in memory: thumbnails never cause a file to be parsed.
+    """
+    if not entries or not all(body_resident(e) for e in entries):
+        return None
+    part = width // len(entries)
+    envelopes = []
+    for e in sorted(entries, key=lambda e: e['camera']):
+        df = e['data']
+        if col not in df.columns:
+            continue
+        env = pyramid_for(df).envelope(col, part)
+        if env is None:   # fewer points than pixels
+            y = df[col].to_numpy()
+            env = (y, y)
+        envelopes.append(env)
+    if not envelopes:
+        return None
+
+    lo = min(float(mins.min()) for mins, _ in envelopes)
+    hi = max(float(maxs.max()) for _, maxs in envelopes)
+    scale = (height - 2) / (hi - lo) if hi > lo else 0.0
+    pixmap = QPixmap(width, height)
+    pixmap.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(pixmap)
+    painter.setPen(QPen(QColor(31, 119, 180), 1))  # matplotlib's first line colour
+    for k, (mins, maxs) in enumerate(envelopes):
+        step = part / len(mins)
+        lines = [QLineF(k * part + j * step, height - 1 - (mn - lo) * scale,
+                        k * part + j * step, height - 1 - (mx - lo) * scale)
+                 for j, (mn, mx) in enumerate(zip(mins.tolist(), maxs.tolist()))]
+        painter.drawLines(lines)
+    painter.end()
+    return QIcon(pixmap)
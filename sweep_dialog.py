@@ -0,0 +1,142 @@
+# sweep_dialog.py
+import threading
+import numpy as np
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QSpinBox, QPushButton, QLabel,
+    QTableWidget, QTableWidgetItem, QProgressBar, QMessageBox
+)
+from PyQt6.QtCore import QThread, pyqtSignal
+from als_sweep import sweep, default_grid
+from instrumentation import span
+
+
+class SweepWorker(QThread):
+    """Runs als_sweep.sweep() off the GUI thread; the work itself is in worker processes."""
+    progress = pyqtSignal(int, int)      # grid points done, total
+    completed = pyqtSignal(list, bool)   # candidates best first, cancelled
+
+    def __init__(self, signals, band_width, niter, parent=None):
+        super().__init__(parent)
+        self.signals = signals
+        self.band_width = band_width
+        self.niter = niter
+        self._cancel = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def run(self):
+        with span("als_sweep", spectra=len(self.signals)):
+            results = sweep(self.signals, niter=self.niter, band_width=self.band_width,
+                            progress=self.progress.emit, cancelled=self._cancel.is_set)
+        self.completed.emit(results, self._cancel.is_set())
+
+
+class BaselineSweepDialog(QDialog):
+    """
+    Ranks (λ, p) pairs of the ALS baseline on the selected spectra, with
+    the baseline panel's maximum iterations, and applies the chosen pair
+    to the panel.
+    """
+    COLUMNS = ["Rank", "log₁₀ λ", "Pressure (scaled)", "Score"]
+    SHOWN = 10
+
+    def __init__(self, main_window, signals, spacing):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.signals = signals
+        self.spacing = spacing   # cm⁻¹ per point
+        self.worker = None
+        self.candidates = []
+        self.setWindowTitle("Find baseline parameters")
+        self.resize(460, 420)
+
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        self.spin_band = QSpinBox()
+        self.spin_band.setRange(5, 2000)
+        self.spin_band.setValue(80)
+        self.spin_band.setSuffix(" cm⁻¹")
+        self.spin_band.setToolTip("Features up to this wide are bands to keep; broader ones are background.")
+        form.addRow("Widest band:", self.spin_band)
+        layout.addLayout(form)
+        layout.addWidget(QLabel(f"{len(default_grid())} parameter pairs on {len(signals)} spectra; "
+                                "lower score is better."))
+
+        self.bar = QProgressBar()
+        layout.addWidget(self.bar)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.doubleClicked.connect(self.on_apply)
+        layout.addWidget(self.table)
+
+        btns = QHBoxLayout()
+        self.btn_run = QPushButton("Run")
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.setEnabled(False)
+        self.btn_apply = QPushButton("Apply")
+        self.btn_apply.setEnabled(False)
+        for btn in (self.btn_run, self.btn_cancel, self.btn_apply):
+            btns.addWidget(btn)
+        layout.addLayout(btns)
+        self.btn_run.clicked.connect(self.on_run)
+        self.btn_cancel.clicked.connect(self.on_cancel)
+        self.btn_apply.clicked.connect(self.on_apply)
+
+    def on_run(self):
+        band_width = max(1, int(round(self.spin_band.value() / self.spacing)))
+        niter = self.main_window.ui.max_iter_spin.value()
+        self.worker = SweepWorker(self.signals, band_width, niter, parent=self)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.completed.connect(self.on_completed)
+        self.bar.setValue(0)
+        self.bar.setFormat("%p%")
+        self.btn_run.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.worker.start()
+
+    def on_cancel(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def on_progress(self, done, total):
+        self.bar.setRange(0, total)
+        self.bar.setValue(done)
+
+    def on_completed(self, candidates, cancelled):
+        self.worker = None
+        self.btn_run.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+        self.candidates = candidates[:self.SHOWN]
+        self.table.setRowCount(len(self.candidates))
+        for row, c in enumerate(self.candidates):
+            values = (str(row + 1), f"{np.log10(c.lam):.1f}", f"{c.p * 1e4:.1f}", f"{c.score:.2f}")
+            for col, text in enumerate(values):
+                self.table.setItem(row, col, QTableWidgetItem(text))
+        if self.candidates:
+            self.table.selectRow(0)
+        self.btn_apply.setEnabled(bool(self.candidates))
+        if cancelled:
+            self.bar.setFormat("cancelled (%v of %m)")
+
+    def on_apply(self):
+        row = self.table.currentRow()
+        if not 0 <= row < len(self.candidates):
+            QMessageBox.information(self, "Find baseline parameters", "Select a row first.")
+            return
+        c = self.candidates[row]
+        ui = self.main_window.ui
+        ui.method_combo.setCurrentIndex(ui.method_combo.findData("als"))
+        ui.lam_spin.setValue(round(float(np.log10(c.lam)), 1))
+        ui.pressure_spin.setValue(round(c.p * 1e4, 1))
+        self.main_window.on_create_baseline()
+
+    def done(self, result):
+        # closing (Esc, window button) while running: stop the pool first
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        super().done(result)
@@ -3,8 +3,11 @@ from PyQt6.QtWidgets import (
     QWidget, QHBoxLayout, QVBoxLayout, QLabel, QTreeWidget, 
     QCheckBox, QGroupBox, QSpinBox, QPushButton, QListWidget,
     QDoubleSpinBox, QRadioButton, QFormLayout, QAbstractItemView,
-    QSizePolicy
+    QSizePolicy, QComboBox
 )
+from PyQt6.QtCore import QSize
+from baseline_methods import BASELINE_METHODS
+from sparkline import THUMB_WIDTH, THUMB_HEIGHT
 
 class SpectraViewerUI:
     def setup_ui(self, parent, plotter):
@@ -29,8 +32,49 @@ class SpectraViewerUI:
         self.btn_clear_all.setToolTip("Clear loaded spectra and start over from a new working directory.")
         dir_row.addWidget(self.btn_clear_all)
 
+        self.btn_live = QPushButton("Live")
+        self.btn_live.setCheckable(True)
+        self.btn_live.setToolTip("Follow the newest cycle while the spectrometer is writing files.")
+        dir_row.addWidget(self.btn_live)
+
         ctrl.addLayout(dir_row)
 
+        session_row = QHBoxLayout()
+        self.btn_save_session = QPushButton("Save Session…")
+        self.btn_save_session.setToolTip("Save loaded and derived spectra, baselines and view settings to one file.")
+        session_row.addWidget(self.btn_save_session)
+        self.btn_open_session = QPushButton("Open Session…")
+        self.btn_open_session.setToolTip("Restore a saved session instead of re-reading the working directories.")
+        session_row.addWidget(self.btn_open_session)
+        ctrl.addLayout(session_row)
+
+        self.chk_despike = QCheckBox("Remove cosmic spikes on load")
+        self.chk_despike.setToolTip("Detect single-pixel spikes from the cycle-to-cycle differences and correct them.")
+        ctrl.addWidget(self.chk_despike)
+        self.chk_float32 = QCheckBox("Single-precision storage")
+        self.chk_float32.setToolTip("Keep intensities as 32-bit floats: half the memory on big directories.")
+        ctrl.addWidget(self.chk_float32)
+
+        # wavenumber window of the selected experiment (applied when loading)
+        roi_row = QHBoxLayout()
+        roi_row.addWidget(QLabel("Region:"))
+        self.roi_lo_spin = QSpinBox()
+        self.roi_hi_spin = QSpinBox()
+        for spin in (self.roi_lo_spin, self.roi_hi_spin):
+            spin.setRange(-50, 4000)
+            spin.setSuffix(" cm⁻¹")
+            roi_row.addWidget(spin)
+        self.roi_lo_spin.setValue(100)
+        self.roi_hi_spin.setValue(2000)
+        self.btn_apply_roi = QPushButton("Crop")
+        self.btn_apply_roi.setToolTip("Work on this wavenumber range of the selected experiment only;\n"
+                                      "also applied whenever its files are loaded again.")
+        self.btn_full_roi = QPushButton("Full range")
+        self.btn_full_roi.setToolTip("Go back to the whole recorded range of the selected experiment.")
+        roi_row.addWidget(self.btn_apply_roi)
+        roi_row.addWidget(self.btn_full_roi)
+        ctrl.addLayout(roi_row)
+
         # Individual‐spectrum selector
         grp_list = QGroupBox("Spectra List")
         l_list = QVBoxLayout()
@@ -58,11 +102,18 @@ class SpectraViewerUI:
         # Tree list of spectra
         self.tree_list = QTreeWidget()
         self.tree_list.setHeaderHidden(True)
+        self.tree_list.setIconSize(QSize(THUMB_WIDTH, THUMB_HEIGHT))
         self.tree_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         l_list.addWidget(self.tree_list)
 
         self.btn_create_selection = QPushButton("Create selection of measurement cycles")
         l_list.addWidget(self.btn_create_selection)
+        self.btn_batch = QPushButton("Batch process experiments…")
+        self.btn_batch.setToolTip("Sum, normalize, baseline-correct, merge and export many experiments at once.")
+        l_list.addWidget(self.btn_batch)
+        self.btn_bands = QPushButton("Band convergence…")
+        self.btn_bands.setToolTip("Integrate bands in every cycle of the experiment and follow how they converge.")
+        l_list.addWidget(self.btn_bands)
         self.btn_toggle_norm = QPushButton("Normalize by Accumulation Time")
         l_list.addWidget(self.btn_toggle_norm)
 
@@ -94,11 +145,25 @@ class SpectraViewerUI:
         grp_bg = QGroupBox("Raman Baseline Removal")
         form = QFormLayout()
 
+        self.method_combo = QComboBox()
+        for method in BASELINE_METHODS.values():
+            self.method_combo.addItem(method.label, method.name)
+        self.method_combo.setToolTip("ALS/arPLS: precise; airPLS: fast; polynomial, rolling ball: quick previews.")
+        form.addRow("Method:", self.method_combo)
+
         self.max_iter_spin = QSpinBox()
         self.max_iter_spin.setRange(1, 1_000)
         self.max_iter_spin.setValue(100)
         form.addRow("Max iterations:", self.max_iter_spin)
 
+        self.lam_spin = QDoubleSpinBox()
+        self.lam_spin.setDecimals(1)
+        self.lam_spin.setRange(1.0, 10.0)
+        self.lam_spin.setSingleStep(1e-1)
+        self.lam_spin.setValue(5.0)
+        self.lam_spin.setToolTip("ALS smoothness λ as a power of ten; larger is stiffer.")
+        form.addRow("Stiffness (log₁₀ λ):", self.lam_spin)
+
         self.pressure_spin = QDoubleSpinBox()
         self.pressure_spin.setDecimals(1)
         self.pressure_spin.setRange(0.0, 10.0)
@@ -106,6 +171,17 @@ class SpectraViewerUI:
         self.pressure_spin.setValue(1e-1)
         form.addRow("Pressure (scaled):", self.pressure_spin)
 
+        self.order_spin = QSpinBox()
+        self.order_spin.setRange(1, 10)
+        self.order_spin.setValue(3)
+        form.addRow("Polynomial order:", self.order_spin)
+
+        self.half_window_spin = QSpinBox()
+        self.half_window_spin.setRange(2, 2000)
+        self.half_window_spin.setValue(50)
+        self.half_window_spin.setSuffix(" pts")
+        form.addRow("Ball radius:", self.half_window_spin)
+
         # baseline mode radio buttons
 
         # starting wavenumber for baseline
@@ -130,6 +206,10 @@ class SpectraViewerUI:
         buttons_layout.addWidget(self.btn_delete_baseline)
         form.addRow("", buttons_layout)  # empty label so buttons span the row
 
+        self.btn_sweep_baseline = QPushButton("Find parameters…")
+        self.btn_sweep_baseline.setToolTip("Try many stiffness/pressure pairs on the selection and rank them.")
+        form.addRow("", self.btn_sweep_baseline)
+
         grp_bg.setLayout(form)
         ctrl.addWidget(grp_bg)
 
@@ -137,6 +217,15 @@ class SpectraViewerUI:
         self.meta_list = QListWidget()
         ctrl.addWidget(self.meta_list)
 
+        timing_row = QHBoxLayout()
+        self.chk_show_timings = QCheckBox("Show timings")
+        self.chk_show_timings.setToolTip("Show how long loading, normalization, baselines, the tree and plotting take.")
+        self.btn_export_trace = QPushButton("Export trace…")
+        self.btn_export_trace.setToolTip("Save recorded timings as a Chrome trace file (chrome://tracing, Perfetto).")
+        timing_row.addWidget(self.chk_show_timings)
+        timing_row.addWidget(self.btn_export_trace)
+        ctrl.addLayout(timing_row)
+
         # ── plot area ──
         plot_container = QWidget()
         plot_l = QVBoxLayout(plot_container)
@@ -1,17 +1,51 @@
 # window.py
+import copy
+import dataclasses
+import json
 import os
-from PyQt6.QtWidgets import QFileDialog, QMessageBox, QMainWindow, QCheckBox, QTreeWidgetItem
+import time
+from PyQt6.QtWidgets import (
+    QFileDialog, QMessageBox, QMainWindow, QCheckBox, QTreeWidgetItem, QLabel,
+    QProgressBar, QPushButton
+)
 from PyQt6.QtGui import QIcon
-from PyQt6.QtCore import QSettings, Qt
+from PyQt6.QtCore import QSettings, Qt, QTimer
 import math
+import numpy as np
 from ui import SpectraViewerUI
-from file_loader import load_data_files
+from file_loader import (load_data_file, channel, clear_cache, despike_series, apply_despiked, body_known,
+                         roi_key, set_roi)
 from plotter import SpectraPlotter
-from data_processor import merge_a_b, baseline_als
-from baseline_manager import BaselineManager, BaselineParams
-from exporter import export_combined, export_separately
+from data_processor import baseline_als, estimate_noise, estimate_snr, normalize_by_time
+from baseline_manager import BaselineManager, BaselineParams, MOD_TO_COL
+from baseline_methods import get_method
+from compute_server import ComputeServer, frame_array
+from shared_spectra import SpectrumStore
 from selection_cycles import SelectionOfCyclesWindow
-import copy
+from batch_window import BatchProcessingWindow
+from band_window import BandConvergenceWindow
+from sweep_dialog import BaselineSweepDialog
+from live_monitor import LiveMonitor
+from scheduler import Debouncer
+from directory_loader import DirectoryLoader
+from sparkline import sparkline_icon
+from session import save_session, load_session, SESSION_FILTER
+import instrumentation
+from instrumentation import timed
+
+# span name -> short label in the timing overlay
+TIMING_LABELS = [
+    ("DirectoryLoader.run", "load"),
+    ("MainWindow._normalize_copy", "normalize"),
+    ("BaselineManager.create", "baseline"),
+    ("MainWindow._populate_individual_list", "tree"),
+    ("update_plot", "plot"),
+    ("update_plot.tight_layout", "layout"),
+    ("update_plot.draw", "draw"),
+]
+# at most this many Raman channels go into a baseline parameter sweep
+SWEEP_MAX_SPECTRA = 8
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -20,8 +54,17 @@ class MainWindow(QMainWindow):
         self.setWindowIcon(QIcon("app_icon.ico")) 
         self.resize(900, 900)
         self.baseline_mgr = BaselineManager(self._uid_for_entry, baseline_als)
+        # baselines, merges and exports run in worker processes
+        self.compute = ComputeServer(parent=self)
+        self._baseline_request = 0   # results of superseded baseline requests are dropped
+        self._baseline_busy = False  # a baseline request is being fitted
         self.normalized = False
 
+        # Selection/modality/camera events are coalesced: a burst of them
+        # leads to one tree rebuild (if needed), one recomputation and one redraw
+        self._selection_debouncer = Debouncer(self.on_selection_changed, parent=self)
+        self._tree_dirty = False
+
         # Plotter instantiation
         self.plotter = SpectraPlotter(self)
 
@@ -29,9 +72,42 @@ class MainWindow(QMainWindow):
         self.ui = SpectraViewerUI()
         self.ui.setup_ui(self, self.plotter)
         self.ui.btn_create_selection.clicked.connect(self.open_selection_window)
+        self.ui.btn_batch.clicked.connect(self.open_batch_window)
+        self.ui.btn_bands.clicked.connect(self.open_band_window)
         self.ui.btn_add_working_dir.clicked.connect(self.on_add_working_dir)
         self.ui.btn_refresh_working_dirs.clicked.connect(self.on_refresh_working_dirs)
         self.ui.btn_clear_all.clicked.connect(self.on_clear_all)
+        self.ui.btn_save_session.clicked.connect(self.on_save_session)
+        self.ui.btn_open_session.clicked.connect(self.on_open_session)
+        self.live_monitor = LiveMonitor(load_fn=self._load_file, parent=self)
+        self.live_monitor.entries_loaded.connect(self.on_live_entries)
+        self.ui.btn_live.toggled.connect(self.on_toggle_live)
+
+        # timing overlay (status bar), refreshed from the instrumentation counters
+        self.timing_label = QLabel()
+        self.timing_label.setVisible(False)
+        self.statusBar().addPermanentWidget(self.timing_label)
+        self._timing_timer = QTimer(self)
+        self._timing_timer.setInterval(500)
+        self._timing_timer.timeout.connect(self._refresh_timing_label)
+        self.ui.chk_show_timings.toggled.connect(self.on_toggle_timings)
+        self.ui.btn_export_trace.clicked.connect(self.on_export_trace)
+
+        # background loading progress (status bar)
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.setVisible(False)
+        self.btn_cancel_load = QPushButton("Cancel")
+        self.btn_cancel_load.setVisible(False)
+        self.btn_cancel_load.clicked.connect(self.on_cancel_loading)
+        self.statusBar().addPermanentWidget(self.load_progress)
+        self.statusBar().addPermanentWidget(self.btn_cancel_load)
+        self._loader = None
+        self._load_generation = 0
+        self._load_added = 0
+        self._pending_index = {}  # path -> header-only entry not parsed yet
+        self.data_entries = []
+        self.loaded_working_dirs = []
 
         # Connect the new button to opening selection window
         self.ui.btn_create_selection.clicked.connect(self.open_selection_window)
@@ -40,6 +116,16 @@ class MainWindow(QMainWindow):
         self.ui.btn_subtract_created.setEnabled(False)
         self.ui.btn_delete_baseline.setEnabled(False)
         self.settings = QSettings("MyOrg", "SpectraViewer")
+        # store intensities in single precision (halves memory on big directories)
+        self.float32_storage = self.settings.value("float32Storage", False, type=bool)
+        self.despike = self.settings.value("despikeOnLoad", False, type=bool)
+        # parse spectrum bodies only when first viewed (see LazyEntry)
+        self.lazy_bodies = self.settings.value("lazyBodies", True, type=bool)
+        # experiment name -> (lo, hi) wavenumber window its files are cropped to
+        self.rois = {name: roi_key(roi) for name, roi in
+                     json.loads(self.settings.value("regionsOfInterest", "{}")).items()}
+        self.ui.chk_despike.setChecked(self.despike)
+        self.ui.chk_float32.setChecked(self.float32_storage)
         last = self.settings.value("lastWorkingDir", os.getcwd())
         self.working_dir = self._select_working_directory(
             title="Select Working Directory",
@@ -47,24 +133,13 @@ class MainWindow(QMainWindow):
         )
         if not self.working_dir:
             self.close(); return
-        self.settings.setValue("lastWorkingDir", self.working_dir)
-        self.loaded_working_dirs = [self.working_dir]
 
-        # Load data
-        self.data_entries = load_data_files(self.working_dir)
-        if not self.data_entries:
-            QMessageBox.warning(
-                self, "No Data",
-                f"No valid spectra files found in:\n{self.working_dir}"
-            )
-            self.close(); return
-
-        # Initial population & signals
-        self._update_modalities()
-        self._populate_individual_list()
+        # Signals first: the tree and plot fill in while files are parsed
         self._connect_signals()
-        self._select_last_spectrum()
-        self.on_selection_changed()
+        self._start_loading([self.working_dir], "initial")
+
+    def _load_file(self, path, lazy=False):
+        return load_data_file(path, float32=self.float32_storage, lazy=lazy, rois=self.rois)
 
     def get_selected_entries(self):
         items = self.ui.tree_list.selectedItems()
@@ -77,6 +152,7 @@ class MainWindow(QMainWindow):
                 selected.append(raw)
         return selected
 
+    @timed("MainWindow._normalize_copy")
     def _normalize_copy(self, entries):
         """Return a NEW list of entries with data normalized if needed."""
         if not self.normalized:
@@ -84,14 +160,9 @@ class MainWindow(QMainWindow):
         out = []
         for e in entries:
             e2 = e.copy()
-            df = e['data']
-            norm_df = df.copy()
-            total_time = e['info'].get('total_time', [1.0])
-            duration = float(total_time[0]) if isinstance(total_time, (list, tuple)) else float(total_time)
-            for col in norm_df.columns:
-                if col != "Wavenumber":
-                    norm_df[col] = norm_df[col] / duration
-            e2['data'] = norm_df
+            e2['data'] = normalize_by_time(e['data'], e['info'])
+            if e.get('uncertainty') is not None:
+                e2['uncertainty'] = normalize_by_time(e['uncertainty'], e['info'])
             # mark the copy so the UID reflects normalization
             e2['__norm__'] = True
             out.append(e2)
@@ -119,7 +190,7 @@ class MainWindow(QMainWindow):
     def _connect_signals(self):
         ui = self.ui
         for w in (ui.mod_scp, ui.mod_dcpi, ui.mod_dcpii, ui.mod_scpc):
-            w.stateChanged.connect(self.on_selection_changed)
+            w.stateChanged.connect(self._selection_debouncer.schedule)
         for rb in (ui.radio_cam_a, ui.radio_cam_b, ui.radio_both):
             rb.toggled.connect(self._on_camera_mode_changed)            
         ui.btn_export_comb.clicked.connect(self.on_export_combined)
@@ -128,7 +199,14 @@ class MainWindow(QMainWindow):
         ui.btn_create_baseline.clicked.connect(self.on_create_baseline)
         ui.btn_subtract_created.clicked.connect(self.on_subtract_baseline)
         ui.btn_delete_baseline.clicked.connect(self.on_delete_baseline)
-        ui.tree_list.itemSelectionChanged.connect(self.on_selection_changed)
+        ui.btn_sweep_baseline.clicked.connect(self.on_sweep_baseline)
+        ui.method_combo.currentIndexChanged.connect(self._on_baseline_method_changed)
+        self._on_baseline_method_changed()
+        ui.tree_list.itemSelectionChanged.connect(self._selection_debouncer.schedule)
+        ui.chk_despike.toggled.connect(self.on_toggle_despike)
+        ui.chk_float32.toggled.connect(self.on_toggle_float32)
+        ui.btn_apply_roi.clicked.connect(self.on_apply_roi)
+        ui.btn_full_roi.clicked.connect(lambda: self._set_roi(None))
 
     def _on_experiment_changed(self):
         self._update_modalities()
@@ -153,10 +231,21 @@ class MainWindow(QMainWindow):
             "Text Files (*.txt)"
         )
         if not path: return
-        df=merge_a_b(sel[0]['data'],sel[1]['data'])
-        export_combined(path,df)
-        QMessageBox.information(self,"Export Combined",
-                                f"Combined spectrum written to:\n{path}")
+        a,cols_a=frame_array(sel[0]['data'])
+        b,cols_b=frame_array(sel[1]['data'])
+        sa,sb=sel[0].get('uncertainty'),sel[1].get('uncertainty')
+        sigmas=(sa[cols_a].to_numpy(),sb[cols_b].to_numpy()) if sa is not None and sb is not None \
+            else (None,None)
+
+        def done(result,error):
+            if error:
+                QMessageBox.warning(self,"Export Combined",f"Export failed:\n{error}")
+            else:
+                QMessageBox.information(self,"Export Combined",
+                                        f"Combined spectrum written to:\n{result}")
+        self.statusBar().showMessage("Exporting combined spectrum…",3000)
+        self.compute.submit("export_combined",a,b,*sigmas,columns_a=cols_a,columns_b=cols_b,
+                            path=path,on_done=done)
 
     def on_export_separate(self):
         sel=self.get_selected_entries()
@@ -172,16 +261,44 @@ class MainWindow(QMainWindow):
         )
         if not out_dir: return
         base=os.path.join(out_dir,sel[0]['name'])
-        export_separately(base,sel,mods)
-        QMessageBox.information(
-            self,"Export Separate",
-            f"Exported {2*len(sel)*len(mods)} files to:\n{out_dir}"
-        )
+        # one job per spectrum, run in parallel on one shared copy of the
+        # spectra (and uncertainties); report once all are done
+        sigmas=[e.get('uncertainty') for e in sel]
+        store=SpectrumStore.from_frames([e['data'] for e in sel]+[s for s in sigmas if s is not None])
+        pending={'jobs':len(sel),'files':0,'errors':[]}
+
+        def done(result,error):
+            pending['jobs']-=1
+            if error:
+                pending['errors'].append(error)
+            else:
+                pending['files']+=result
+            if pending['jobs']:
+                return
+            store.close()
+            if pending['errors']:
+                QMessageBox.warning(self,"Export Separate",
+                                    "Export failed:\n"+"\n".join(pending['errors']))
+            else:
+                QMessageBox.information(
+                    self,"Export Separate",
+                    f"Exported {pending['files']} files to:\n{out_dir}"
+                )
+        self.statusBar().showMessage("Exporting spectra…",3000)
+        sigma_descs=iter(store.descriptors[len(sel):])
+        for e,desc,sigma in zip(sel,store.descriptors,sigmas):
+            sigma_desc=next(sigma_descs) if sigma is not None else None
+            self.compute.submit("export_separately",desc,sigma_desc,
+                                columns=list(desc.columns),base=base,camera=e['camera'],
+                                file_index=e['file_index'],modalities=mods,
+                                sigma_columns=list(sigma_desc.columns) if sigma_desc else None,
+                                on_done=done)
 
     def _update_modalities(self):
         """
         Enable/disable each modality checkbox based on whether any data entry
-        contains non-zero values for that modality.
+        contains non-zero values for that modality. Lazy entries whose body
+        has not been read yet are skipped (see on_selection_changed).
         """
         entries = self.data_entries
         modality_info = {
@@ -194,6 +311,14 @@ class MainWindow(QMainWindow):
             cb: QCheckBox = getattr(self.ui, attr)
             present = False
             for e in entries:
+                if not body_known(e):
+                    continue
+                absent = e.get('absent_modalities')
+                if absent is not None:
+                    if mod not in absent:
+                        present = True
+                        break
+                    continue
                 df = e['data']
                 if r_col in df.columns and not df[r_col].isna().all() and df[r_col].any():
                     present = True
@@ -216,20 +341,38 @@ class MainWindow(QMainWindow):
             self.ui.btn_toggle_norm.setText("Normalize by Accumulation Time")
         self.on_selection_changed()
 
+    @timed("MainWindow.on_selection_changed")
     def on_selection_changed(self):
         """
         Gather selected entries, apply normalization if requested,
-        then plot and update metadata.
+        then plot and update metadata. Any debounced update still pending
+        is covered by this call and dropped, including a pending rebuild of
+        the tree (camera mode changed), which is done here first.
         """
+        self._selection_debouncer.cancel()
+        if self._tree_dirty:
+            self._tree_dirty = False
+            self._populate_individual_list()
         raw_sel = self.get_selected_entries()
+        first_read = not all(body_known(e) for e in raw_sel)
         sel = self._normalize_copy(raw_sel)
 
         mods = self.get_modalities()
         self.plotter.update_plot(sel, mods)
+        self._refresh_metadata(raw_sel)
+        self._update_baseline_buttons(sel)
+        self._show_roi(raw_sel)
+        if first_read:
+            self._update_modalities()  # lazily read bodies may add modalities
+            for item in self.ui.tree_list.selectedItems():
+                self._set_thumbnail(item)
+
+    def _refresh_metadata(self, raw_sel=None):
+        if raw_sel is None:
+            raw_sel = self.get_selected_entries()
         self.ui.meta_list.clear()
         for e in raw_sel:
             info = e['info']
-            self._update_baseline_buttons()
             num_cycles = info.get("num_cycles", "N/A")
             t = info.get("total_time")
             self.ui.meta_list.addItem(
@@ -238,27 +381,80 @@ class MainWindow(QMainWindow):
                 f"Power={info.get('power')}mW  TotalTime={t} s"
             )
             
+    def baseline_params(self) -> BaselineParams:
+        """Parameters of the Raman Baseline Removal panel."""
+        ui = self.ui
+        return BaselineParams(
+            lam=10 ** ui.lam_spin.value(),
+            p=ui.pressure_spin.value()*1e-4,
+            niter=ui.max_iter_spin.value(),
+            start_wavenumber=ui.start_wav_spin.value(),
+            method=ui.method_combo.currentData(),
+            order=ui.order_spin.value(),
+            half_window=ui.half_window_spin.value()
+        )
+
+    def _on_baseline_method_changed(self):
+        """Enable only the parameter inputs the chosen method reads."""
+        ui = self.ui
+        method = get_method(ui.method_combo.currentData())
+        for name, widget in (("lam", ui.lam_spin), ("p", ui.pressure_spin),
+                             ("niter", ui.max_iter_spin), ("order", ui.order_spin),
+                             ("half_window", ui.half_window_spin)):
+            widget.setEnabled(name in method.params)
+        ui.btn_sweep_baseline.setEnabled(method.name == "als")
+
     def on_create_baseline(self):
         sel = self._current_work_selection()
-        params = BaselineParams(
-            lam=1e5,
-            p=self.ui.pressure_spin.value()*1e-4,
-            niter=self.ui.max_iter_spin.value(),
-            start_wavenumber=self.ui.start_wav_spin.value()
-        )
+        params = self.baseline_params()
         mods = self.get_modalities()
 
-        self.baseline_mgr.create(sel, mods, params)
+        batches = self.baseline_mgr.plan(sel, mods, params)
+        self._baseline_request += 1
+        request = self._baseline_request
+        pending = [len(batches)]
+        errors = []
 
-        # replot spectra, then overlay baselines
-        self.plotter.update_plot(sel, mods)
-        self.plotter.draw_baselines(sel)
+        def finish():
+            self._baseline_busy = False
+            self.statusBar().clearMessage()
+            if errors:   # one message however many batches failed
+                QMessageBox.warning(self, "Create Baseline",
+                                    "Baseline fit failed:\n" + "\n".join(dict.fromkeys(errors)))
+            # replot what is shown now (the selection may have changed while
+            # fitting), then overlay the baselines it has
+            current = self._current_work_selection()
+            self.plotter.update_plot(current, self.get_modalities())
+            self.plotter.draw_baselines(current)
+            self._update_baseline_buttons(current)
+
+        def done(batch, Z, error):
+            if request != self._baseline_request:
+                return  # a newer request replaced these baselines
+            if error:
+                errors.append(error)
+            else:
+                self.baseline_mgr.apply(batch, Z)
+            pending[0] -= 1
+            if not pending[0]:
+                finish()
+
+        if not batches:
+            finish()
+            return
+        # plan() dropped the old baselines: nothing to subtract or delete until the fit is in
+        self._baseline_busy = True
         self._update_baseline_buttons()
+        self.statusBar().showMessage("Fitting baselines…")
+        for batch in batches:
+            self.compute.submit("baseline", batch.Y, params=dataclasses.asdict(params),
+                                on_done=lambda Z, error, batch=batch: done(batch, Z, error))
 
     def on_subtract_baseline(self):
         sel = self._current_work_selection()
         new_entries = []
         for e in sel:
+            params = self.baseline_mgr.params_for(e)
             # Deep copy the spectrum entry (so we don't change the original)
             new_entry = copy.deepcopy(e)
             # Actually subtract the baseline on the copy
@@ -271,39 +467,106 @@ class MainWindow(QMainWindow):
             # Optionally: add a tag in metadata
             new_entry['info'] = dict(new_entry['info'])  # make a shallow copy if needed
             new_entry['info']['baseline_corrected'] = True
+            new_entry['provenance'] = {
+                'op': 'baseline_subtraction',
+                'source': self._uid_for_entry(e),
+                'params': dataclasses.asdict(params) if params else None,
+                'parent': e.get('provenance'),
+            }
             new_entries.append(new_entry)
 
         # Insert new entries
         self.data_entries.extend(new_entries)
         self._populate_individual_list()
         self.on_selection_changed()
-        self._update_baseline_buttons()
+
+    def on_sweep_baseline(self):
+        """Rank ALS parameters on the Raman channels the baseline panel would fit."""
+        start = self.ui.start_wav_spin.value()
+        signals, steps = [], []
+        for e in self._current_work_selection():
+            df = e['data']
+            x = df["Wavenumber"].to_numpy()
+            idx0 = np.searchsorted(x, start)
+            for mod, on in self.get_modalities().items():
+                col = MOD_TO_COL[mod]
+                if on and col in df.columns and len(x) - idx0 > 10:
+                    signals.append(df[col].to_numpy()[idx0:])
+                    steps.append(np.median(np.abs(np.diff(x[idx0:]))))
+        if not signals:
+            QMessageBox.warning(self, "Find baseline parameters",
+                                "Select spectra with at least one Raman modality shown.")
+            return
+        # the sweep costs grid × spectra ALS fits: a sample is representative enough
+        signals = signals[:SWEEP_MAX_SPECTRA]
+        dlg = BaselineSweepDialog(self, signals, float(np.median(steps)) or 1.0)
+        dlg.show()
 
     def on_delete_baseline(self):
         self.baseline_mgr.clear()
         for e in self.data_entries:
             e.pop("baselines", None)
         self.on_selection_changed()
-        self._update_baseline_buttons()
 
-    def _update_baseline_buttons(self):
+    def _update_baseline_buttons(self, sel=None):
         """
         Enable the 'Subtract Baseline' and 'Delete Baseline' buttons
-        only if there is at least one baseline for the current selection.
+        only if there is at least one baseline for the current selection
+        (sel: the already normalized selection, if at hand). All baseline
+        buttons are disabled while a fit is in flight.
         """
-        sel = self._current_work_selection()
-        has_baseline = self.baseline_mgr.has_any(sel)
+        busy = self._baseline_busy
+        self.ui.btn_create_baseline.setEnabled(not busy)
+        if busy:
+            has_baseline = False
+        else:
+            if sel is None:
+                sel = self._current_work_selection()
+            has_baseline = self.baseline_mgr.has_any(sel)
         self.ui.btn_subtract_created.setEnabled(has_baseline)
         self.ui.btn_delete_baseline.setEnabled(has_baseline)
 
-    def _populate_individual_list(self):
-        self.ui.tree_list.clear()
-        cam_mode = (
+    def _camera_mode(self):
+        return (
             'A' if self.ui.radio_cam_a.isChecked() else
             'B' if self.ui.radio_cam_b.isChecked() else
             'Both'
         )
 
+    @staticmethod
+    def _cycle_sort_key(cycle):
+        # Sort integers numerically first, then strings alphabetically
+        return (isinstance(cycle, str), cycle)
+
+    @staticmethod
+    def _make_cycle_item(cycle, cams, cam_mode):
+        """Tree item for one cycle, or None if the camera mode hides it."""
+        if cam_mode in ('A', 'B'):
+            if cam_mode not in cams:
+                return None
+            data = cams[cam_mode]
+        else:  # Both
+            if 'A' not in cams or 'B' not in cams:
+                return None
+            data = [cams['A'], cams['B']]
+
+        item = QTreeWidgetItem([f"Cycle {cycle}"])
+        item.setData(0, Qt.ItemDataRole.UserRole, data)
+        return item
+
+    @timed("MainWindow._populate_individual_list")
+    def _populate_individual_list(self):
+        # callers refresh the plot themselves; don't emit selection changes
+        self.ui.tree_list.blockSignals(True)
+        try:
+            self._build_tree()
+        finally:
+            self.ui.tree_list.blockSignals(False)
+
+    def _build_tree(self):
+        self.ui.tree_list.clear()
+        cam_mode = self._camera_mode()
+
         # Group by experiment name
         by_experiment = {}
         for entry in self.data_entries:
@@ -318,31 +581,101 @@ class MainWindow(QMainWindow):
             for e in entries:
                 by_cycle.setdefault(e['file_index'], {})[e['camera']] = e
 
-            def _cycle_sort_key(cycle):
-                # Sort integers numerically first, then strings alphabetically
-                return (isinstance(cycle, str), cycle)
-
-            for cycle, cams in sorted(by_cycle.items(), key=lambda item: _cycle_sort_key(item[0])):
-                if cam_mode in ('A', 'B'):
-                    if cam_mode not in cams:
-                        continue
-                    data = cams[cam_mode]
-                else:  # Both
-                    if 'A' not in cams or 'B' not in cams:
-                        continue
-                    data = [cams['A'], cams['B']]
-
-                item = QTreeWidgetItem([f"Cycle {cycle}"])
-                item.setData(0, Qt.ItemDataRole.UserRole, data)
-                exp_item.addChild(item)
+            for cycle, cams in sorted(by_cycle.items(), key=lambda item: self._cycle_sort_key(item[0])):
+                item = self._make_cycle_item(cycle, cams, cam_mode)
+                if item is not None:
+                    exp_item.addChild(item)
+                    self._set_thumbnail(item)
 
             if exp_item.childCount() > 0:
                 self.ui.tree_list.addTopLevelItem(exp_item)
                 exp_item.setExpanded(True)
 
-    def _on_camera_mode_changed(self):
-        self._populate_individual_list()
-        self.on_selection_changed()
+        if self._pending_index:
+            self._insert_tree_cycles(list(self._pending_index.values()), placeholder=True)
+
+    def _insert_tree_cycles(self, entries, placeholder=False):
+        """
+        Add the cycles of newly loaded entries to the tree without rebuilding it.
+        Returns the inserted (or refreshed) cycle items.
+
+        With placeholder=True, entries are header-only index entries: their
+        cycles are added disabled (unselectable) where no item exists yet and
+        become regular items once the parsed entries are inserted.
+        """
+        tree = self.ui.tree_list
+        cam_mode = self._camera_mode()
+        touched = {(e['name'], e['file_index']): {} for e in entries}
+        for e in (entries if placeholder else self.data_entries):  # one pass, not one per cycle
+            cams = touched.get((e['name'], e['file_index']))
+            if cams is not None:
+                cams[e['camera']] = e
+        exp_items = {tree.topLevelItem(i).text(0): tree.topLevelItem(i)
+                     for i in range(tree.topLevelItemCount())}
+        children = {}  # exp name -> {label: item}, built on first use
+        items = []
+        for (exp_name, cycle), cams in sorted(touched.items(),
+                                              key=lambda kv: (kv[0][0], self._cycle_sort_key(kv[0][1]))):
+            item = self._make_cycle_item(cycle, cams, cam_mode)
+            if item is None:
+                continue
+
+            exp_item = exp_items.get(exp_name)
+            if exp_item is None:
+                exp_item = QTreeWidgetItem([exp_name])
+                exp_item.setFlags(exp_item.flags() & ~Qt.ItemFlag.ItemIsSelectable)
+                pos = sum(1 for i in range(tree.topLevelItemCount())
+                          if tree.topLevelItem(i).text(0) < exp_name)
+                tree.insertTopLevelItem(pos, exp_item)
+                exp_item.setExpanded(True)
+                exp_items[exp_name] = exp_item
+
+            labels = children.get(exp_name)
+            if labels is None:
+                labels = children[exp_name] = {exp_item.child(i).text(0): exp_item.child(i)
+                                               for i in range(exp_item.childCount())}
+            existing = labels.get(item.text(0))
+            if existing is not None:
+                if placeholder:
+                    continue
+                existing.setData(0, Qt.ItemDataRole.UserRole,
+                                 item.data(0, Qt.ItemDataRole.UserRole))
+                existing.setFlags(existing.flags() | Qt.ItemFlag.ItemIsEnabled)
+                items.append(existing)
+                continue
+            if placeholder:
+                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEnabled)
+            # children are sorted; new cycles almost always go last
+            pos = exp_item.childCount()
+            while pos > 0:
+                prev = exp_item.child(pos - 1).data(0, Qt.ItemDataRole.UserRole)
+                prev_cycle = (prev[0] if isinstance(prev, list) else prev)['file_index']
+                if self._cycle_sort_key(prev_cycle) < self._cycle_sort_key(cycle):
+                    break
+                pos -= 1
+            exp_item.insertChild(pos, item)
+            labels[item.text(0)] = item
+            items.append(item)
+        if not placeholder:
+            for item in items:
+                self._set_thumbnail(item)
+        return items
+
+    def _set_thumbnail(self, item):
+        """Sparkline of a cycle item's spectra; its experiment shows the newest cycle's."""
+        raw = item.data(0, Qt.ItemDataRole.UserRole)
+        icon = sparkline_icon(raw if isinstance(raw, list) else [raw])
+        if icon is None:
+            return
+        item.setIcon(0, icon)
+        parent = item.parent()
+        if parent is not None and parent.indexOfChild(item) == parent.childCount() - 1:
+            parent.setIcon(0, icon)
+
+    def _on_camera_mode_changed(self, checked=None):
+        # each radio switch emits toggled twice (old off, new on): rebuild once
+        self._tree_dirty = True
+        self._selection_debouncer.schedule()
 
     def open_selection_window(self):
         # avoid opening duplicates
@@ -355,6 +688,27 @@ class MainWindow(QMainWindow):
             self.selection_window = SelectionOfCyclesWindow(self, exp_name)
             self.selection_window.show()
 
+    def open_batch_window(self):
+        if hasattr(self, 'batch_window') and self.batch_window.isVisible():
+            self.batch_window.raise_()
+            self.batch_window.activateWindow()
+        else:
+            self.batch_window = BatchProcessingWindow(self)
+            self.batch_window.show()
+
+    def open_band_window(self):
+        sel = self.get_selected_entries()
+        if not sel:
+            QMessageBox.information(self, "Band convergence", "Select a cycle of the experiment first.")
+            return
+        bw = getattr(self, 'band_window', None)
+        if bw is not None and bw.isVisible() and bw.exp_name == sel[0]['name']:
+            bw.raise_()
+            bw.activateWindow()
+        else:
+            self.band_window = BandConvergenceWindow(self, sel[0]['name'])
+            self.band_window.show()
+
     def add_spectrum_entries(self, entries: list[dict]):
         # Called by SelectionOfCyclesWindow after summation
         self.data_entries.extend(entries)
@@ -362,17 +716,219 @@ class MainWindow(QMainWindow):
         self.on_selection_changed()
     def _select_last_spectrum(self):
         tree = self.ui.tree_list
-        # no experiments? bail
-        if tree.topLevelItemCount() == 0:
+        # pick the last loaded cycle (placeholders of files still being parsed are disabled)
+        for i in reversed(range(tree.topLevelItemCount())):
+            exp_item = tree.topLevelItem(i)
+            for j in reversed(range(exp_item.childCount())):
+                last_cycle = exp_item.child(j)
+                if last_cycle.flags() & Qt.ItemFlag.ItemIsEnabled:
+                    tree.setCurrentItem(last_cycle)      # focus
+                    last_cycle.setSelected(True)         # actually select
+                    return
+
+    def _drop_placeholders(self):
+        """Remove the tree items of indexed files that were never loaded."""
+        self._pending_index = {}
+        tree = self.ui.tree_list
+        for i in reversed(range(tree.topLevelItemCount())):
+            exp_item = tree.topLevelItem(i)
+            for j in reversed(range(exp_item.childCount())):
+                if not exp_item.child(j).flags() & Qt.ItemFlag.ItemIsEnabled:
+                    exp_item.takeChild(j)
+            if exp_item.childCount() == 0:
+                tree.takeTopLevelItem(i)
+
+    def on_toggle_timings(self, on):
+        """Show/hide the timing overlay; traces are recorded while it is on."""
+        instrumentation.set_recording(on or bool(os.environ.get("ROAPY_TRACE")))
+        self.timing_label.setVisible(on)
+        if on:
+            self._refresh_timing_label()
+            self._timing_timer.start()
+        else:
+            self._timing_timer.stop()
+
+    def _refresh_timing_label(self):
+        st = instrumentation.stats()
+        parts = [f"{label} {st[name].last_s * 1000:.0f} ms"
+                 for name, label in TIMING_LABELS if name in st]
+        hits = st.get("parse_cache_hit")
+        if hits:
+            parts.append(f"cache hits {hits.calls}")
+        self.timing_label.setText(" · ".join(parts) or "no timings yet")
+
+    def on_export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Trace", os.path.join(self.working_dir, "roapy-trace.json"),
+            "Trace files (*.json)"
+        )
+        if not path:
             return
-        # pick the last experiment node
-        last_exp = tree.topLevelItem(tree.topLevelItemCount() - 1)
-        if last_exp.childCount() == 0:
+        n = instrumentation.export_trace(path)
+        if n == 0:
+            QMessageBox.information(
+                self, "Export Trace",
+                "No spans were recorded. Turn on 'Show timings' (or set ROAPY_TRACE) "
+                "and repeat the slow action; per-span totals were still written."
+            )
+            return
+        QMessageBox.information(self, "Export Trace", f"Wrote {n} spans to:\n{path}")
+
+    def on_toggle_despike(self, on):
+        """Reload file spectra with/without despiking; derived spectra are kept."""
+        self.despike = on
+        self.settings.setValue("despikeOnLoad", on)
+        self._reload_file_spectra()
+
+    def on_toggle_float32(self, on):
+        """Reload file spectra in single/double precision; derived spectra are kept."""
+        self.float32_storage = on
+        self.settings.setValue("float32Storage", on)
+        self._reload_file_spectra()
+
+    def _reload_file_spectra(self):
+        """Load the working directories again; derived spectra are kept."""
+        self._cancel_loading()
+        self.data_entries = [e for e in self.data_entries if not isinstance(e["file_index"], int)]
+        self._populate_individual_list()
+        self._start_loading(list(self.loaded_working_dirs), "reload")
+
+    # ---------- Regions of interest ----------
+    def _show_roi(self, raw_sel):
+        """Show the window of the selected experiment (its whole range if uncropped)."""
+        if not raw_sel:
+            return
+        e = raw_sel[0]
+        roi = self.rois.get(e['name'])
+        if roi is None:
+            x = e['data']["Wavenumber"].to_numpy()
+            roi = (x[0], x[-1]) if len(x) else None
+        if roi is not None:
+            self.ui.roi_lo_spin.setValue(math.floor(roi[0]))
+            self.ui.roi_hi_spin.setValue(math.ceil(roi[1]))
+
+    def on_apply_roi(self):
+        lo, hi = self.ui.roi_lo_spin.value(), self.ui.roi_hi_spin.value()
+        if lo >= hi:
+            QMessageBox.warning(self, "Region of Interest", "The region must end above where it starts.")
+            return
+        self._set_roi((lo, hi))
+
+    def _set_roi(self, roi):
+        """
+        Crop the file cycles of the selected experiments to roi (None: full
+        range) and remember it for later loads. Cycles are re-cropped from
+        the full spectra in the parse cache, so a region can also be widened.
+        Their baselines were fitted on the old range and are dropped.
+        """
+        names = sorted({e['name'] for e in self.get_selected_entries()})
+        if not names:
+            self.statusBar().showMessage("Select a spectrum of the experiment to crop first.", 5000)
+            return
+        roi = roi_key(roi)
+        for name in names:
+            if roi is None:
+                self.rois.pop(name, None)
+            else:
+                self.rois[name] = roi
+        self.settings.setValue("regionsOfInterest", json.dumps(self.rois))
+
+        entries = [e for e in self.data_entries if e['name'] in names]
+        self.baseline_mgr.clear(entries)
+        kept = 0
+        for e in entries:
+            try:
+                if not set_roi(e, roi):
+                    kept += 1
+            except OSError:   # file gone and its full spectrum evicted
+                kept += 1
+        sw = getattr(self, 'selection_window', None)
+        if sw is not None and sw.isVisible() and sw.exp_name in names:
+            sw.close()   # its Δs are of the old range
+        bw = getattr(self, 'band_window', None)
+        if bw is not None and bw.isVisible() and bw.exp_name in names and bw.bands:
+            bw.analyze()
+
+        tree = self.ui.tree_list
+        for i in range(tree.topLevelItemCount()):
+            exp_item = tree.topLevelItem(i)
+            if exp_item.text(0) in names:
+                for j in range(exp_item.childCount()):
+                    self._set_thumbnail(exp_item.child(j))
+        self.on_selection_changed()
+        msg = (f"Showing the full range of {', '.join(names)}" if roi is None else
+               f"Cropped {', '.join(names)} to {roi[0]:g}–{roi[1]:g} cm⁻¹")
+        if kept:
+            msg += f"; {kept} derived spectra keep their range"
+        self.statusBar().showMessage(msg, 8000)
+
+    def on_toggle_live(self, on):
+        """Start/stop tailing the working directories for new cycles."""
+        if on:
+            self.live_monitor.start(self.loaded_working_dirs,
+                                    (e.get("path") for e in self.data_entries))
+            self.statusBar().showMessage("Live: waiting for new cycles…")
+        else:
+            self.live_monitor.stop()
+            self.statusBar().clearMessage()
+
+    def on_live_entries(self, entries):
+        """
+        Insert cycles written during acquisition. If the newest cycle of that
+        experiment was being viewed, the view follows to the new one, updating
+        the existing plot lines in place.
+        """
+        existing_paths = {e.get("path") for e in self.data_entries}
+        entries = [e for e in entries if e.get("path") not in existing_paths]
+        if not entries:
             return
-        # pick its last cycle
-        last_cycle = last_exp.child(last_exp.childCount() - 1)
-        tree.setCurrentItem(last_cycle)      # focus
-        last_cycle.setSelected(True)         # actually select
+        self.data_entries.extend(entries)
+        self._update_modalities()
+
+        tree = self.ui.tree_list
+        selected = tree.selectedItems()
+        follow = len(selected) == 1 and selected[0].parent() is not None and \
+            selected[0].parent().indexOfChild(selected[0]) == selected[0].parent().childCount() - 1
+        items = self._insert_tree_cycles(entries)
+
+        if items and (follow or not selected):
+            newest = items[-1]
+            tree.blockSignals(True)
+            tree.clearSelection()
+            tree.setCurrentItem(newest)
+            newest.setSelected(True)
+            tree.blockSignals(False)
+            sel = self._current_work_selection()
+            self.plotter.update_lines(sel, self.get_modalities())
+            self._refresh_metadata()
+            self._update_baseline_buttons(sel)
+        elif selected and selected[0] in items:
+            # the viewed cycle just gained its second camera
+            self.on_selection_changed()
+
+        sw = getattr(self, 'selection_window', None)
+        if sw is not None and sw.isVisible():
+            sw.add_cycle_entries(entries)
+        bw = getattr(self, 'band_window', None)
+        if bw is not None and bw.isVisible():
+            bw.add_cycle_entries(entries)
+
+        self._report_live_stats(entries)
+
+    def _report_live_stats(self, entries):
+        newest = max(entries, key=lambda e: (self._cycle_sort_key(e['file_index']), e['camera']))
+        parts = [f"Live: {newest['name']} cycle {newest['file_index']}"]
+        for e in sorted((e for e in entries if e['file_index'] == newest['file_index']
+                         and e['name'] == newest['name']), key=lambda e: e['camera']):
+            roa = channel(e['data'], "SCP ROA")
+            parts.append(f"Cam {e['camera']}: ROA noise {estimate_noise(roa):.3g}, "
+                         f"SNR {estimate_snr(roa):.1f}")
+        try:
+            latency = time.time() - os.path.getmtime(newest['path'])
+            parts.append(f"latency {latency * 1000:.0f} ms")
+        except OSError:
+            pass
+        self.statusBar().showMessage(" | ".join(parts))
 
     def on_add_working_dir(self):
         """Prompt for another directory and merge its data entries (skipping already-loaded files)."""
@@ -383,34 +939,7 @@ class MainWindow(QMainWindow):
         )
         if not new_dir:
             return
-
-        new_entries = load_data_files(new_dir)
-        if not new_entries:
-            QMessageBox.warning(
-                self, "No Data",
-                f"No valid spectra files found in:\n{new_dir}"
-            )
-            return
-
-        # Filter out duplicates based on path
-        existing_paths = {e.get("path") for e in self.data_entries}
-        added = [e for e in new_entries if e.get("path") not in existing_paths]
-        if not added:
-            QMessageBox.information(
-                self, "Add Working Directory",
-                "All spectra from the selected directory are already loaded."
-            )
-            return
-
-        self.data_entries.extend(added)
-        self.settings.setValue("lastWorkingDir", new_dir)
-        if new_dir not in self.loaded_working_dirs:
-            self.loaded_working_dirs.append(new_dir)
-
-        # Refresh UI/state
-        self._update_modalities()
-        self._populate_individual_list()
-        self.on_selection_changed()
+        self._start_loading([new_dir], "add")
 
     def on_refresh_working_dirs(self):
         """
@@ -422,32 +951,7 @@ class MainWindow(QMainWindow):
                 "No working directories are currently loaded."
             )
             return
-
-        existing_paths = {e.get("path") for e in self.data_entries}
-        added_total = 0
-
-        for work_dir in self.loaded_working_dirs:
-            new_entries = load_data_files(work_dir)
-            added = [e for e in new_entries if e.get("path") not in existing_paths]
-            if added:
-                self.data_entries.extend(added)
-                existing_paths.update(e.get("path") for e in added)
-                added_total += len(added)
-
-        if added_total == 0:
-            QMessageBox.information(
-                self, "Refresh Working Directories",
-                "No new spectra files were found."
-            )
-            return
-
-        self._update_modalities()
-        self._populate_individual_list()
-        self.on_selection_changed()
-        QMessageBox.information(
-            self, "Refresh Working Directories",
-            f"Loaded {added_total} new spectra files."
-        )
+        self._start_loading(list(self.loaded_working_dirs), "refresh")
 
     def on_clear_all(self):
         """
@@ -460,10 +964,13 @@ class MainWindow(QMainWindow):
         if confirm != QMessageBox.StandardButton.Yes:
             return
 
+        self._cancel_loading()
+        self.ui.btn_live.setChecked(False)
         self.data_entries = []
         self.loaded_working_dirs = []
+        clear_cache()
         self.baseline_mgr.clear()
-        self.ui.tree_list.clear()
+        self._populate_individual_list()
         self.ui.meta_list.clear()
         self.plotter.update_plot([], self.get_modalities())
         self._update_baseline_buttons()
@@ -479,24 +986,248 @@ class MainWindow(QMainWindow):
                 "All loaded data was cleared. Select a working directory to load new spectra."
             )
             return
+        self._start_loading([new_dir], "replace")
 
-        new_entries = load_data_files(new_dir)
-        if not new_entries:
-            QMessageBox.warning(
-                self, "No Data",
-                f"No valid spectra files found in:\n{new_dir}"
-            )
+    # ---------- Sessions ----------
+    def session_state(self) -> dict:
+        """View settings saved with a session snapshot."""
+        return {
+            "working_dir": self.working_dir,
+            "loaded_working_dirs": list(self.loaded_working_dirs),
+            "normalized": self.normalized,
+            "modalities": self.get_modalities(),
+            "camera_mode": self._camera_mode(),
+            "baseline": dataclasses.asdict(self.baseline_params()),
+            "regions_of_interest": dict(self.rois),
+        }
+
+    def _apply_session_state(self, state: dict):
+        ui = self.ui
+        self.working_dir = state.get("working_dir") or self.working_dir
+        self.loaded_working_dirs = list(state.get("loaded_working_dirs", []))
+        if bool(state.get("normalized")) != self.normalized:
+            self.normalized = not self.normalized
+            ui.btn_toggle_norm.setText("Undo normalization" if self.normalized
+                                       else "Normalize by Accumulation Time")
+        boxes = {'SCP': ui.mod_scp, 'DCPI': ui.mod_dcpi, 'DCPII': ui.mod_dcpii, 'SCPc': ui.mod_scpc}
+        for mod, on in state.get("modalities", {}).items():
+            if mod in boxes:
+                boxes[mod].setChecked(on)
+        {'A': ui.radio_cam_a, 'B': ui.radio_cam_b}.get(state.get("camera_mode"), ui.radio_both).setChecked(True)
+        self.rois.update({name: roi_key(roi) for name, roi in
+                          state.get("regions_of_interest", {}).items()})
+        params = state.get("baseline")
+        if params:
+            ui.method_combo.setCurrentIndex(max(0, ui.method_combo.findData(params["method"])))
+            ui.lam_spin.setValue(math.log10(params["lam"]))
+            ui.pressure_spin.setValue(params["p"] * 1e4)
+            ui.max_iter_spin.setValue(params["niter"])
+            ui.start_wav_spin.setValue(int(params["start_wavenumber"]))
+            ui.order_spin.setValue(params["order"])
+            ui.half_window_spin.setValue(params["half_window"])
+
+    def on_save_session(self):
+        if not self.data_entries:
+            QMessageBox.information(self, "Save Session", "No spectra are loaded.")
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save Session", os.path.join(self.working_dir, "session.npz"), SESSION_FILTER)
+        if not path:
             return
+        t0 = time.perf_counter()
+        cache, params = self.baseline_mgr.snapshot()
+        try:
+            save_session(path, self.data_entries, cache, params, self.session_state())
+        except OSError as exc:
+            QMessageBox.warning(self, "Save Session", f"Could not write the session:\n{exc}")
+            return
+        self.statusBar().showMessage(
+            f"Saved {len(self.data_entries)} spectra to {os.path.basename(path)} "
+            f"({os.path.getsize(path) / 2**20:.1f} MB, {time.perf_counter() - t0:.2f} s)", 5000)
 
-        self.data_entries = new_entries
-        self.loaded_working_dirs = [new_dir]
-        self.working_dir = new_dir
-        self.settings.setValue("lastWorkingDir", new_dir)
+    def on_open_session(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Open Session", self.working_dir, SESSION_FILTER)
+        if not path:
+            return
+        t0 = time.perf_counter()
+        try:
+            session = load_session(path)
+        except (OSError, ValueError, KeyError) as exc:
+            QMessageBox.warning(self, "Open Session", f"Could not read the session:\n{exc}")
+            return
+        self._cancel_loading()
+        self.ui.btn_live.setChecked(False)
+        self.data_entries = session.entries
+        self.baseline_mgr.restore(session.baselines, session.baseline_params)
+        self._apply_session_state(session.state)
+        self.live_monitor.mark_known(e.get("path") for e in self.data_entries if e.get("path"))
         self._update_modalities()
         self._populate_individual_list()
         self._select_last_spectrum()
         self.on_selection_changed()
 
+        msg = f"Restored {len(session.entries)} spectra in {time.perf_counter() - t0:.2f} s"
+        if session.reloaded:
+            msg += f"; {session.reloaded} changed files re-read"
+        if session.missing:
+            msg += f"; {session.missing} missing files skipped"
+        self.statusBar().showMessage(msg, 8000)
+
+    # ---------- Background loading ----------
+    def _start_loading(self, directories, mode):
+        """
+        Load directories on a background thread. mode: "initial"/"replace"
+        (new working directory), "add" or "refresh"; spectra are inserted
+        into the tree as batches arrive, already-loaded paths are skipped.
+        """
+        self._cancel_loading()
+        gen = self._load_generation
+        loader = DirectoryLoader(directories,
+                                 load_fn=lambda path: self._load_file(path, lazy=self.lazy_bodies),
+                                 post_fn=despike_series if self.despike else None,
+                                 parent=self)
+        loader.indexed.connect(lambda index: self._on_load_index(gen, index))
+        loader.batch_loaded.connect(lambda batch: self._on_load_batch(gen, batch))
+        loader.progress.connect(self._on_load_progress)
+        loader.post_processed.connect(lambda results: self._on_load_despiked(gen, results))
+        loader.completed.connect(
+            lambda entries, cancelled: self._on_load_completed(gen, mode, directories, entries, cancelled))
+        self._loader = loader
+        self._load_added = 0
+        self._set_loading_ui(True)
+        loader.start()
+
+    def _cancel_loading(self):
+        """Stop any load in progress and ignore its signals still queued."""
+        loader = getattr(self, "_loader", None)
+        if loader is None:
+            return
+        loader.cancel()
+        loader.wait()  # at most the file being parsed
+        self._loader = None
+        self._load_generation += 1
+        self._pending_index = {}
+        self._set_loading_ui(False)
+
+    def on_cancel_loading(self):
+        loader = getattr(self, "_loader", None)
+        if loader is not None:
+            loader.cancel()
+
+    def _set_loading_ui(self, loading):
+        for w in (self.ui.btn_add_working_dir, self.ui.btn_refresh_working_dirs,
+                  self.ui.chk_despike, self.ui.chk_float32, self.ui.btn_live):
+            w.setEnabled(not loading)
+        self.load_progress.setVisible(loading)
+        self.btn_cancel_load.setVisible(loading)
+        if loading:
+            self.load_progress.setRange(0, 0)  # busy until the file count is known
+            self.statusBar().showMessage("Scanning directory…")
+
+    def _on_load_progress(self, done, total, bytes_read):
+        self.load_progress.setRange(0, max(total, 1))
+        self.load_progress.setValue(done)
+        self.statusBar().showMessage(
+            f"Loading {done}/{total} files ({bytes_read / 2**20:.1f} MB)")
+
+    def _on_load_index(self, gen, index):
+        """Lay out the cycles of all indexed files before their bodies are parsed."""
+        if gen != self._load_generation:
+            return
+        existing_paths = {e.get("path") for e in self.data_entries}
+        self._pending_index = {e["path"]: e for e in index if e["path"] not in existing_paths}
+        if self._pending_index:
+            self.ui.tree_list.blockSignals(True)
+            self._insert_tree_cycles(list(self._pending_index.values()), placeholder=True)
+            self.ui.tree_list.blockSignals(False)
+
+    def _on_load_batch(self, gen, batch):
+        if gen != self._load_generation:
+            return
+        existing_paths = {e.get("path") for e in self.data_entries}
+        added = [e for e in batch if e.get("path") not in existing_paths]
+        for e in batch:
+            self._pending_index.pop(e.get("path"), None)
+        if not added:
+            return
+        self._load_added += len(added)
+        self.data_entries.extend(added)
+        self.live_monitor.mark_known(e.get("path") for e in added)
+        self._insert_tree_cycles(added)
+
+        # keep showing the newest cycle until the user picks something
+        tree = self.ui.tree_list
+        selected = tree.selectedItems()
+        if not selected or selected == [getattr(self, "_auto_selected", None)]:
+            tree.blockSignals(True)
+            tree.clearSelection()
+            self._select_last_spectrum()
+            tree.blockSignals(False)
+            current = tree.selectedItems()
+            self._auto_selected = current[0] if current else None
+            self._selection_debouncer.schedule()
+
+    def _on_load_despiked(self, gen, results):
+        """
+        Install the despiked frames computed on the loader thread, also in
+        loaded cycles of a series that gained cycles (despiked anew).
+        """
+        if gen != self._load_generation:
+            return
+        if apply_despiked(self.data_entries, results):
+            self._selection_debouncer.schedule()
+
+    def _on_load_completed(self, gen, mode, directories, entries, cancelled):
+        if gen != self._load_generation:
+            return
+        self._loader = None
+        self._set_loading_ui(False)
+        if self._pending_index:
+            self.ui.tree_list.blockSignals(True)
+            self._drop_placeholders()
+            self.ui.tree_list.blockSignals(False)
+        added = self._load_added
+        self.statusBar().showMessage(
+            f"Loading cancelled: {added} spectra files loaded." if cancelled else
+            f"Loaded {added} spectra files.", 5000)
+
+        if added:
+            self._update_modalities()
+            if mode in ("initial", "replace", "add"):
+                new_dir = directories[0]
+                if mode != "add":
+                    self.working_dir = new_dir
+                self.settings.setValue("lastWorkingDir", new_dir)
+                if new_dir not in self.loaded_working_dirs:
+                    self.loaded_working_dirs.append(new_dir)
+            if self.live_monitor.is_running():
+                self.on_toggle_live(True)  # tail any new directory too
+
+        if cancelled:
+            return
+        if mode == "refresh":
+            QMessageBox.information(
+                self, "Refresh Working Directories",
+                f"Loaded {added} new spectra files." if added else "No new spectra files were found."
+            )
+        elif not entries:
+            QMessageBox.warning(
+                self, "No Data",
+                f"No valid spectra files found in:\n{directories[0]}"
+            )
+            if mode == "initial":
+                self.close()
+        elif not added and mode == "add":
+            QMessageBox.information(
+                self, "Add Working Directory",
+                "All spectra from the selected directory are already loaded."
+            )
+
+    def closeEvent(self, event):
+        self._cancel_loading()
+        self.compute.shutdown()
+        super().closeEvent(event)
+
     def _select_working_directory(self, title: str, initial_dir: str) -> str:
         """
         Open a directory-picker dialog that also shows directory contents.